@@ -7,6 +7,8 @@ import math
 import os
 import os.path
 
+import stat
+
 from enum import Enum, unique
 
 import logging
@@ -17,17 +19,72 @@ import tempfile
 
 import sys
 
+import gzip
+
+import lzma
+
+import json
+
+import csv
+
+import mmap
+
+import shutil
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+import hashlib
+
+import sqlite3
+
+import time
+
+import tracemalloc
+
+import resource
+
+import subprocess
+
+import functools
+
+import cProfile
+
+import atexit
+
+import struct
+
+import re
+
+import io
+
+import contextlib
+
+import socketserver
+
+import http.server
+
+from array import array
+
 import numpy as np
 
-from scipy.stats import pearsonr
+from scipy import sparse
+from scipy.stats import pearsonr, norm
 from scipy.optimize import curve_fit
 
 from jinja2 import Environment, FileSystemLoader
 
-import graph_tool as gt
-import graph_tool.centrality as gt_central
-import graph_tool.clustering as gt_cluster
-import graph_tool.draw as gt_draw
+try:
+    import graph_tool as gt
+    import graph_tool.centrality as gt_central
+    import graph_tool.draw as gt_draw
+except ImportError: # the measures of the arrays of get_csr() do not need it
+    gt = gt_central = gt_draw = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 sys.path.append('/usr/local/lib/python2.7/dist-packages/')
 
@@ -53,12 +110,62 @@ CSV_FIELDS_SEPARATOR = ','
 
 # Graphs
 GRAPH_EDGE_SYMBOL = '--'
+# Maximum number of wedges (paths of length two) checked at once when
+# counting triangles.
+TRIANGLE_MAX_WEDGES = 1 << 22
+# Number of wedges sampled at once when estimating the clustering.
+WEDGE_SAMPLING_BATCH = 1 << 16
+# Damping factor of PageRank.
+PAGERANK_DAMPING = 0.85
+# Maximum number of iterations of the spectral solver.
+SPECTRAL_MAX_ITERATIONS = 1000
+# Variants of the assortativity coefficient, see assortativity_csr().
+ASSORTATIVITY_VARIANTS = ['degree', 'weighted', 'frequency']
+# Number of rewired graphs normalizing the rich-club coefficient.
+RICH_CLUB_REPLICATES = 20
+# Seconds between checks of the data files in the watch mode.
+WATCH_INTERVAL = 1.0
+
+# Worker processes are forked to inherit the state of this module
+# (the module runs main() when it is imported).
+MP_CONTEXT = multiprocessing.get_context('fork')
+
+# Compression formats mapped to the file suffix, the magic bytes
+# at the beginning of the file and the command used by gnuplot to
+# decompress the data files to standard output.
+COMPRESSION_FORMATS = {
+    'gz': ('.gz', b'\x1f\x8b', 'gzip -dc '),
+    'xz': ('.xz', b'\xfd7zXZ\x00', 'xz -dc '),
+    'zst': ('.zst', b'\x28\xb5\x2f\xfd', 'zstd -dc '),
+}
 
 class Project():
     """Project contains information about where to write the
     files generating during the calculation and plotting."""
     # Where to store files generated by the scripts.
     output_directory = DEFAULT_OUTPUT_DIRECTORY
+    # Compression format of the data files written (None: plain text).
+    output_compression = None
+    # Number of worker processes used by the parallel tasks.
+    workers = 1
+    # Store of results (None: measures are always computed).
+    store = None
+    # Keep encounter groups in an incidence matrix, deriving the graph
+    # only when it is needed.
+    lazy_projection = False
+    # Budget of the estimate of the clustering by wedge sampling: number of
+    # wedges or, when less than 1, half width of the confidence interval
+    # (None: the clustering is exact).
+    clustering_sampling = None
+    # Tolerance (L1 norm of the change of the vector in an iteration) of
+    # the spectral centralities.
+    spectral_tolerance = 1e-10
+    # Significance level of the disparity filter keeping the backbone of
+    # the graphs (None: the graphs are not filtered).
+    backbone_level = None
+    # Parameters of the synthetic books, keyword arguments of
+    # generate_book() besides the number of characters.
+    synthetic_params = {}
     def __init__(self):
         return
     # Template for specific project configurations.
@@ -68,7 +175,392 @@ class Project():
     def set_outdir(self, directory):
         """Set the directory to write the files."""
         Project.output_directory = directory
+    def get_output_compression(self):
+        """Return the compression format of the output data files."""
+        return Project.output_compression
+    def set_output_compression(self, fmt):
+        """Set the compression format of the output data files."""
+        Project.output_compression = fmt
+    def get_workers(self):
+        """Return the number of worker processes."""
+        return Project.workers
+    def set_workers(self, workers):
+        """Set the number of worker processes."""
+        Project.workers = workers
+    def get_store(self):
+        """Return the store of results."""
+        return Project.store
+    def set_store(self, store):
+        """Set the store of results."""
+        Project.store = store
+    def get_lazy_projection(self):
+        """Return True if the graphs are derived lazily from the encounters."""
+        return Project.lazy_projection
+    def set_lazy_projection(self, lazy):
+        """Set if the graphs are derived lazily from the encounters."""
+        Project.lazy_projection = lazy
+    def get_clustering_sampling(self):
+        """Return the budget of the estimate of the clustering."""
+        return Project.clustering_sampling
+    def set_clustering_sampling(self, budget):
+        """Set the budget of the estimate of the clustering."""
+        Project.clustering_sampling = budget
+    def get_spectral_tolerance(self):
+        """Return the tolerance of the spectral centralities."""
+        return Project.spectral_tolerance
+    def set_spectral_tolerance(self, tolerance):
+        """Set the tolerance of the spectral centralities."""
+        Project.spectral_tolerance = tolerance
+    def get_backbone_level(self):
+        """Return the significance level of the backbone of the graphs."""
+        return Project.backbone_level
+    def set_backbone_level(self, level):
+        """Set the significance level of the backbone of the graphs."""
+        Project.backbone_level = level
+    def get_synthetic_params(self):
+        """Return the parameters of the synthetic books."""
+        return Project.synthetic_params
+    def set_synthetic_params(self, params):
+        """Set the parameters of the synthetic books."""
+        Project.synthetic_params = params
+
+###########
+# STREAMS #
+###########
+# Open data files transparently compressed with gzip, xz or zstd.
+
+def get_compression_formats():
+    """Return the compression formats available in this installation."""
+    fmts = ['gz', 'xz']
+    if zstandard is not None:
+        fmts.append('zst')
+    return fmts
+
+def get_compression_suffixes():
+    """Return the file suffixes of the available compression formats."""
+    return [COMPRESSION_FORMATS[fmt][0] for fmt in get_compression_formats()]
+
+def sniff_compression(file_name):
+    """Return the compression format of the file detected by its magic
+    bytes, or None if the file is plain text."""
+    with open(file_name, 'rb') as _file:
+        head = _file.read(8)
+    for fmt, (_, magic, _) in COMPRESSION_FORMATS.items():
+        if head.startswith(magic):
+            return fmt
+    return None
+
+def open_stream(file_name, mode='r', fmt=None):
+    """Open a text stream on the file compressed with format fmt. In
+    reading mode the format is detected from the content of the file.
+    The data is (de)compressed while it is streamed, nothing is
+    buffered beyond the compressor window."""
+    if 'r' in mode:
+        fmt = sniff_compression(file_name)
+    if fmt is None:
+        return open(file_name, mode)
+    if fmt == 'gz':
+        return gzip.open(file_name, mode + 't')
+    if fmt == 'xz':
+        return lzma.open(file_name, mode + 't')
+    if fmt == 'zst':
+        if zstandard is None:
+            LOGGER.error('* Python module "zstandard" is needed to handle %s', file_name)
+            exit()
+        return zstandard.open(file_name, mode + 't')
+    LOGGER.error('* Unknown compression format: %s', fmt)
+    exit()
 
+def open_output(file_name):
+    """Open the data file to write in the output, appending to its name
+    the suffix of the compression format set in the project. Return the
+    stream and the name of file effectively written."""
+    fmt = Project().get_output_compression()
+    if fmt is not None:
+        file_name += COMPRESSION_FORMATS[fmt][0]
+    return open_stream(file_name, 'w', fmt), file_name
+
+def gnuplot_source(file_name):
+    """Return the data source for gnuplot that reads file_name,
+    decompressing it through a pipe when needed."""
+    for (suffix, _, cmd) in COMPRESSION_FORMATS.values():
+        if file_name.endswith(suffix):
+            return '< ' + cmd + file_name
+    return file_name
+
+
+###########
+# PROFILE #
+###########
+# The profiler records the wall and CPU times, the peak of memory
+# allocated by Python (tracemalloc) and the number of items processed
+# by each stage: the tasks, the reading of each book, each measure,
+# each plot and each external command. Stages can be nested and the
+# peak of memory of a stage includes the peaks of its inner stages.
+# When the profiler is disabled a stage costs an attribute lookup.
+
+class ProfileStage():
+    """Stage being recorded by the profiler."""
+    def __init__(self, name):
+        self.name = name
+        self.items = None
+        self.record = None
+        self.peak = 0 # absolute peak of traced memory of inner stages
+        self.mem = 0
+        self.wall = self.cpu = 0.0
+        self.cprof = None
+
+    def __enter__(self):
+        if Profiler.memory:
+            (self.mem, peak) = tracemalloc.get_traced_memory()
+            # the peak reached so far belongs to the enclosing stage
+            if Profiler.stack:
+                parent = Profiler.stack[-1]
+                parent.peak = max(parent.peak, peak)
+            tracemalloc.reset_peak()
+        if Profiler.dump_dir is not None and Profiler.cprof_active is False:
+            Profiler.cprof_active = True
+            self.cprof = cProfile.Profile()
+            self.cprof.enable()
+        Profiler.stack.append(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        Profiler.stack.pop()
+        path = '/'.join([stage.name for stage in Profiler.stack] + [self.name])
+        self.record = {'stage': self.name, 'path': path, 'wall': wall, 'cpu': cpu,
+                       'items': self.items, 'py_peak': None}
+        if Profiler.memory:
+            peak = max(tracemalloc.get_traced_memory()[1], self.peak)
+            self.record['py_peak'] = peak - self.mem
+            if Profiler.stack:
+                parent = Profiler.stack[-1]
+                parent.peak = max(parent.peak, peak)
+        if self.cprof is not None:
+            self.cprof.disable()
+            Profiler.cprof_active = False
+            Profiler.dumps += 1
+            name = '{:03d}-{}.prof'.format(Profiler.dumps, self.name.replace(':', '-')
+                                           .replace('/', '-'))
+            self.cprof.dump_stats(os.path.join(Profiler.dump_dir, name))
+        Profiler.records.append(self.record)
+        return False
+
+class NullStage():
+    """Stage returned while the profiler is disabled."""
+    items = None
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc):
+        return False
+
+class Profiler():
+    """Record the stages of the execution and report them."""
+    enabled = False
+    memory = False
+    dump_dir = None # directory of cProfile dumps (None: no dumps)
+    cprof_active = False
+    dumps = 0
+    stack = []
+    records = []
+    null_stage = NullStage()
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def enable(memory=True, dump_dir=None):
+        """Start recording the stages, the report is written at exit."""
+        Profiler.enabled = True
+        Profiler.memory = memory
+        Profiler.dump_dir = dump_dir
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        atexit.register(Profiler.report)
+
+    @staticmethod
+    def stage(name):
+        """Return the context to record the stage name."""
+        if Profiler.enabled is False:
+            return Profiler.null_stage
+        return ProfileStage(name)
+
+    @staticmethod
+    def get_summary():
+        """Return the records aggregated by stage name."""
+        summary = {}
+        for rec in Profiler.records:
+            agg = summary.setdefault(rec['stage'], {'stage': rec['stage'], 'calls': 0,
+                                                    'wall': 0.0, 'cpu': 0.0,
+                                                    'items': 0, 'py_peak': 0})
+            agg['calls'] += 1
+            agg['wall'] += rec['wall']
+            agg['cpu'] += rec['cpu']
+            agg['items'] += rec['items'] or 0
+            agg['py_peak'] = max(agg['py_peak'], rec['py_peak'] or 0)
+        return sorted(summary.values(), key=lambda agg: agg['wall'], reverse=True)
+
+    @staticmethod
+    def report():
+        """Write the JSON report to the output directory and print a summary."""
+        if Profiler.enabled is False:
+            return
+        Profiler.enabled = False
+        summary = Profiler.get_summary()
+        file_name = os.path.join(Project().get_out_dir(), 'profile.json')
+        with open(file_name, 'w') as _file:
+            json.dump({'stages': Profiler.records, 'summary': summary}, _file, indent=1)
+        print('\n{:<40}{:>7}{:>10}{:>10}{:>10}{:>12}'.format('stage', 'calls', 'wall(s)',
+                                                          'cpu(s)', 'peak(MB)', 'items'))
+        for agg in summary:
+            print('{:<40}{:>7}{:>10.3f}{:>10.3f}{:>10.1f}{:>12}'.format(
+                agg['stage'][:39], agg['calls'], agg['wall'], agg['cpu'],
+                agg['py_peak']/2**20, agg['items']))
+        print('* Wrote ' + file_name)
+
+def profiled(name, items=None):
+    """Decorator recording each call of the function as a stage. The
+    name of the stage is a string or a function of the arguments of the
+    call (returning None to not record the call), and items is a
+    function of the returned value counting the items processed."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if Profiler.enabled is False:
+                return func(*args, **kwargs)
+            stage_name = name(*args, **kwargs) if callable(name) else name
+            if stage_name is None:
+                return func(*args, **kwargs)
+            with Profiler.stage(stage_name) as stage:
+                ret = func(*args, **kwargs)
+                if items is not None:
+                    stage.items = items(ret)
+            return ret
+        return wrapper
+    return decorator
+
+#########
+# TRACE #
+#########
+# The tracer counts the events of the hot loops (pairs of characters
+# processed by the parser, new edges and weight increments, steps of
+# the lobby index) and writes one of every sample_rate events to the
+# file "trace.log" in the output directory. The loops test a local
+# boolean before calling the tracer, so tracing costs nothing while it
+# is disabled.
+
+TRACE_LOGGER = logging.getLogger(__name__ + '.trace')
+
+class Tracer():
+    """Counters and sampled traces of the events of the hot loops."""
+    enabled = False
+    sample_rate = 0 # trace one of every sample_rate events (0: none)
+    events = 0
+    counters = {}
+
+    def __init__(self):
+        pass
+
+    @staticmethod
+    def enable(sample_rate=0):
+        """Start counting events and tracing the sampled ones."""
+        Tracer.enabled = True
+        Tracer.sample_rate = sample_rate
+        if sample_rate > 0:
+            handler = logging.FileHandler(os.path.join(Project().get_out_dir(), 'trace.log'),
+                                          mode='w')
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            TRACE_LOGGER.addHandler(handler)
+            TRACE_LOGGER.setLevel(logging.DEBUG)
+            TRACE_LOGGER.propagate = False
+        atexit.register(Tracer.report)
+
+    @staticmethod
+    def add(counter, value=1):
+        """Add value to counter."""
+        Tracer.counters[counter] = Tracer.counters.get(counter, 0) + value
+
+    @staticmethod
+    def event(counter, fmt, *args):
+        """Count an event and trace it if it is sampled."""
+        Tracer.counters[counter] = Tracer.counters.get(counter, 0) + 1
+        Tracer.events += 1
+        if Tracer.sample_rate > 0 and Tracer.events % Tracer.sample_rate == 0:
+            TRACE_LOGGER.debug(fmt, *args)
+
+    @staticmethod
+    def report():
+        """Print the counters."""
+        if Tracer.enabled is False:
+            return
+        Tracer.enabled = False
+        print('\n* Trace counters:')
+        for (counter, value) in sorted(Tracer.counters.items()):
+            print('\t{:<24}{:>14}'.format(counter, value))
+
+###########
+# STRINGS #
+###########
+# Labels and names of characters are kept in string tables: the
+# strings are joined in a contiguous utf-8 buffer indexed by an array
+# of int64 offsets, as in the records of the corpus archive, and each
+# string is identified by a dense integer code, its order of insertion.
+# An interned table also keeps a dictionary from each string to its
+# code, so the parser translates labels once and works with integer
+# codes afterwards; a table loaded from a buffer builds that dictionary
+# only when a string is first looked up.
+
+class StringTable():
+    """Strings stored in a contiguous buffer and identified by codes."""
+    def __init__(self, interned=False):
+        self.buffer = bytearray()
+        self.offsets = array('q', [0])
+        self.interned = interned
+        self.codes = {} if interned else None
+    def __len__(self):
+        return len(self.offsets) - 1
+    def __contains__(self, text):
+        return text in self.get_codes()
+    def get_codes(self):
+        """Return the dictionary of the codes of the strings of an interned
+        table (None if it is not interned)."""
+        if self.codes is None and self.interned:
+            self.codes = {self.get(code): code for code in range(len(self))}
+        return self.codes
+    def add(self, text):
+        """Append text to the table and return its code. In an interned
+        table a text already added is not appended again."""
+        codes = self.get_codes()
+        if codes is not None:
+            code = codes.get(text)
+            if code is not None:
+                return code
+            codes[text] = len(self)
+        self.buffer += text.encode('utf-8')
+        self.offsets.append(len(self.buffer))
+        return len(self) - 1
+    def get_code(self, text):
+        """Return the code of text in an interned table."""
+        return self.get_codes()[text]
+    def get(self, code):
+        """Return the string with the code."""
+        return self.buffer[self.offsets[code]:self.offsets[code+1]].decode('utf-8')
+    def get_buffer(self):
+        """Return the buffer and the int64 array of offsets of the strings."""
+        return bytes(self.buffer), np.frombuffer(self.offsets, dtype=np.int64).copy()
+    @staticmethod
+    def from_buffer(buf, offsets, interned=False):
+        """Return the table of the strings packed in buf at offsets, no
+        string is decoded until it is used."""
+        table = StringTable(interned)
+        table.buffer = bytearray(buf)
+        table.offsets = array('q', np.asarray(offsets, dtype=np.int64).tobytes())
+        table.codes = None
+        return table
 
 ##########
 # GRAPHS #
@@ -86,6 +578,13 @@ class Measure(Enum):
     DEGREE_CENTRALITY = 6
     DENSITY = 7
     LOBBY = 8
+    CORENESS = 9
+    PAGERANK = 10
+    EIGENVECTOR = 11
+    RANK = 12
+    FREQUENCY = 13
+    APPEARANCES = 14
+    CHARACTERS = 15
     @staticmethod
     def get_label(measure_num):
         """Return the label of the measure ID."""
@@ -98,18 +597,43 @@ class Measure(Enum):
             Measure.DEGREE: 'k',
             Measure.DEGREE_CENTRALITY: 'D',
             Measure.DENSITY: 'density',
-            Measure.LOBBY: 'Lobby'
+            Measure.LOBBY: 'Lobby',
+            Measure.CORENESS: 'coreness',
+            Measure.PAGERANK: 'PageRank',
+            Measure.EIGENVECTOR: 'eigenvector',
+            Measure.RANK: 'rank',
+            Measure.FREQUENCY: 'frequency',
+            Measure.APPEARANCES: 'appearances',
+            Measure.CHARACTERS: 'characters'
         }
         lab = label[measure_num]
         assert lab
         return lab
+    @staticmethod
+    def get_params(measure_num):
+        """Return the parameters used to compute the measure ID as a
+        string, they identify the results in the store."""
+        params = {
+            Measure.BETWEENNESS: {'weight': 'weight', 'norm': True},
+            Measure.CLOSENESS: {'weight': 'weight'},
+            Measure.PAGERANK: {'weight': 'weight', 'damping': PAGERANK_DAMPING,
+                               'tol': Project().get_spectral_tolerance()},
+            Measure.EIGENVECTOR: {'weight': 'weight', 'tol': Project().get_spectral_tolerance()},
+        }
+        params = dict(params.get(measure_num, {}))
+        if Project().get_backbone_level() is not None:
+            params['backbone'] = Project().get_backbone_level()
+        return json.dumps(params, sort_keys=True)
 
 class Graphs():
     """Handle all graphs in one place."""
     centrality_nums = [
         Measure.BETWEENNESS,
         Measure.CLOSENESS,
-        Measure.DEGREE_CENTRALITY
+        Measure.DEGREE_CENTRALITY,
+        Measure.CORENESS,
+        Measure.PAGERANK,
+        Measure.EIGENVECTOR
     ]
 
     def __init__(self):
@@ -117,7 +641,9 @@ class Graphs():
 
     @staticmethod
     def create_graph():
-        """Return the graph."""
+        """Return the graph, None without graph-tool."""
+        if gt is None:
+            return None
         return gt.Graph(directed=False)
     @staticmethod
     def size(graph):
@@ -139,6 +665,8 @@ class Graphs():
         assert graph
         n_verts = Graphs.size(graph)
         n_edges = Graphs.length(graph)
+        if n_verts < 2: # no possible links
+            return float('nan')
         return 2*float(n_edges) / (n_verts*(n_verts-1))
 
     @staticmethod
@@ -148,7 +676,8 @@ class Graphs():
 
     @staticmethod
     def get_vprop_degrees(graph):
-        """Return the properties of vertices and edges of the graph."""
+        """Return the property with the degree of the vertices as counted
+        by graph-tool, also given in the arrays of get_csr()."""
         if graph.graph_properties["was_vprop_degree_set"] is False:
             graph.graph_properties["was_vprop_degree_set"] = True
             for vert in graph.vertices():
@@ -170,11 +699,13 @@ class Graphs():
         '''Calculate the average degree and the standard deviation degree.
         '''
         deg_sum = [] # degree summation
+        vprop_degrees = Graphs.get_vprop_degrees(graph)
         for vert in graph.vertices():
-            deg_sum.append(vert.out_degree())
+            deg_sum.append(vprop_degrees[vert])
         return (np.mean(deg_sum), np.std(deg_sum))
 
     @staticmethod
+    @profiled(lambda graph, which: 'measure:' + which.name.lower(), len)
     def get_centrality_values(graph, which):
         """Return the centrality values for the graph."""
         ewprops = graph.edge_properties["weight"]
@@ -190,12 +721,197 @@ class Graphs():
             centr_func = Graphs.degree_centrality(graph)
         elif which == Measure.LOBBY:
             centr_func = lobby(graph)
+        elif which == Measure.CORENESS:
+            centr_func = (Graphs.get_coreness(graph) / float(graph.num_vertices())).tolist()
+        elif which in (Measure.PAGERANK, Measure.EIGENVECTOR):
+            key = graph.graph_properties["name"] if "name" in graph.graph_properties else None
+            centr_func = Graphs.get_csr_values(Graphs.get_csr(graph), which, key)
         else:
             LOGGER.error('* Wrong centrality id=%s', which)
             exit()
         return centr_func
 
     @staticmethod
+    def get_csr(graph):
+        """Return the arrays of the graph in compressed sparse row format:
+        the neighbors of vertex i are indices[indptr[i]:indptr[i+1]], in
+        increasing order, and weights are the weights of the edges to them.
+        The degrees of the vertices, those of get_vprop_degrees(), and their
+        frequency are also returned."""
+        edges = graph.get_edges([graph.edge_properties["weight"]]).astype(np.int64)
+        return Graphs.edges_to_csr(graph.num_vertices(), edges.reshape(-1, 3),
+                                   graph.vertex_properties["frequency"].a,
+                                   Graphs.get_vprop_degrees(graph).a)
+
+    @staticmethod
+    def edges_to_csr(n_verts, edges, frequency, degrees=None):
+        """Return the arrays of get_csr() for the array of edges with rows
+        (source, target, weight), the frequency and the degrees of the
+        vertices. If the degrees are not given, a self-loop adds 2 to the
+        degree of its vertex, as in graph-tool."""
+        loops = edges[:, 0] == edges[:, 1]
+        rows = np.concatenate((edges[:, 0], edges[~loops, 1]))
+        cols = np.concatenate((edges[:, 1], edges[~loops, 0]))
+        vals = np.concatenate((edges[:, 2], edges[~loops, 2]))
+        adj = sparse.csr_matrix((vals, (rows, cols)), shape=(n_verts, n_verts))
+        adj.sort_indices()
+        if degrees is None:
+            degrees = np.diff(adj.indptr) + np.bincount(edges[loops, 0], minlength=n_verts)
+        return {
+            'indptr': adj.indptr.astype(np.int64),
+            'indices': adj.indices.astype(np.int32),
+            'weights': adj.data.astype(np.int32),
+            'degrees': degrees.astype(np.int32),
+            'frequency': np.asarray(frequency, dtype=np.int32),
+        }
+
+    @staticmethod
+    def from_csr(csr):
+        """Return a graph with the edges in the arrays of get_csr()."""
+        graph = Graphs.create_graph()
+        graph.edge_properties["weight"] = graph.new_edge_property("int")
+        n_verts = len(csr['degrees'])
+        graph.add_vertex(n_verts)
+        rows = np.repeat(np.arange(n_verts), np.diff(csr['indptr']))
+        upper = rows <= csr['indices']
+        graph.add_edge_list(np.column_stack((rows[upper], csr['indices'][upper],
+                                             csr['weights'][upper])),
+                            eprops=[graph.edge_properties["weight"]])
+        return graph
+
+    @staticmethod
+    def get_csr_values(csr, which, key=None):
+        """Return the centrality values for the arrays of get_csr(). The
+        values are copied, so they stay valid when the arrays are released.
+        The spectral centralities start from the last solution for the key."""
+        n_verts = len(csr['degrees'])
+        if which == Measure.DEGREE_CENTRALITY:
+            return (csr['degrees'] / float(n_verts)).tolist()
+        if which == Measure.LOBBY:
+            return lobby_csr(csr)
+        if which == Measure.CORENESS:
+            return (coreness_csr(csr) / float(n_verts)).tolist()
+        if which in (Measure.PAGERANK, Measure.EIGENVECTOR):
+            return SpectralSolver.solve(csr, which, key).tolist()
+        if which in (Measure.BETWEENNESS, Measure.CLOSENESS):
+            return list(Graphs.get_centrality_values(Graphs.from_csr(csr), which))
+        LOGGER.error('* Wrong centrality id=%s', which)
+        exit()
+
+    @staticmethod
+    def get_disparity(edges):
+        """Return the significance of the edges, rows (source, target, weight),
+        by the disparity filter: the probability that an end with degree k
+        and strength s has an edge with weight at least w when its strength
+        is split uniformly at random among its edges, (1 - w/s)^(k-1), taking
+        the end where the edge is most significant. Self-loops get 1."""
+        loops = edges[:, 0] == edges[:, 1]
+        n_verts = int(edges[:, :2].max()) + 1 if len(edges) else 0
+        ends = np.concatenate((edges[~loops, 0], edges[~loops, 1]))
+        wts = np.tile(edges[~loops, 2].astype(float), 2)
+        degrees = np.bincount(ends, minlength=n_verts)
+        strengths = np.bincount(ends, weights=wts, minlength=n_verts)
+        alpha = np.ones(len(edges))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for end in (0, 1):
+                verts = edges[:, end]
+                alpha = np.fmin(alpha, (1.0 - edges[:, 2] / strengths[verts])
+                                ** (degrees[verts] - 1))
+        alpha[loops] = 1.0
+        return alpha
+
+    @staticmethod
+    def get_coreness(graph, weighted=False):
+        """Return the coreness of the vertices of the graph, see coreness_csr()."""
+        return coreness_csr(Graphs.get_csr(graph), weighted)
+
+    @staticmethod
+    @profiled('measure:assortativity')
+    def get_assortativity(graph):
+        """Return the assortativity coefficients of the graph and their
+        jackknife errors, see assortativity_csr()."""
+        csr = Graphs.get_csr(graph)
+        return {variant: assortativity_csr(csr, variant) for variant in ASSORTATIVITY_VARIANTS}
+
+    @staticmethod
+    @profiled('measure:rich_club')
+    def get_rich_club(graph, replicates=RICH_CLUB_REPLICATES, seed=None):
+        """Return the rich-club coefficients of the graph, see rich_club_csr(),
+        with their averages 'phi_rand' and 'weighted_rand' over replicates
+        graphs rewired keeping the degrees and the ratios 'rho' and
+        'weighted_rho' of the coefficients to these averages."""
+        csr = Graphs.get_csr(graph)
+        club = rich_club_csr(csr)
+        n_verts = len(csr['degrees'])
+        rows = np.repeat(np.arange(n_verts, dtype=np.int64), np.diff(csr['indptr']))
+        upper = rows < csr['indices']
+        edges = np.column_stack((rows[upper], csr['indices'][upper],
+                                 csr['weights'][upper])).astype(np.int64)
+        rng = np.random.default_rng(NULL_MODEL_SEED if seed is None else seed)
+        sums = {'phi': np.zeros(len(club['k'])), 'weighted': np.zeros(len(club['k']))}
+        for _ in range(replicates):
+            null_edges = rewire_edges(edges, rng, NULL_MODEL_SWAPS * len(edges))
+            null_club = rich_club_csr(Graphs.edges_to_csr(n_verts, null_edges,
+                                                          csr['frequency']))
+            for name in sums:
+                sums[name] += null_club[name]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for name in sums:
+                club[name + '_rand'] = sums[name] / replicates
+                club[name + '_rho'] = club[name] / club[name + '_rand']
+        return club
+
+    @staticmethod
+    def get_core_profile(coreness):
+        """Return the values k of coreness and the number of vertices of
+        each k-core, the vertices with coreness at least k."""
+        ks, counts = np.unique(coreness, return_counts=True)
+        return ks, np.cumsum(counts[::-1])[::-1]
+
+    @staticmethod
+    @profiled('measure:clustering', lambda ret: len(ret['local']))
+    def get_clustering(graph, max_wedges=TRIANGLE_MAX_WEDGES):
+        """Return the clustering coefficients of the graph, see triangles_csr()."""
+        return triangles_csr(Graphs.get_csr(graph), max_wedges)
+
+    @staticmethod
+    @profiled('measure:clustering_estimate', lambda ret: ret['samples'])
+    def get_clustering_estimate(graph, budget, seed=0):
+        """Return the estimate of the clustering of the graph, see
+        wedge_sampling_csr()."""
+        return wedge_sampling_csr(Graphs.get_csr(graph), budget, seed=seed)
+
+    @staticmethod
+    def get_clustering_spectrum(degrees, local):
+        """Return the degrees k > 1, the average local clustering C(k) of the
+        vertices with degree k and their number."""
+        ks, counts = np.unique(degrees[degrees > 1], return_counts=True)
+        sums = np.bincount(degrees, weights=local)
+        return ks, sums[ks] / counts, counts
+
+    @staticmethod
+    def global_measures(graph):
+        """Return the global measures of the graph: number of vertices
+        (n) and edges (m), average degree and its standard deviation,
+        density and clustering coefficient, estimated when a budget of
+        wedges is set."""
+        (deg_avg, deg_stdev) = Graphs.degree_stat(graph)
+        budget = Project().get_clustering_sampling()
+        if budget is None:
+            clustering = Graphs.get_clustering(graph)['global']
+        else:
+            clustering = Graphs.get_clustering_estimate(graph, budget)['global']
+        return {
+            'n': Graphs.size(graph),
+            'm': Graphs.length(graph),
+            'deg_avg': deg_avg,
+            'deg_stdev': deg_stdev,
+            'density': Graphs.density(graph),
+            'clustering': clustering,
+        }
+
+    @staticmethod
+    @profiled('measure:knn', lambda ret: len(ret[0]))
     def get_degree_avg_neighbors(graph):
         """Return the average degrees of vertices of the graph."""
         k2knns = {} # map degree to average neighbor degree average
@@ -203,13 +919,14 @@ class Graphs():
         # 2D arrray containing normalized float values
         # [:,0] is x and [:,1] is y
         vals = np.zeros((size, 2))
+        vprop_degrees = Graphs.get_vprop_degrees(graph)
         for i, vert in enumerate(graph.vertices()):
-            k = vert.out_degree()
+            k = vprop_degrees[vert]
             knn = 0.0 # degree average of neighbors
             for neighbor in vert.out_neighbors():
-                knn += neighbor.out_degree()
-            if vert.out_degree() > 0:
-                knn /= vert.out_degree()
+                knn += vprop_degrees[neighbor]
+            if k > 0:
+                knn /= k
             else:
                 continue
             # Append to 2D array in the form
@@ -277,24 +994,35 @@ class Book():
         self.graph = Graphs.create_graph() # Graph to be created from the book
         self.avg = {} # Dictionary to load average values associated with a centrality as key
         self.was_read = False # if the data file was already parsed, dont do it again
-        # Dictionaries to store graph information
-        # map vertex index and its label
-        self.graph.vertex_properties["label"] = self.graph.new_vertex_property("string")
-        # map vertex 'index' object and its frequency
-        self.graph.vertex_properties["frequency"] = self.graph.new_vertex_property("int")
-        # map edge index and its weight
-        self.graph.edge_properties["weight"] = self.graph.new_edge_property("int")
-        # map vertex index and its character name
-        self.graph.vertex_properties["char_name"] = self.graph.new_vertex_property("string")
-        # map vertex label and its vertex 'index' object
-        self.vprop_l2v = {}
-        # Store a boolean value indicating if vertex PropertyMap containing degree
-        # values was already filled
-        self.graph.graph_properties["was_vprop_degree_set"] = \
-            self.graph.new_graph_property("boolean")
-        self.graph.graph_properties["was_vprop_degree_set"] = False
-        # Store degree non-normalized degree of vertices
-        self.graph.vertex_properties["degree"] = self.graph.new_vertex_property("int")
+        if self.graph is not None: # the books are created on import, graph-tool or not
+            # Dictionaries to store graph information
+            # map vertex 'index' object and its frequency
+            self.graph.vertex_properties["frequency"] = self.graph.new_vertex_property("int")
+            # map edge index and its weight
+            self.graph.edge_properties["weight"] = self.graph.new_edge_property("int")
+            # Store a boolean value indicating if vertex PropertyMap containing degree
+            # values was already filled
+            self.graph.graph_properties["was_vprop_degree_set"] = \
+                self.graph.new_graph_property("boolean")
+            self.graph.graph_properties["was_vprop_degree_set"] = False
+            # Store degree non-normalized degree of vertices
+            self.graph.vertex_properties["degree"] = self.graph.new_vertex_property("int")
+        # labels and character names, the code of a string is the vertex index
+        self.labels = StringTable(interned=True)
+        self.names = StringTable()
+        # Sparse matrix character x encounter group, the entry is the number
+        # of times the character appears in the group
+        self.incidence = None
+        # frequency spectrum and growth of the characters, see get_vocabulary()
+        self.vocabulary = None
+        # False while the edges were not derived from the incidence matrix
+        self.is_projected = True
+        # numbers of vertices and edges dropped by the backbone filter
+        self.backbone_report = None
+        # book measures already computed, by their names
+        self.measures = {}
+        # digest of the data file identifying the book in the store
+        self.content_hash = None
     def __str__(self):
         '''Return the name of the book.'''
         return 'Book'
@@ -304,24 +1032,26 @@ class Book():
         self.graph.graph_properties["name"] = name
     def get_char_label(self, idx):
         """Return the chracter label for the index idx."""
-        return self.graph.vertex_properties["label"][idx]
-    def set_char_label(self, idx, label):
-        """Set a label for character with index idx."""
-        self.graph.vertex_properties["label"][idx] = label
-        self.vprop_l2v[label] = idx
-    def set_char_name(self, idx, char_name):
-        """Set a name for the character with index idx."""
-        self.graph.vertex_properties["char_name"][idx] = char_name
+        return self.labels.get(int(idx))
+    def get_char_name(self, idx):
+        """Return the character name for the index idx."""
+        return self.names.get(int(idx))
     def get_char_idx_from_label(self, label):
         """Return the character index mapped to label."""
-        return self.vprop_l2v[label]
+        return self.labels.get_code(label)
+    def get_label_property(self):
+        """Return a vertex PropertyMap with the labels, e.g., to draw them."""
+        vprop = self.graph.new_vertex_property("string")
+        for vert in self.graph.vertices():
+            vprop[vert] = self.get_char_label(vert)
+        return vprop
     def add_char(self, label, char_name):
         '''Add character labelled with character name in the graph. Map label
         and frequency with index; and character name with label.'''
         vert = self.graph.add_vertex()
         idx = int(vert)
-        self.set_char_label(idx, label)
-        self.set_char_name(idx, char_name)
+        self.labels.add(label)
+        self.names.add(char_name)
         self.graph.vertex_properties["frequency"][idx] = 0
     def inc_freq(self, label):
         """"Increment the frequency of character represented by label."""
@@ -332,13 +1062,14 @@ class Book():
         '''Verify the existence of the label in the dictionary associated with
         the graph. The existence means the label was already inserted in the
         graph G.'''
-        if label in self.vprop_l2v:
+        if label in self.labels:
             return True
         return False
     def degree(self, label):
         """Return the degree of the character represented by label."""
         idx = self.get_char_idx_from_label(label)
-        return self.graph.vertex(idx).out_degree()
+        graph = self.get_graph()
+        return Graphs.get_vprop_degrees(graph)[graph.vertex(idx)]
     def met(self, char_lbl_a, char_lbl_b):
         '''Return True if character label a (char_lbl_a) have met with character
         label b (char_lbl_b), False otherwise.
@@ -373,14 +1104,94 @@ class Book():
         '''Asterisk is used as comment to reflect same convention of SGB (Stanford GraphBase).'''
         return '*'
     def get_file_ext(self):
-        '''Return the default file extension.'''
-        return '.dat'
+        '''Return the default file extension followed by the suffix of
+        the compression format if only a compressed data file exists.'''
+        ext = '.dat'
+        base_name = self.get_data_dir() + self.__str__() + ext
+        if os.path.exists(base_name):
+            return ext
+        for suffix in get_compression_suffixes():
+            if os.path.exists(base_name + suffix):
+                return ext + suffix
+        return ext
     def get_file_name(self):
         '''Return the file name to be read.'''
         return self.get_data_dir() + self.__str__() + self.get_file_ext()
     def get_graph(self):
-        """Return the graph for the current book."""
+        """Return the graph for the current book, deriving its edges from
+        the encounter groups if it was not done yet."""
+        if self.is_projected is False:
+            self.project()
+        level = Project().get_backbone_level()
+        if level is not None and self.backbone_report is None:
+            self.apply_backbone(level)
+        return self.graph
+    def apply_backbone(self, level):
+        """Filter the edges of the graph, keeping the edges significant at
+        level by the disparity filter, so the graph becomes a view of its
+        backbone. The vertices are kept, those left without edges become
+        isolated, so measures normalized by the number of vertices still
+        divide by all of them. Return the numbers of vertices left isolated
+        and of edges dropped."""
+        graph = self.graph
+        edges = graph.get_edges([graph.edge_index, graph.edge_properties["weight"]])
+        edges = edges.astype(np.int64).reshape(-1, 4)
+        significant = Graphs.get_disparity(edges[:, [0, 1, 3]]) < level
+        mask = np.zeros(graph.edge_index_range, dtype=bool)
+        mask[edges[:, 2]] = significant
+        graph.edge_properties["backbone"] = graph.new_edge_property("bool")
+        graph.edge_properties["backbone"].a = mask
+        graph.set_edge_filter(graph.edge_properties["backbone"])
+        graph.graph_properties["was_vprop_degree_set"] = False # degrees of the backbone
+        linked = np.unique(edges[:, :2])
+        kept = np.unique(edges[significant, :2])
+        self.backbone_report = (len(linked) - len(kept), len(edges) - int(significant.sum()))
+        print('* Backbone of {} at level {}: left {} of {} vertices isolated and '
+              'dropped {} of {} edges'.format(
+            self.get_name(), level, self.backbone_report[0], graph.num_vertices(),
+            self.backbone_report[1], len(edges)))
+        return self.backbone_report
+    @contextlib.contextmanager
+    def whole_graph(self):
+        """Read the book and give its whole graph inside the context, the
+        edges left out by the backbone filter included."""
+        graph = self.read()
+        if self.backbone_report is None:
+            yield graph
+            return
+        graph.set_edge_filter(None)
+        graph.graph_properties["was_vprop_degree_set"] = False
+        try:
+            yield graph
+        finally:
+            graph.set_edge_filter(graph.edge_properties["backbone"])
+            graph.graph_properties["was_vprop_degree_set"] = False
+    @profiled(lambda self: 'project:' + self.get_name(), lambda graph: graph.num_edges())
+    def project(self):
+        """Add to the graph the edges between characters that met, weighted
+        by the number of encounters, from the upper triangle of the product
+        of the incidence matrix by its transpose. A character repeated in a
+        group meets itself, as when the pairs are expanded while reading."""
+        inc = self.incidence
+        loops = np.asarray((inc.multiply(inc) - inc).sum(axis=1)).ravel() // 2
+        cooc = (sparse.triu(inc @ inc.T, k=1) + sparse.diags(loops, dtype=inc.dtype)).tocoo()
+        cooc.eliminate_zeros()
+        self.graph.add_edge_list(np.column_stack((cooc.row, cooc.col, cooc.data)),
+                                 eprops=[self.graph.edge_properties["weight"]])
+        self.is_projected = True
         return self.graph
+    def get_group_sizes(self):
+        """Return the number of characters in each encounter group, None
+        if the groups are not available (e.g., archived books)."""
+        if self.incidence is None:
+            return None
+        return np.asarray(self.incidence.sum(axis=0)).ravel()
+    def get_participation(self):
+        """Return the number of encounter groups of each character, None
+        if the groups are not available (e.g., archived books)."""
+        if self.incidence is None:
+            return None
+        return np.diff(self.incidence.indptr)
     def get_label(self):
         """Format the label of the book to print in table or plot."""
         return '\\emph{' + self.get_raw_book_label() + '}'
@@ -391,29 +1202,63 @@ class Book():
         """Return the number of characters."""
         assert self.graph
         return self.graph.num_vertices()
+    @profiled(lambda self: None if self.vocabulary is not None
+              else 'vocabulary:' + self.get_name())
+    def get_vocabulary(self):
+        """Return the frequency spectrum of the characters, 'spectrum'[m] is
+        the number of characters appearing m times, and the growth of the
+        number of distinct characters, 'characters', with the number of
+        appearances, 'appearances', after each encounter group in the order
+        of the chapters. The growth is None if the groups are not available."""
+        if self.vocabulary is not None:
+            return self.vocabulary
+        assert self.graph
+        freq = np.asarray(self.graph.vertex_properties['frequency'].a, dtype=np.int64)
+        vocab = {'spectrum': np.bincount(freq), 'appearances': None, 'characters': None}
+        inc = self.incidence
+        if inc is not None and inc.nnz > 0:
+            # first group of each character that appears
+            starts = inc.indptr[:-1][np.diff(inc.indptr) > 0]
+            firsts = np.minimum.reduceat(inc.indices, starts)
+            vocab['appearances'] = np.cumsum(self.get_group_sizes())
+            vocab['characters'] = np.cumsum(np.bincount(firsts, minlength=inc.shape[1]))
+        self.vocabulary = vocab
+        return vocab
+    def get_number_legomenas(self, freq):
+        """Return the number of characters appearing freq times."""
+        spectrum = self.get_vocabulary()['spectrum']
+        return int(spectrum[freq]) if freq < len(spectrum) else 0
     def get_number_hapax_legomenas(self):
         """
         _Hapax_ _Legomena_ are words with occurrence frequency equals to one.
         """
-        assert self.graph
-        nr_hapaxes = 0
-        for vert in self.graph.vertices():
-            freq = self.graph.vertex_properties['frequency'][vert]
-            if freq == 1:
-                nr_hapaxes += 1
-        return nr_hapaxes
+        return self.get_number_legomenas(1)
 
     def get_number_dis_legomenas(self):
         """
         _Dis_ _Legomena_ are words with occurrence frequency equals to two.
         """
-        assert self.graph
-        nr_dis = 0
-        for vert in self.graph.vertices():
-            freq = self.graph.vertex_properties['frequency'][vert]
-            if freq == 2:
-                nr_dis += 1
-        return nr_dis
+        return self.get_number_legomenas(2)
+    def get_content_hash(self):
+        """Return the SHA-1 digest of the content of the data file."""
+        digest = hashlib.sha1()
+        with open_stream(self.get_file_name(), 'r') as _file:
+            for line in _file:
+                digest.update(line.encode('utf-8'))
+        return digest.hexdigest()
+    def get_file_stamp(self):
+        """Return the modification time and the size of the data file, they
+        change when the file is edited, or None if it does not exist."""
+        try:
+            stat = os.stat(self.get_file_name())
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    def reload(self):
+        """Forget the graph of the book and its digest, and read its data
+        file again."""
+        Book.__init__(self)
+        return self.read()
     def get_raw_book_label(self):
         """Return the book label in uppercase."""
         return self.__str__().title()
@@ -429,17 +1274,42 @@ class Book():
         -------
         a graph
         """
+        self.parse()
+        return self.get_graph()
+
+    @profiled(lambda self: None if self.was_read else 'read:' + self.get_name(),
+              lambda n_groups: n_groups)
+    def parse(self):
+        """
+        Parse the file containing characters encounters of a book,
+        storing the encounter groups in the incidence matrix. Unless
+        the graph is derived lazily, the edges are added to the graph
+        for each pair of characters in a group.
+        Returns
+        -------
+        the number of encounter groups
+        """
         are_edges = False
+        tracing = Tracer.enabled
+        lazy = Project().get_lazy_projection()
         book_name = self.get_name().title()
+        codes = self.labels.get_codes() # label to character index
+        inc_rows = [] # character index of each entry of the incidence matrix
+        inc_cols = [] # group index of each entry of the incidence matrix
+        n_groups = 0
+        pairs = {} # pair of character indexes (lowest first) to edge index
+        sources = [] # edges in order of the first encounter
+        targets = []
+        weights = []
         # assert data file is not read several times
         if self.was_read is False:
             self.was_read = True
         else:
-            return self.graph
+            return None
         # set graph name
         self.set_graph_name(self.get_name())
         file_name = self.get_file_name()
-        _file = open(file_name, "r")
+        _file = open_stream(file_name, "r")
         u_vert = 'AA' # store old vertex label and it is used to check it the order is right
         for line in _file:
             # ignore comments
@@ -460,9 +1330,6 @@ class Book():
                                  out of order in %s',
                                  u_vert, v_vert, book_name)
                     exit()
-                #DEBUG
-                LOGGER.debug("* G.add_vertice(%s, name=%s)", v_vert, character_name)
-                #GUBED
                 if not self.exists(v_vert):
                     self.add_char(v_vert, character_name)
                     u_vert = v_vert
@@ -480,36 +1347,55 @@ class Book():
             for edge in edges:
                 # eg., split "ST,PH,MA" => ["ST", "PH", "MA"]
                 verts = edge.split(',')  # vertices
-                # add vertices to graph G if it does not exit
-                # otherwise, increment frequency
-                for v_vert in verts:
-                    if not self.exists(v_vert):
-                        LOGGER.error('* Label \"%s\" was not added \
-                                     as node in the graph for book %s.',
-                                     v_vert, book_name)
-                        exit()
-                    else:
-                        self.inc_freq(v_vert)
+                # translate labels to character indexes, the frequencies
+                # are the sums of the rows of the incidence matrix
+                try:
+                    members = [codes[v_vert] for v_vert in verts]
+                except KeyError as err:
+                    LOGGER.error('* Label \"%s\" was not added \
+                                 as node in the graph for book %s.',
+                                 err.args[0], book_name)
+                    exit()
+                inc_rows.extend(members)
+                inc_cols.extend([n_groups] * len(members))
+                n_groups += 1
+                if tracing:
+                    Tracer.add('groups')
+                    Tracer.add('pairs', len(verts)*(len(verts)-1)//2)
+                if lazy:
+                    continue
                 # add characters encounters (edges) to graph G
-                for i, u_vert in enumerate(verts):
-                    for j in range(i+1, len(verts)):
-                        v_vert = verts[j]
+                for i, u_idx in enumerate(members):
+                    for j in range(i+1, len(members)):
+                        v_idx = members[j]
+                        pair = (u_idx, v_idx) if u_idx <= v_idx else (v_idx, u_idx)
+                        edge = pairs.get(pair)
                         # link u--v
-                        if not self.met(u_vert, v_vert):
-                            self.add_encounter(u_vert, v_vert)
+                        if edge is None:
+                            pairs[pair] = len(weights)
+                            sources.append(u_idx)
+                            targets.append(v_idx)
+                            weights.append(1)
+                            if tracing:
+                                Tracer.event('new_edges', '* %s: G.add_edge(%s, %s)',
+                                             book_name, verts[i], verts[j])
                         else: # u--v already in G, increase weight
-                            self.inc_weight(u_vert, v_vert)
-                        #DEBUG
-                        action = 'add'
-                        w_vert = self.get_weight(u_vert, v_vert)
-                        if w_vert > 1:
-                            action = 'mod'
-                        LOGGER.debug('* G.%s_edge(%s, %s, weight=%s)',
-                                     action, u_vert, v_vert, w_vert)
-                        #GUBED
+                            weights[edge] += 1
+                            if tracing:
+                                Tracer.event('weight_increments', '* %s: G.mod_edge(%s, %s)',
+                                             book_name, verts[i], verts[j])
         _file.close()
+        self.incidence = sparse.csr_matrix((np.ones(len(inc_rows), dtype=np.int32),
+                                            (inc_rows, inc_cols)),
+                                           shape=(self.graph.num_vertices(), n_groups))
+        self.graph.vertex_properties["frequency"].a = \
+            np.asarray(self.incidence.sum(axis=1)).ravel()
+        if weights:
+            self.graph.add_edge_list(np.column_stack((sources, targets, weights)),
+                                     eprops=[self.graph.edge_properties["weight"]])
+        self.is_projected = not lazy
         LOGGER.info("* Read G from book \"%s\"", book_name)
-        return self.graph
+        return n_groups
 
 class Acts(Book, Charnet):
     """Data about Acts of Apostles gospel."""
@@ -667,9 +1553,58 @@ class Tolkien(Book, Charnet):
         """Return the color to fill the vertex."""
         return 'yellowgreen'
 
+def get_book_name(file_name):
+    """Return the book name from the data file name, e.g.,
+    "data/acts.dat.gz" => "acts"."""
+    name = os.path.basename(file_name)
+    for suffix in get_compression_suffixes():
+        if name.endswith(suffix):
+            name = name[:-len(suffix)]
+    if name.endswith('.dat'):
+        name = name[:-len('.dat')]
+    return name
+
+def list_data_files(directory):
+    """Return the sorted names of data files, compressed or not,
+    found in the directory."""
+    exts = ['.dat'] + ['.dat' + suffix for suffix in get_compression_suffixes()]
+    file_names = []
+    for name in sorted(os.listdir(directory)):
+        if any(name.endswith(ext) for ext in exts):
+            file_names.append(os.path.join(directory, name))
+    return file_names
+
+class BookFile(Book, Project):
+    """Book whose data file, genre and vertex color are set when the
+    object is created instead of being coded in a subclass."""
+    def __init__(self, file_name, genre=None, color='white', name=None):
+        Book.__init__(self)
+        Project.__init__(self)
+        self.file_name = file_name
+        self.genre = genre
+        self.color = color
+        self.name = name
+        if name is None:
+            self.name = get_book_name(file_name)
+    def __str__(self):
+        return self.name
+    def get_data_dir(self):
+        """Directory containing the data file."""
+        return os.path.join(os.path.dirname(self.file_name), '')
+    def get_file_name(self):
+        return self.file_name
+    def get_genre(self):
+        return self.genre
+    def get_vertex_color(self):
+        """Return the color to fill the vertex."""
+        return self.color
+
 class Books(Book):
     """Books class joins in place books data."""
     was_already_read = False
+    was_already_listed = False
+    # Registry to discover the books, if None the books below are used.
+    registry = None
     books = [             # row, col
         Dick(),       #  0,  0
         Apollonius(), #  1,  1
@@ -686,41 +1621,1641 @@ class Books(Book):
     ]
     genre_names = ['Biography', 'Legendary', 'Fiction']
 
-    @staticmethod
-    def get_genre_label(book):
-        """Given a genre ID, return its letter label."""
-        lab = None
-        gen = book.get_genre()
-        if gen == BookGenre.BIOGRAPHY:
-            lab = 'B'
-        elif gen == BookGenre.LEGENDARY:
-            lab = 'L'
-        elif gen == BookGenre.FICTION:
-            lab = 'F'
-        else:
-            LOGGER.error('* Unknown book: \"%s\"', book.get_name())
-            exit()
-        return lab
+    @staticmethod
+    def get_genre_label(book):
+        """Given a genre ID, return its letter label."""
+        lab = None
+        gen = book.get_genre()
+        if gen == BookGenre.BIOGRAPHY:
+            lab = 'B'
+        elif gen == BookGenre.LEGENDARY:
+            lab = 'L'
+        elif gen == BookGenre.FICTION:
+            lab = 'F'
+        else: # e.g., a book found by the registry without genre
+            lab = '?'
+        return lab
+
+    @staticmethod
+    def get_genre_name(idx):
+        """Given a genre ID, return its name."""
+        return Books.genre_names[idx]
+
+    @staticmethod
+    def get_genre_enums():
+        """Get the genres IDs"""
+        return np.arange(0, len(Books.genre_names))
+
+    @staticmethod
+    def find(name):
+        """Return the book named name or None if it is unknown."""
+        for book in Books.books:
+            if book.get_name() == name:
+                return book
+        return None
+
+    @staticmethod
+    def set_books(books):
+        """Replace the books to be processed."""
+        Books.books = books
+        Books.registry = None
+        Books.was_already_read = False
+
+    @staticmethod
+    @contextlib.contextmanager
+    def restricted(names):
+        """Process only the books named names inside the context."""
+        books = Books.books
+        Books.books = [book for book in Books.list_books() if book.get_name() in names]
+        try:
+            yield Books.books
+        finally:
+            Books.books = books
+
+    @staticmethod
+    def set_registry(registry):
+        """Discover the books to be processed using the registry."""
+        Books.registry = registry
+        Books.was_already_read = False
+        Books.was_already_listed = False
+
+    @staticmethod
+    def iter_entries():
+        """Yield the entries describing the books, they are lighter than
+        the books and can be sent to worker processes."""
+        if Books.registry is not None:
+            yield from Books.registry.entries()
+            return
+        for book in Books.books:
+            if isinstance(book, ArchivedBook):
+                yield ArchiveEntry(book.archive.file_name, book.get_name())
+            else:
+                yield BookEntry(book.get_name(), book.get_file_name())
+
+    @staticmethod
+    def iter_books():
+        """Yield the books one by one, each book is created and read
+        just before it is yielded, so the caller decides how many graphs
+        are kept in memory."""
+        books = Books.books
+        if Books.registry is not None:
+            books = iter(Books.registry)
+        for book in books:
+            book.parse()
+            yield book
+
+    @staticmethod
+    def list_books():
+        """Return the books without reading their data files."""
+        if Books.registry is not None and Books.was_already_listed is False:
+            Books.was_already_listed = True
+            Books.books = list(Books.registry)
+        return Books.books
+
+    @staticmethod
+    def get_books():
+        """Return the books data."""
+        if Books.was_already_read is False:
+            Books.list_books()
+            Books.was_already_read = True
+            LOGGER.info("\n\t#### PRE-PROCESSING ####")
+            for book in Books.get_books():
+                book.parse()
+        return Books.books
+
+###########
+# ARCHIVE #
+###########
+# A corpus archive packs the compiled records of many books in a
+# single file. The file starts with a magic number and the size of
+# the header, followed by the header, an index written in JSON with
+# name, genre, color, byte offset and length of each book record.
+# The records come after the header (offsets are counted from the end
+# of the header) and contain only binary arrays:
+#
+#   | label offsets | name offsets | frequency | source | target | weight | labels | names |
+#
+# where the offsets are int64 arrays of length n+1 into the contiguous
+# utf-8 buffers of labels and names, and the other arrays are int32.
+# The archive is memory-mapped, so loading a book is a seek to its
+# record and the arrays are read without any parsing.
+
+ARCHIVE_MAGIC = b'CHARNET\x01'
+ARCHIVE_ALIGN = 8
+
+def align(offset, boundary=ARCHIVE_ALIGN):
+    """Round offset up to the next multiple of boundary."""
+    return (offset + boundary - 1) // boundary * boundary
+
+def compile_record(book):
+    """Return the binary record of the book and the counts of vertices
+    and edges and lengths of the string buffers to index it. The whole
+    graph is written, without the backbone filter."""
+    with book.whole_graph() as graph:
+        verts = list(graph.vertices())
+        freqs = np.array([graph.vertex_properties["frequency"][v] for v in verts],
+                         dtype=np.int32)
+        edges = graph.get_edges([graph.edge_properties["weight"]]).astype(np.int32)
+    labels, label_offs = book.labels.get_buffer()
+    names, name_offs = book.names.get_buffer()
+    parts = [label_offs.tobytes(), name_offs.tobytes(), freqs.tobytes(),
+             np.ascontiguousarray(edges[:, 0]).tobytes(),
+             np.ascontiguousarray(edges[:, 1]).tobytes(),
+             np.ascontiguousarray(edges[:, 2]).tobytes(),
+             labels, names]
+    info = {'n': len(verts), 'm': len(edges),
+            'labels': len(labels), 'names': len(names)}
+    return b''.join(parts), info
+
+class CorpusArchive():
+    """Memory-mapped single file containing many books."""
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self._file = open(file_name, 'rb')
+        self.buf = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.buf[:len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC:
+            LOGGER.error('* File %s is not a corpus archive.', file_name)
+            exit()
+        (header_len,) = struct.unpack_from('<Q', self.buf, len(ARCHIVE_MAGIC))
+        header_off = len(ARCHIVE_MAGIC) + 8
+        self.index = json.loads(self.buf[header_off:header_off+header_len].decode('utf-8'))
+        self.data_offset = align(header_off + header_len)
+        self.entries = {}
+        for entry in self.index:
+            self.entries[entry['name']] = entry
+
+    def close(self):
+        """Release the memory map and the file."""
+        self.buf.close()
+        self._file.close()
+
+    def get_names(self):
+        """Return the name of the books in the archive."""
+        return [entry['name'] for entry in self.index]
+
+    def get_entry(self, name):
+        """Return the index entry of the book."""
+        if name not in self.entries:
+            LOGGER.error('* Book %s is not in archive %s.', name, self.file_name)
+            exit()
+        return self.entries[name]
+
+    def get_record(self, name):
+        """Return the arrays of the book record as views of the memory map."""
+        entry = self.get_entry(name)
+        n_verts, n_edges = entry['n'], entry['m']
+        off = self.data_offset + entry['offset']
+        rec = {}
+        for (key, dtype, count) in [('label_offs', np.int64, n_verts + 1),
+                                    ('name_offs', np.int64, n_verts + 1),
+                                    ('frequency', np.int32, n_verts),
+                                    ('source', np.int32, n_edges),
+                                    ('target', np.int32, n_edges),
+                                    ('weight', np.int32, n_edges)]:
+            rec[key] = np.frombuffer(self.buf, dtype=dtype, count=count, offset=off)
+            off += rec[key].nbytes
+        rec['labels'] = memoryview(self.buf)[off:off+entry['labels']]
+        off += entry['labels']
+        rec['names'] = memoryview(self.buf)[off:off+entry['names']]
+        return rec
+
+    def get_record_bytes(self, name):
+        """Return the bytes of the book record."""
+        entry = self.get_entry(name)
+        off = self.data_offset + entry['offset']
+        return self.buf[off:off+entry['length']]
+
+    def get_books(self):
+        """Return the books in the archive, they are loaded when read."""
+        return [ArchivedBook(self, name) for name in self.get_names()]
+
+    @staticmethod
+    def pack(directory, file_name):
+        """Pack all books found in the directory by the registry in the
+        archive file_name. The records are written to a temporary file while the index is
+        built and copied after the header."""
+        index = []
+        offset = 0
+        with tempfile.TemporaryFile() as records:
+            for entry in BookRegistry.entries_from_directory(directory):
+                book = entry.make_book()
+                record, info = compile_record(book)
+                genre = book.get_genre()
+                info.update({'name': book.get_name(),
+                             'genre': genre.name if genre is not None else None,
+                             'color': book.get_vertex_color(),
+                             'offset': offset,
+                             'length': len(record)})
+                index.append(info)
+                records.write(record)
+                pad = align(len(record)) - len(record)
+                records.write(b'\0' * pad)
+                offset += len(record) + pad
+            header = json.dumps(index).encode('utf-8')
+            records.seek(0)
+            with open(file_name, 'wb') as _file:
+                _file.write(ARCHIVE_MAGIC)
+                _file.write(struct.pack('<Q', len(header)))
+                _file.write(header)
+                head_len = len(ARCHIVE_MAGIC) + 8 + len(header)
+                _file.write(b'\0' * (align(head_len) - head_len))
+                shutil.copyfileobj(records, _file)
+        LOGGER.info('* Packed %d books from %s in %s', len(index), directory, file_name)
+
+class ArchiveEntry():
+    """Entry of a book in a corpus archive, it can be sent to worker
+    processes that open the archive once."""
+    # map archive file name and archive opened in this process
+    archives = {}
+    def __init__(self, archive_file, name):
+        self.archive_file = archive_file
+        self.name = name
+    def make_book(self):
+        """Return the book, its record is not loaded yet."""
+        if self.archive_file not in ArchiveEntry.archives:
+            ArchiveEntry.archives[self.archive_file] = CorpusArchive(self.archive_file)
+        return ArchivedBook(ArchiveEntry.archives[self.archive_file], self.name)
+
+class ArchivedBook(Book):
+    """Book loaded from its compiled record in a corpus archive."""
+    def __init__(self, archive, name):
+        Book.__init__(self)
+        self.archive = archive
+        self.entry = archive.get_entry(name)
+    def __str__(self):
+        return self.entry['name']
+    def get_data_dir(self):
+        """Directory containing the archive."""
+        return os.path.join(os.path.dirname(self.archive.file_name), '')
+    def get_file_name(self):
+        return self.archive.file_name
+    def get_genre(self):
+        if self.entry['genre'] is None:
+            return None
+        return BookGenre[self.entry['genre']]
+    def get_vertex_color(self):
+        """Return the color to fill the vertex."""
+        return self.entry['color']
+    def get_content_hash(self):
+        return hashlib.sha1(self.archive.get_record_bytes(self.get_name())).hexdigest()
+    @profiled(lambda self: None if self.was_read else 'read:' + self.get_name(),
+              lambda n_edges: n_edges)
+    def parse(self):
+        """Build the graph from the arrays of the book record, the encounter
+        groups are not kept in records. Return the number of edges."""
+        if self.was_read is True:
+            return None
+        self.was_read = True
+        self.set_graph_name(self.get_name())
+        rec = self.archive.get_record(self.get_name())
+        self.labels = StringTable.from_buffer(rec['labels'], rec['label_offs'], True)
+        self.names = StringTable.from_buffer(rec['names'], rec['name_offs'])
+        self.graph.add_vertex(len(self.labels))
+        self.graph.vertex_properties["frequency"].a = rec['frequency']
+        self.graph.add_edge_list(np.column_stack((rec['source'], rec['target'],
+                                                  rec['weight'])),
+                                 eprops=[self.graph.edge_properties["weight"]])
+        LOGGER.info("* Read G from archived book \"%s\"", self.get_name().title())
+        return len(rec['weight'])
+
+############
+# REGISTRY #
+############
+# The registry discovers books from manifest files or from the
+# comments in the header of data files, so adding a book does not
+# require a new class. A manifest is a CSV file with a header line
+# naming the columns "name", "genre", "color" and "path", the path of
+# the data file being relative to the manifest. The header comments
+# of data files are written as "* <key>: <value>", e.g.,
+#
+#   * genre: fiction
+#   * color: khaki
+#
+# When the genre or the color are not found, the values of the book
+# with the same name coded in this module are used.
+
+# Name of the manifest file looked up in directories.
+MANIFEST_FILE_NAME = 'books.csv'
+
+# Keys in the header comments of data files.
+HEADER_KEYS = ['name', 'genre', 'color']
+
+def parse_genre(text):
+    """Return the genre ID written as text, e.g., "fiction"."""
+    if not text:
+        return None
+    try:
+        return BookGenre[text.strip().upper()]
+    except KeyError:
+        LOGGER.error('* Unknown genre: \"%s\"', text)
+        exit()
+
+def read_header_comments(file_name, comment_token='*'):
+    """Return the metadata written as "key: value" in the comments at
+    the beginning of the data file. Only the header is read."""
+    meta = {}
+    with open_stream(file_name, 'r') as _file:
+        for line in _file:
+            if not line.startswith(comment_token):
+                break
+            (key, sep, value) = line[len(comment_token):].partition(':')
+            key = key.strip().lower()
+            if sep and key in HEADER_KEYS:
+                meta[key] = value.strip()
+    return meta
+
+class BookEntry():
+    """Metadata of a book discovered by the registry."""
+    def __init__(self, name, file_name, genre=None, color=None):
+        known = Books.find(name)
+        if genre is None and known is not None:
+            genre = known.get_genre()
+        if color is None:
+            color = 'white'
+            if known is not None:
+                color = known.get_vertex_color()
+        self.name = name
+        self.file_name = file_name
+        self.genre = genre
+        self.color = color
+    def make_book(self):
+        """Return the book, its data file is not read yet."""
+        return BookFile(self.file_name, self.genre, self.color, self.name)
+
+class BookRegistry():
+    """Discover books lazily from directories and manifest files."""
+    def __init__(self, paths=None):
+        self.paths = []
+        for path in paths or []:
+            self.add(path)
+
+    def add(self, path):
+        """Add a directory or a manifest file to look up books."""
+        if not os.path.exists(path):
+            LOGGER.error(' Path \"%s\" does not exists!', path)
+            exit()
+        self.paths.append(path)
+
+    @staticmethod
+    def entries_from_manifest(file_name):
+        """Yield the entries listed in the manifest."""
+        directory = os.path.dirname(file_name)
+        with open(file_name, newline='') as _file:
+            for row in csv.DictReader(_file):
+                data_file = os.path.join(directory, row['path'])
+                name = row.get('name') or get_book_name(data_file)
+                yield BookEntry(name, data_file, parse_genre(row.get('genre')),
+                                row.get('color') or None)
+
+    @staticmethod
+    def entries_from_directory(directory):
+        """Yield the entries of the data files in the directory, using its
+        manifest when there is one."""
+        manifest = os.path.join(directory, MANIFEST_FILE_NAME)
+        if os.path.exists(manifest):
+            yield from BookRegistry.entries_from_manifest(manifest)
+            return
+        for data_file in list_data_files(directory):
+            meta = read_header_comments(data_file)
+            yield BookEntry(meta.get('name', get_book_name(data_file)), data_file,
+                            parse_genre(meta.get('genre')), meta.get('color'))
+
+    def entries(self):
+        """Yield the entries of all books found in the registry paths."""
+        for path in self.paths:
+            if os.path.isdir(path):
+                yield from BookRegistry.entries_from_directory(path)
+            else:
+                yield from BookRegistry.entries_from_manifest(path)
+
+    def __iter__(self):
+        for entry in self.entries():
+            yield entry.make_book()
+
+#########
+# BATCH #
+#########
+# Corpus-wide measures are computed out-of-core: the books are
+# streamed through worker processes, each one keeping a single graph
+# in memory, and the row of results of each book is appended to a
+# table on disk as soon as it is done. A checkpoint file lists the
+# books whose rows were written, so an interrupted run resumes where
+# it stopped.
+
+# Centralities summarized in the table of results.
+BATCH_CENTRALITIES = [Measure.BETWEENNESS, Measure.CLOSENESS,
+                      Measure.DEGREE_CENTRALITY, Measure.LOBBY]
+
+# Columns of the table of results.
+BATCH_FIELDS = ['book', 'genre', 'n', 'm', 'deg_avg', 'deg_stdev', 'density', 'clustering'] \
+    + [num.name.lower() + suf for num in BATCH_CENTRALITIES for suf in ['_mean', '_max']]
+
+def get_batch_row(entry):
+    """Read the book described by entry and return its row of results,
+    or None if the book could not be read or measured."""
+    try:
+        book = entry.make_book()
+        graph = book.read()
+        row = Graphs.global_measures(graph)
+        genre = book.get_genre()
+        row['book'] = book.get_name()
+        row['genre'] = genre.name.lower() if genre is not None else ''
+        for num in BATCH_CENTRALITIES:
+            vals = np.array(Graphs.get_centrality_values(graph, num), dtype=float)
+            if len(vals) == 0: # a book without characters
+                row[num.name.lower() + '_mean'] = row[num.name.lower() + '_max'] = float('nan')
+                continue
+            row[num.name.lower() + '_mean'] = np.nanmean(vals)
+            row[num.name.lower() + '_max'] = np.nanmax(vals)
+    except (Exception, SystemExit) as err: # the parser exit()s on errors
+        LOGGER.error('* Book "%s" was skipped: %s', entry.name, err)
+        return None
+    return row
+
+class BatchRun():
+    """Stream books through the measures and append their results to
+    a table with fields separated by CSV_FIELDS_SEPARATOR, quoted by the
+    csv module when needed (e.g., book names with commas)."""
+    def __init__(self, file_name, workers=1):
+        self.file_name = file_name
+        self.checkpoint_name = file_name + '.ckpt'
+        self.workers = workers
+
+    def get_done(self):
+        """Return the names of books listed in the checkpoint."""
+        if not os.path.exists(self.checkpoint_name):
+            return set()
+        with open(self.checkpoint_name) as _file:
+            return set(line.rstrip('\n') for line in _file if line.endswith('\n'))
+
+    def restore(self, done):
+        """Keep in the table only the header and the rows of books in the
+        checkpoint, dropping rows written after the last checkpoint."""
+        if not os.path.exists(self.file_name):
+            return
+        tmp_name = self.file_name + '.tmp'
+        with open(self.file_name, newline='') as src, open(tmp_name, 'w', newline='') as dst:
+            for i, line in enumerate(src):
+                if not line.endswith('\n'):
+                    break
+                row = next(csv.reader([line], delimiter=CSV_FIELDS_SEPARATOR), [''])
+                if i == 0 or row[0] in done:
+                    dst.write(line)
+        os.replace(tmp_name, self.file_name)
+
+    def run(self, entries):
+        """Compute the measures of the books described by entries, skipping
+        the books already done."""
+        done = self.get_done()
+        self.restore(done)
+        is_new = not os.path.exists(self.file_name) or os.path.getsize(self.file_name) == 0
+        pending = (entry for entry in entries if entry.name not in done)
+        LOGGER.info('* Batch run: %d books already done in %s', len(done), self.file_name)
+        pool = None
+        if self.workers > 1:
+            pool = MP_CONTEXT.Pool(self.workers)
+            rows = pool.imap_unordered(get_batch_row, pending)
+        else:
+            rows = map(get_batch_row, pending)
+        count = skipped = 0
+        with open(self.file_name, 'a', newline='') as results, \
+             open(self.checkpoint_name, 'a') as ckpt:
+            writer = csv.writer(results, delimiter=CSV_FIELDS_SEPARATOR, lineterminator='\n')
+            if is_new:
+                writer.writerow(BATCH_FIELDS)
+            try:
+                for row in rows:
+                    if row is None: # not checkpointed, tried again on resume
+                        skipped += 1
+                        continue
+                    writer.writerow([row[field] for field in BATCH_FIELDS])
+                    results.flush()
+                    os.fsync(results.fileno())
+                    ckpt.write(row['book'] + '\n')
+                    ckpt.flush()
+                    os.fsync(ckpt.fileno())
+                    count += 1
+                    LOGGER.info('* [%d] Wrote results of book "%s"', count, row['book'])
+            finally:
+                if pool is not None:
+                    pool.terminate()
+                    pool.join()
+        if skipped > 0:
+            LOGGER.warning('* Batch run: %d books were skipped, see the errors above', skipped)
+        print('* Wrote ' + self.file_name)
+
+#########
+# CHECK #
+#########
+# The check mode validates the data files without building graphs,
+# reporting every problem found with its file and line instead of
+# stopping at the first one as Book.parse() does. Each file is read
+# once in a worker process, so the time is proportional to the total
+# size of the files. The problems are the kinds in CHECK_PROBLEMS, the
+# ones in CHECK_ERRORS stop the parser; malformed chapter ids and
+# characters repeated in a group (read as self-loops) do not.
+
+# Kinds of problems found in data files.
+CHECK_PROBLEMS = ['malformed', 'order', 'duplicate', 'chapter', 'empty-group',
+                  'unknown', 'self-encounter']
+CHECK_ERRORS = ['malformed', 'order', 'duplicate', 'empty-group', 'unknown']
+
+# Identifier of a chapter, e.g., "1.2".
+CHAPTER_ID = re.compile(r'^\d+(\.\d+)*$')
+
+def check_data_file(entry, comment_token='*'):
+    """Return the data file of the book described by entry and the list of
+    problems found in it, each one a tuple (line number, kind, message)."""
+    problems = []
+    labels = set()
+    are_edges = False
+    u_vert = 'AA' # previous label, the labels are in increasing order
+    with open_stream(entry.file_name, 'r') as _file:
+        for line_no, line in enumerate(_file, 1):
+            if line.startswith(comment_token):
+                continue
+            if line.startswith('\n') or line.startswith('\r'):
+                are_edges = True
+                continue
+            line = line.rstrip('\r\n')
+            if are_edges is False:
+                if ' ' not in line:
+                    problems.append((line_no, 'malformed', 'character without name'))
+                    continue
+                v_vert = line.split(' ', 1)[0]
+                if v_vert in labels:
+                    problems.append((line_no, 'duplicate', 'label ' + v_vert + ' is repeated'))
+                    continue
+                if u_vert > v_vert:
+                    problems.append((line_no, 'order',
+                                     'label ' + v_vert + ' comes after ' + u_vert))
+                labels.add(v_vert)
+                u_vert = v_vert
+                continue
+            if ':' not in line:
+                problems.append((line_no, 'malformed', 'chapter without \":\"'))
+                continue
+            (chapter, groups) = line.split(':', 1)
+            if CHAPTER_ID.match(chapter) is None:
+                problems.append((line_no, 'chapter', 'chapter id \"' + chapter + '\" is malformed'))
+            if groups == '': # chapter with no encounters
+                continue
+            for group_no, group in enumerate(groups.split(';'), 1):
+                if group == '':
+                    problems.append((line_no, 'empty-group', 'group ' + str(group_no) + ' is empty'))
+                    continue
+                seen = set()
+                for label in group.split(','):
+                    if label not in labels:
+                        problems.append((line_no, 'unknown', 'label \"' + label + '\" in group '
+                                         + str(group_no) + ' is unknown'))
+                    elif label in seen:
+                        problems.append((line_no, 'self-encounter', 'label ' + label
+                                         + ' is repeated in group ' + str(group_no)))
+                    seen.add(label)
+    return entry.file_name, problems
+
+class Checker():
+    """Check the data files of books in parallel."""
+    def __init__(self, workers=1):
+        self.workers = workers
+
+    def run(self, entries):
+        """Print the problems of the data files of the books described by
+        entries, and return the number of errors."""
+        entries = list(entries)
+        for entry in entries:
+            if not isinstance(entry, BookEntry):
+                LOGGER.warning('* Archived book \"%s\" is not checked', entry.name)
+        entries = [entry for entry in entries if isinstance(entry, BookEntry)]
+        pool = None
+        if self.workers > 1 and len(entries) > 1:
+            pool = MP_CONTEXT.Pool(min(self.workers, len(entries)))
+            results = pool.imap_unordered(check_data_file, entries)
+        else:
+            results = map(check_data_file, entries)
+        counts = dict.fromkeys(CHECK_PROBLEMS, 0)
+        n_files = 0
+        try:
+            for (file_name, problems) in results:
+                n_files += 1
+                for (line_no, kind, message) in problems:
+                    print('{}:{}: {}: {}'.format(file_name, line_no, kind, message))
+                    counts[kind] += 1
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        print('* Checked {} data files: {} problems'.format(n_files, sum(counts.values()))
+              + ''.join(', {} {}'.format(count, kind) for kind, count in counts.items() if count))
+        return sum(counts[kind] for kind in CHECK_ERRORS)
+
+##########
+# SHARED #
+##########
+# The arrays of a graph in compressed sparse row format (see
+# Graphs.get_csr()) are exported to shared memory blocks, so worker
+# processes compute measures of the same book reading the arrays in
+# place instead of receiving a pickled copy of the graph. The workers
+# receive a spec, a small dictionary with the names, types and shapes
+# of the blocks, attach to the blocks and view them as numpy arrays.
+# The process that exported a graph unlinks its blocks when the graph
+# is closed or, at the latest, at exit; if the process is killed, the
+# resource tracker of multiprocessing unlinks the blocks left behind.
+# Workers must be forked after the export, so they share the tracker.
+
+class SharedGraph():
+    """Arrays of a graph in shared memory blocks. The arrays are views
+    of the blocks and must not be used after the graph is closed."""
+    exported = {} # graphs exported by this process and not closed yet
+    def __init__(self, spec, blocks, is_owner):
+        self.spec = spec
+        self.blocks = blocks
+        self.is_owner = is_owner
+        self.arrays = {key: np.ndarray(shape, dtype=dtype, buffer=blocks[key].buf)
+                       for key, (_, dtype, shape) in spec['arrays'].items()}
+    def __enter__(self):
+        return self
+    def __exit__(self, *exc_info):
+        self.close()
+    def get_spec(self):
+        """Return the spec to attach to the blocks in other processes."""
+        return self.spec
+    def close(self):
+        """Release the views and the blocks, unlinking the blocks in the
+        process that exported them."""
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            if self.is_owner:
+                block.unlink()
+        self.blocks = {}
+        SharedGraph.exported.pop(id(self), None)
+
+    @staticmethod
+    def export(book):
+        """Copy the arrays of the graph of book to new shared memory blocks."""
+        spec = {'book': book.get_name(), 'arrays': {}}
+        blocks = {}
+        try:
+            for key, arr in Graphs.get_csr(book.get_graph()).items():
+                # blocks of zero bytes are not allowed
+                block = shared_memory.SharedMemory(create=True, size=max(arr.nbytes, 1))
+                blocks[key] = block
+                np.ndarray(arr.shape, dtype=arr.dtype, buffer=block.buf)[...] = arr
+                spec['arrays'][key] = (block.name, arr.dtype.str, arr.shape)
+        except Exception:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+            raise
+        shared = SharedGraph(spec, blocks, True)
+        SharedGraph.exported[id(shared)] = shared
+        return shared
+
+    @staticmethod
+    def attach(spec):
+        """Return the graph exported by other process described by spec."""
+        blocks = {key: shared_memory.SharedMemory(name=name)
+                  for key, (name, _, _) in spec['arrays'].items()}
+        return SharedGraph(spec, blocks, False)
+
+    @staticmethod
+    def release_all():
+        """Close the graphs exported by this process."""
+        for shared in list(SharedGraph.exported.values()):
+            shared.close()
+
+atexit.register(SharedGraph.release_all)
+
+def get_shared_values(spec, which):
+    """Return the centrality values of measure ID which for the graph
+    in shared memory described by spec, usually in a worker process."""
+    with SharedGraph.attach(spec) as shared:
+        return Graphs.get_csr_values(shared.arrays, which, spec['book'])
+
+#########
+# STORE #
+#########
+# The results store keeps books, characters, edges and measures in a
+# SQLite database. Books are identified by the digest of the content
+# of their data files and their names, so books with the same content
+# and different names are kept apart, and measures by their name and
+# parameters, so the stored values are used while the data and the
+# parameters do not change. Only the last version read of each book is
+# marked as current, e.g., the first version after editing it back.
+
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL,
+    name TEXT NOT NULL,
+    genre TEXT,
+    label TEXT,
+    current INTEGER NOT NULL DEFAULT 1,
+    UNIQUE (hash, name)
+);
+CREATE TABLE IF NOT EXISTS characters (
+    book_id INTEGER NOT NULL REFERENCES books(id),
+    idx INTEGER NOT NULL,
+    label TEXT NOT NULL,
+    name TEXT,
+    frequency INTEGER,
+    degree INTEGER,
+    PRIMARY KEY (book_id, idx)
+);
+CREATE TABLE IF NOT EXISTS edges (
+    book_id INTEGER NOT NULL REFERENCES books(id),
+    source INTEGER NOT NULL,
+    target INTEGER NOT NULL,
+    weight INTEGER,
+    PRIMARY KEY (book_id, source, target)
+);
+CREATE TABLE IF NOT EXISTS book_measures (
+    book_id INTEGER NOT NULL REFERENCES books(id),
+    measure TEXT NOT NULL,
+    params TEXT NOT NULL,
+    value REAL,
+    PRIMARY KEY (book_id, measure, params)
+);
+CREATE TABLE IF NOT EXISTS char_measures (
+    book_id INTEGER NOT NULL REFERENCES books(id),
+    measure TEXT NOT NULL,
+    params TEXT NOT NULL,
+    char_idx INTEGER NOT NULL,
+    value REAL,
+    PRIMARY KEY (book_id, measure, params, char_idx)
+);
+CREATE INDEX IF NOT EXISTS books_name ON books (name, current);
+CREATE INDEX IF NOT EXISTS books_genre ON books (genre, current);
+CREATE INDEX IF NOT EXISTS char_measures_value ON char_measures (measure, params, value);
+"""
+
+class ResultsStore():
+    """SQLite store of books and their measures."""
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self.conn = sqlite3.connect(file_name)
+        self.conn.executescript(STORE_SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        self.conn.close()
+
+    def find_book(self, book):
+        """Return the ID of the book in the store or None. The version
+        found becomes the current version of the book."""
+        if book.content_hash is None:
+            book.content_hash = book.get_content_hash()
+        row = self.conn.execute('SELECT id, current FROM books WHERE hash = ? AND name = ?',
+                                (book.content_hash, book.get_name())).fetchone()
+        if row is None:
+            return None
+        if row[1] == 0: # e.g., the data file was edited back
+            with self.conn:
+                self.conn.execute('UPDATE books SET current = (id = ?) WHERE name = ?',
+                                  (row[0], book.get_name()))
+        return row[0]
+
+    def add_book(self, book):
+        """Store the book with its characters and edges, reading its graph,
+        and return its ID."""
+        book_id = self.find_book(book)
+        if book_id is not None:
+            return book_id
+        genre = book.get_genre()
+        # the whole graph is stored, the measures of the backbone have its
+        # level in their parameters
+        with book.whole_graph() as graph:
+            book_id = self.insert_book(book, graph, genre)
+        return book_id
+
+    def insert_book(self, book, graph, genre):
+        """Insert the book with the characters and edges of graph and return
+        its ID."""
+        with self.conn:
+            self.conn.execute('UPDATE books SET current = 0 WHERE name = ?', (book.get_name(),))
+            cur = self.conn.execute('INSERT INTO books (hash, name, genre, label) '
+                                    'VALUES (?, ?, ?, ?)',
+                                    (book.content_hash, book.get_name(),
+                                     genre.name.lower() if genre is not None else None,
+                                     book.get_label()))
+            book_id = cur.lastrowid
+            vprops = graph.vertex_properties
+            vprop_degrees = Graphs.get_vprop_degrees(graph)
+            self.conn.executemany('INSERT INTO characters VALUES (?, ?, ?, ?, ?, ?)',
+                                  ((book_id, int(v), book.get_char_label(v),
+                                    book.get_char_name(v),
+                                    int(vprops["frequency"][v]), int(vprop_degrees[v]))
+                                   for v in graph.vertices()))
+            self.conn.executemany('INSERT OR REPLACE INTO edges VALUES (?, ?, ?, ?)',
+                                  ((book_id, int(row[0]), int(row[1]), int(row[2]))
+                                   for row in graph.get_edges([graph.edge_properties["weight"]])))
+        return book_id
+
+    def get_book_measures(self, book, names, compute, params=''):
+        """Return a dictionary with the book measures names. When any of
+        them is missing, compute(book) is called to obtain the dictionary
+        of measures that is stored."""
+        book_id = self.find_book(book)
+        if book_id is not None:
+            rows = self.conn.execute('SELECT measure, value FROM book_measures '
+                                     'WHERE book_id = ? AND params = ?',
+                                     (book_id, params)).fetchall()
+            meas = dict(rows)
+            if all(name in meas for name in names):
+                return {name: float('nan') if meas[name] is None else meas[name]
+                        for name in names}
+        meas = compute(book)
+        book_id = self.add_book(book)
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO book_measures VALUES (?, ?, ?, ?)',
+                                  ((book_id, name, params, float(value))
+                                   for (name, value) in meas.items()))
+        return meas
+
+    def get_vertex_measure(self, book, num):
+        """Return the values of the measure ID num for the characters of the
+        book, computing and storing them when missing."""
+        params = Measure.get_params(num)
+        book_id = self.add_book(book)
+        rows = self.conn.execute('SELECT value FROM char_measures '
+                                 'WHERE book_id = ? AND measure = ? AND params = ? '
+                                 'ORDER BY char_idx',
+                                 (book_id, num.name.lower(), params)).fetchall()
+        if rows:
+            return [float('nan') if value is None else value for (value,) in rows]
+        values = Graphs.get_centrality_values(book.read(), num)
+        self.add_vertex_measure(book, num, values)
+        return list(values)
+
+    def has_vertex_measure(self, book, num):
+        """Return True if the values of the measure ID num for the characters
+        of the book are stored."""
+        book_id = self.find_book(book)
+        if book_id is None:
+            return False
+        row = self.conn.execute('SELECT 1 FROM char_measures '
+                                'WHERE book_id = ? AND measure = ? AND params = ? LIMIT 1',
+                                (book_id, num.name.lower(), Measure.get_params(num))).fetchone()
+        return row is not None
+
+    def add_vertex_measure(self, book, num, values):
+        """Store the values of the measure ID num for the characters of the book."""
+        params = Measure.get_params(num)
+        book_id = self.add_book(book)
+        with self.conn:
+            self.conn.executemany('INSERT OR REPLACE INTO char_measures VALUES (?, ?, ?, ?, ?)',
+                                  ((book_id, num.name.lower(), params, idx, float(value))
+                                   for (idx, value) in enumerate(values)))
+
+    def top_characters(self, num, limit=10, genre=None):
+        """Return the rows (book, genre, label, character name, value) of
+        the characters with highest value of the measure ID num among the
+        current books, optionally restricted to a genre."""
+        query = ('SELECT b.name, b.genre, c.label, c.name, m.value '
+                 'FROM char_measures m '
+                 'JOIN books b ON b.id = m.book_id '
+                 'JOIN characters c ON c.book_id = m.book_id AND c.idx = m.char_idx '
+                 'WHERE m.measure = ? AND m.params = ? AND b.current = 1 ')
+        args = [num.name.lower(), Measure.get_params(num)]
+        if genre is not None:
+            query += 'AND b.genre = ? '
+            args.append(genre.name.lower())
+        query += 'ORDER BY m.value DESC LIMIT ?'
+        args.append(limit)
+        return self.conn.execute(query, args).fetchall()
+
+def get_book_measures(book, names, compute):
+    """Return the book measures names, from the store when it is set.
+    They are kept in the book until it is read again."""
+    key = tuple(names)
+    if key in book.measures:
+        return book.measures[key]
+    store = Project().get_store()
+    if store is None:
+        values = compute(book)
+    else:
+        params = {}
+        if Project().get_backbone_level() is not None:
+            params['backbone'] = Project().get_backbone_level()
+        if 'clustering' in names and Project().get_clustering_sampling() is not None:
+            params['wedges'] = Project().get_clustering_sampling()
+        params = json.dumps(params, sort_keys=True) if params else ''
+        values = store.get_book_measures(book, names, compute, params)
+    book.measures[key] = values
+    return values
+
+def get_vertex_measure(book, num):
+    """Return the values of measure ID num for the characters of the
+    book, from the results of the executor or from the store when it is set."""
+    key = MeasureExecutor.get_key(book.get_name(), num)
+    values = MeasureExecutor.results.get(key)
+    if values is not None:
+        return values
+    store = Project().get_store()
+    if store is None:
+        values = Graphs.get_centrality_values(book.get_graph(), num)
+    else:
+        values = store.get_vertex_measure(book, num)
+    MeasureExecutor.results[key] = values
+    return values
+
+############
+# EXECUTOR #
+############
+# The executor computes the centralities requested for a set of books
+# before they are consumed, scheduling a job for each pair (book,
+# measure) in a pool of worker processes. The graphs are exported to
+# shared memory once and the jobs are dispatched heaviest first, so the
+# run takes about the time of the slowest single measure when there are
+# enough workers. The results are kept in a map by book name, measure
+# and its parameters (as in the store, e.g., the backbone level), looked
+# up by get_vertex_measure(), and in the store when it is set. With only one worker the measures are computed on demand, and
+# kept in the same map.
+
+class MeasureExecutor():
+    """Compute measures of books in parallel."""
+    results = {} # (book name, measure ID) to the values of the characters
+
+    @staticmethod
+    def get_cost(num, graph):
+        """Return the estimated cost of the measure ID num for the graph."""
+        n_verts = graph.num_vertices()
+        n_edges = graph.num_edges()
+        if num in (Measure.BETWEENNESS, Measure.CLOSENESS):
+            return n_verts * (n_verts + n_edges)
+        if num == Measure.LOBBY:
+            return n_verts + 2 * n_edges * max(1, math.log2(max(n_edges, 2)))
+        if num == Measure.CORENESS:
+            return n_verts + 2 * n_edges
+        if num in (Measure.PAGERANK, Measure.EIGENVECTOR):
+            return 100 * (n_verts + 2 * n_edges) # tens of iterations
+        return n_verts
+
+    @staticmethod
+    def get_key(book_name, num):
+        """Return the key of the results of the measure ID num of the book
+        computed with the current parameters."""
+        return (book_name, num, Measure.get_params(num))
+
+    @staticmethod
+    def is_done(book, num):
+        """Return True if the measure ID num of the book is available."""
+        if MeasureExecutor.get_key(book.get_name(), num) in MeasureExecutor.results:
+            return True
+        store = Project().get_store()
+        return store is not None and store.has_vertex_measure(book, num)
+
+    @staticmethod
+    @profiled('measures:executor', len)
+    def run(books, nums):
+        """Compute the measures IDs nums missing for the books and return
+        the list of (book name, measure ID) computed."""
+        workers = Project().get_workers()
+        if workers <= 1:
+            return []
+        books = [book for book in books
+                 if any(not MeasureExecutor.is_done(book, num) for num in nums)]
+        jobs = []
+        for book in books:
+            graph = book.read()
+            for num in nums:
+                if not MeasureExecutor.is_done(book, num):
+                    jobs.append((MeasureExecutor.get_cost(num, graph), book, num))
+        if not jobs:
+            return []
+        jobs.sort(key=lambda job: job[0], reverse=True) # heaviest first
+        shared = {}
+        pool = None
+        done = []
+        try:
+            # the workers are forked after the export to share the resource
+            # tracker, otherwise each one would unlink the blocks at its exit
+            for book in books:
+                shared[book.get_name()] = SharedGraph.export(book)
+            pool = MP_CONTEXT.Pool(min(workers, len(jobs)))
+            specs = [(shared[book.get_name()].get_spec(), num) for (_, book, num) in jobs]
+            LOGGER.info('* Computing %d measures with %d workers', len(jobs), workers)
+            for (spec, num, values) in pool.imap_unordered(get_job_values, specs, chunksize=1):
+                book_name = spec['book']
+                MeasureExecutor.results[MeasureExecutor.get_key(book_name, num)] = values
+                store = Project().get_store()
+                if store is not None:
+                    book = next(book for book in books if book.get_name() == book_name)
+                    store.add_vertex_measure(book, num, values)
+                done.append((book_name, num))
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            for graph in shared.values():
+                graph.close()
+        return done
+
+def get_job_values(job):
+    """Return the spec, the measure ID and the values of the job of the
+    executor, computed in a worker process."""
+    (spec, num) = job
+    return spec, num, get_shared_values(spec, num)
+
+###############
+# NULL MODELS #
+###############
+# The significance of a statistic of a book is evaluated against an
+# ensemble of random graphs with the same degrees: rewirings of the
+# edges by double edge swaps, and configuration-model graphs obtained
+# by matching edge stubs at random (dropping self-loops and multiple
+# edges). The weights of the edges go along with the swapped edges or
+# are shuffled over the new edges. Replicates are generated in worker
+# processes from the graph in shared memory, in chunks; each replicate
+# has its own seed derived from the seed of the run, the book and its
+# number, so the results do not depend on the number of workers. Only
+# the running mean and variance of each statistic and the number of
+# replicates above and below the observed value return from a chunk,
+# the replicates are discarded as soon as they are measured.
+
+NULL_MODELS = ['rewiring', 'configuration']
+# Double edge swaps tried per edge in a rewiring.
+NULL_MODEL_SWAPS = 10
+# Replicates generated by a worker task.
+NULL_MODEL_CHUNK = 16
+NULL_MODEL_SEED = 2019
+
+def get_null_statistics():
+    """Return the statistics evaluated against the null models, mapping
+    their names to functions of the arrays of Graphs.get_csr(): the global
+    clustering coefficient and the Pearson correlation of the lobby index
+    with each centrality."""
+    stats = {'clustering': lambda csr: triangles_csr(csr)['global']}
+    def correlation(num):
+        def stat(csr):
+            centr = np.array(Graphs.get_csr_values(csr, num), dtype=float)
+            lobbies = np.array(Graphs.get_csr_values(csr, Measure.LOBBY), dtype=float)
+            valid = ~(np.isnan(centr) | np.isnan(lobbies))
+            if np.ptp(centr[valid]) == 0 or np.ptp(lobbies[valid]) == 0:
+                return float('nan')
+            return pearsonr(centr[valid], lobbies[valid])[0]
+        return stat
+    for num in Graphs.get_centrality_nums():
+        stats[num.name.lower() + '_lobby_r'] = correlation(num)
+    return stats
+
+def rewire_edges(edges, rng, n_swaps):
+    """Return a copy of the array of edges (source, target, weight)
+    rewired by n_swaps tries of double edge swaps a-b, c-d => a-d, c-b,
+    rejected when they would create self-loops or multiple edges."""
+    edges = edges.copy()
+    n_edges = len(edges)
+    if n_edges < 2:
+        return edges
+    keys = set(zip(np.minimum(edges[:, 0], edges[:, 1]).tolist(),
+                   np.maximum(edges[:, 0], edges[:, 1]).tolist()))
+    srcs = edges[:, 0].tolist()
+    dsts = edges[:, 1].tolist()
+    for (i, j, flip) in zip(rng.integers(0, n_edges, n_swaps).tolist(),
+                            rng.integers(0, n_edges, n_swaps).tolist(),
+                            rng.integers(0, 2, n_swaps).tolist()):
+        (a_vert, b_vert) = (srcs[i], dsts[i])
+        (c_vert, d_vert) = (dsts[j], srcs[j]) if flip else (srcs[j], dsts[j])
+        if a_vert == d_vert or c_vert == b_vert:
+            continue
+        new_ad = (min(a_vert, d_vert), max(a_vert, d_vert))
+        new_cb = (min(c_vert, b_vert), max(c_vert, b_vert))
+        if new_ad in keys or new_cb in keys or new_ad == new_cb:
+            continue
+        keys.discard((min(a_vert, b_vert), max(a_vert, b_vert)))
+        keys.discard((min(c_vert, d_vert), max(c_vert, d_vert)))
+        keys.add(new_ad)
+        keys.add(new_cb)
+        (srcs[i], dsts[i], srcs[j], dsts[j]) = (a_vert, d_vert, c_vert, b_vert)
+    edges[:, 0] = srcs
+    edges[:, 1] = dsts
+    return edges
+
+def configuration_edges(n_verts, edges, rng):
+    """Return the array of edges of a configuration-model graph with the
+    degrees of the edges given, without self-loops and multiple edges, and
+    the weights of edges shuffled over the new edges."""
+    stubs = np.concatenate((edges[:, 0], edges[:, 1]))
+    rng.shuffle(stubs)
+    src = np.minimum(stubs[0::2], stubs[1::2])
+    dst = np.maximum(stubs[0::2], stubs[1::2])
+    _, first = np.unique(src * n_verts + dst, return_index=True)
+    first = first[src[first] != dst[first]]
+    weights = rng.permutation(edges[:, 2])[:len(first)]
+    return np.column_stack((src[first], dst[first], weights))
+
+def get_null_summary(task):
+    """Generate the replicates of a chunk of the null model of the graph
+    in shared memory and return, for each statistic, the number of values,
+    their mean and sum of squared deviations and the number of values at
+    least and at most the observed one."""
+    (spec, model, names, observed, seed, replicates) = task
+    stats = get_null_statistics()
+    summary = {name: [0, 0.0, 0.0, 0, 0] for name in names}
+    with SharedGraph.attach(spec) as shared:
+        csr = shared.arrays
+        n_verts = len(csr['degrees'])
+        rows = np.repeat(np.arange(n_verts, dtype=np.int64), np.diff(csr['indptr']))
+        upper = rows < csr['indices']
+        edges = np.column_stack((rows[upper], csr['indices'][upper],
+                                 csr['weights'][upper])).astype(np.int64)
+        frequency = np.array(csr['frequency'])
+    for replicate in replicates:
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(replicate,)))
+        if model == 'rewiring':
+            null_edges = rewire_edges(edges, rng, NULL_MODEL_SWAPS * len(edges))
+        else:
+            null_edges = configuration_edges(n_verts, edges, rng)
+        null_csr = Graphs.edges_to_csr(n_verts, null_edges, frequency)
+        for name in names:
+            value = stats[name](null_csr)
+            if math.isnan(value):
+                continue
+            acc = summary[name] # Welford's update
+            acc[0] += 1
+            delta = value - acc[1]
+            acc[1] += delta / acc[0]
+            acc[2] += delta * (value - acc[1])
+            acc[3] += value >= observed[name]
+            acc[4] += value <= observed[name]
+    return summary
+
+def merge_null_summaries(acc, other):
+    """Merge the summary other of get_null_summary() in acc."""
+    for (name, (n_b, mean_b, sq_b, ge_b, le_b)) in other.items():
+        (n_a, mean_a, sq_a, ge_a, le_a) = acc[name]
+        count = n_a + n_b
+        if count == 0:
+            continue
+        delta = mean_b - mean_a
+        acc[name] = [count, mean_a + delta * n_b / count,
+                     sq_a + sq_b + delta * delta * n_a * n_b / count,
+                     ge_a + ge_b, le_a + le_b]
+
+class NullModelEnsemble():
+    """Evaluate the statistics of books against ensembles of null models."""
+    fields = ['book', 'model', 'statistic', 'observed', 'replicates',
+              'mean', 'stdev', 'z', 'p']
+    def __init__(self, replicates, seed=NULL_MODEL_SEED, workers=1):
+        self.replicates = replicates
+        self.seed = seed
+        self.workers = workers
+
+    def get_book_seed(self, book):
+        """Return the seed of the replicates of book."""
+        digest = hashlib.sha1(book.get_name().encode('utf-8')).hexdigest()
+        return [self.seed, int(digest[:8], 16)]
+
+    @staticmethod
+    def get_row(book, model, name, observed, summary):
+        """Return the row of results of the statistic name."""
+        (count, mean, sq_devs, n_ge, n_le) = summary
+        stdev = math.sqrt(sq_devs / (count - 1)) if count > 1 else float('nan')
+        z_val = (observed - mean) / stdev if stdev > 0 else float('nan')
+        # two-sided empirical p-value
+        p_val = min(1.0, 2.0 * (1.0 + min(n_ge, n_le)) / (count + 1.0))
+        return {'book': book.get_name(), 'model': model, 'statistic': name,
+                'observed': observed, 'replicates': count, 'mean': mean,
+                'stdev': stdev, 'z': z_val, 'p': p_val}
+
+    @profiled('null_models', len)
+    def run(self, books, file_name):
+        """Evaluate the statistics of the books, writing the results to file_name."""
+        stats = get_null_statistics()
+        names = list(stats)
+        rows = []
+        _file, file_name = open_output(file_name)
+        _file.write(CSV_FIELDS_SEPARATOR.join(NullModelEnsemble.fields) + '\n')
+        for book in books:
+            csr = Graphs.get_csr(book.get_graph())
+            observed = {name: stats[name](csr) for name in names}
+            shared = SharedGraph.export(book)
+            pool = None
+            try:
+                chunks = [list(range(first, min(first + NULL_MODEL_CHUNK, self.replicates)))
+                          for first in range(0, self.replicates, NULL_MODEL_CHUNK)]
+                for model in NULL_MODELS:
+                    tasks = [(shared.get_spec(), model, names, observed,
+                              self.get_book_seed(book) + [NULL_MODELS.index(model)], chunk)
+                             for chunk in chunks]
+                    if self.workers > 1:
+                        if pool is None:
+                            pool = MP_CONTEXT.Pool(self.workers)
+                        summaries = pool.imap_unordered(get_null_summary, tasks)
+                    else:
+                        summaries = map(get_null_summary, tasks)
+                    acc = {name: [0, 0.0, 0.0, 0, 0] for name in names}
+                    for summary in summaries:
+                        merge_null_summaries(acc, summary)
+                    for name in names:
+                        row = NullModelEnsemble.get_row(book, model, name, observed[name],
+                                                        acc[name])
+                        _file.write(CSV_FIELDS_SEPARATOR.join(str(row[field]) for field
+                                                              in NullModelEnsemble.fields) + '\n')
+                        rows.append(row)
+                    LOGGER.info('* Evaluated %d replicates of %s model of book "%s"',
+                                self.replicates, model, book.get_name())
+            finally:
+                if pool is not None:
+                    pool.terminate()
+                    pool.join()
+                shared.close()
+        _file.close()
+        print('* Wrote ' + file_name)
+        return rows
+
+##############
+# ROBUSTNESS #
+##############
+# The robustness of a book is measured by removing its characters in a
+# given order (by decreasing degree, lobby or betweenness, or at random)
+# and following the fraction of characters in the largest connected
+# component. The removals are processed in reverse: starting with no
+# character, the characters are added back in reverse order and their
+# components merged with a union-find structure, so the whole curve
+# costs about one pass over the edges. The robustness index R is the
+# average of the curve over the removals of 1 to n characters. Random
+# orderings are generated in worker processes, in chunks, each one
+# with its own seed, and only the sums of curves and indexes return.
+
+# Measures ordering the removal of characters, from the highest value.
+ROBUSTNESS_ORDERS = [Measure.DEGREE_CENTRALITY, Measure.LOBBY, Measure.BETWEENNESS]
+# Random orderings evaluated by a worker task.
+ROBUSTNESS_CHUNK = 32
+ROBUSTNESS_SEED = 2019
+
+def percolation_csr(csr, order):
+    """Return the array of fractions of vertices in the largest component
+    after removing the first k vertices of order, for k from 0 to n, from
+    the arrays of Graphs.get_csr()."""
+    indptr = csr['indptr'].tolist()
+    indices = csr['indices'].tolist()
+    n_verts = len(indptr) - 1
+    parent = list(range(n_verts))
+    size = [1] * n_verts
+    present = [False] * n_verts
+    curve = [0] * (n_verts + 1)
+    giant = 0
+    for k in range(n_verts - 1, -1, -1):
+        vert = int(order[k])
+        present[vert] = True
+        giant = max(giant, 1)
+        for pos in range(indptr[vert], indptr[vert+1]):
+            neighbor = indices[pos]
+            if not present[neighbor]:
+                continue
+            # find the roots, halving the paths
+            root_a = vert
+            while parent[root_a] != root_a:
+                parent[root_a] = parent[parent[root_a]]
+                root_a = parent[root_a]
+            root_b = neighbor
+            while parent[root_b] != root_b:
+                parent[root_b] = parent[parent[root_b]]
+                root_b = parent[root_b]
+            if root_a == root_b:
+                continue
+            if size[root_a] < size[root_b]: # union by size
+                (root_a, root_b) = (root_b, root_a)
+            parent[root_b] = root_a
+            size[root_a] += size[root_b]
+            giant = max(giant, size[root_a])
+        curve[k] = giant
+    return np.array(curve, dtype=float) / max(n_verts, 1)
+
+def get_robustness_index(curve):
+    """Return the robustness index R of the curve of percolation_csr()."""
+    return curve[1:].sum() / max(len(curve) - 1, 1)
+
+def get_random_percolation(task):
+    """Return the sum of the curves, the sum and the sum of squares of
+    the robustness indexes of a chunk of random orderings of the graph in
+    shared memory."""
+    (spec, seed, orderings) = task
+    with SharedGraph.attach(spec) as shared:
+        csr = {key: np.array(arr) for (key, arr) in shared.arrays.items()}
+    n_verts = len(csr['degrees'])
+    curves = np.zeros(n_verts + 1)
+    (r_sum, r_sq) = (0.0, 0.0)
+    for ordering in orderings:
+        rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(ordering,)))
+        curve = percolation_csr(csr, rng.permutation(n_verts))
+        curves += curve
+        r_val = get_robustness_index(curve)
+        r_sum += r_val
+        r_sq += r_val * r_val
+    return curves, r_sum, r_sq
+
+class Robustness():
+    """Evaluate the robustness of books to the removal of characters."""
+    def __init__(self, orderings, seed=ROBUSTNESS_SEED, workers=1):
+        self.orderings = orderings
+        self.seed = seed
+        self.workers = workers
+
+    def get_random_curve(self, book):
+        """Return the average curve over the random orderings of the book,
+        the mean and the standard deviation of their robustness indexes."""
+        digest = hashlib.sha1(book.get_name().encode('utf-8')).hexdigest()
+        seed = [self.seed, int(digest[:8], 16)]
+        shared = SharedGraph.export(book)
+        pool = None
+        try:
+            tasks = [(shared.get_spec(), seed,
+                      list(range(first, min(first + ROBUSTNESS_CHUNK, self.orderings))))
+                     for first in range(0, self.orderings, ROBUSTNESS_CHUNK)]
+            if self.workers > 1:
+                pool = MP_CONTEXT.Pool(self.workers)
+                results = pool.imap_unordered(get_random_percolation, tasks)
+            else:
+                results = map(get_random_percolation, tasks)
+            curves = np.zeros(book.get_graph().num_vertices() + 1)
+            (r_sum, r_sq) = (0.0, 0.0)
+            for (chunk_curves, chunk_sum, chunk_sq) in results:
+                curves += chunk_curves
+                r_sum += chunk_sum
+                r_sq += chunk_sq
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+            shared.close()
+        mean = r_sum / self.orderings
+        var = (r_sq - self.orderings * mean * mean) / max(self.orderings - 1, 1)
+        return curves / self.orderings, mean, math.sqrt(max(var, 0.0))
+
+    @profiled('robustness', len)
+    def run(self, books, file_name):
+        """Write the robustness indexes of the books to file_name and their
+        curves to files named <book_name>-robustness.csv."""
+        sep = CSV_FIELDS_SEPARATOR
+        books = list(books)
+        MeasureExecutor.run(books, ROBUSTNESS_ORDERS)
+        _file, file_name = open_output(file_name)
+        _file.write(sep.join(['book', 'order', 'R', 'R_stdev']) + '\n')
+        for book in books:
+            csr = Graphs.get_csr(book.read())
+            curves = []
+            for num in ROBUSTNESS_ORDERS:
+                values = np.array(get_vertex_measure(book, num), dtype=float)
+                order = np.argsort(-np.nan_to_num(values, nan=-np.inf), kind='stable')
+                curves.append(percolation_csr(csr, order))
+                _file.write(sep.join([book.get_name(), num.name.lower(),
+                                      str(get_robustness_index(curves[-1])), '0.0']) + '\n')
+            if self.orderings > 0:
+                (curve, mean, stdev) = self.get_random_curve(book)
+                curves.append(curve)
+                _file.write(sep.join([book.get_name(), 'random', str(mean), str(stdev)]) + '\n')
+            curve_name = os.path.join(Project().get_out_dir(),
+                                      book.get_name() + '-robustness.csv')
+            curve_file, curve_name = open_output(curve_name)
+            n_verts = len(csr['degrees'])
+            for k in range(n_verts + 1):
+                curve_file.write(sep.join([str(float(k) / max(n_verts, 1))]
+                                          + [str(curve[k]) for curve in curves]) + '\n')
+            curve_file.close()
+            print('* Wrote ' + curve_name)
+        _file.close()
+        print('* Wrote ' + file_name)
+        return books
+
+#############
+# SYNTHETIC #
+#############
+# Synthetic books are generated to evaluate how the processing scales
+# with the number of characters. The frequency of characters follows a
+# Zipf law and the size of encounter groups a geometric distribution.
+
+# Letters used to write the labels of synthetic characters.
+SYNTH_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# Names of the parameters of the synthetic books in the command line,
+# with the argument of generate_book() and the type and minimum value.
+SYNTH_PARAMS = {
+    'chapters': ('n_chapters', int, 1),
+    'groups': ('n_groups', int, 1),
+    'group_mean': ('group_mean', float, 2.0),
+    'zipf': ('zipf_exponent', float, 0.0),
+    'seed': ('seed', int, 0),
+}
+
+def parse_synth_params(text):
+    """Return the keyword arguments of generate_book() given as the
+    comma-separated list of name=value in text, or None if it is not valid."""
+    params = {}
+    for item in text.split(','):
+        (name, _, value) = item.partition('=')
+        if name not in SYNTH_PARAMS:
+            return None
+        (arg, kind, minimum) = SYNTH_PARAMS[name]
+        try:
+            params[arg] = kind(value)
+        except ValueError:
+            return None
+        if params[arg] < minimum:
+            return None
+    return params
+
+def synth_labels(n_chars):
+    """Return n_chars labels of same length in increasing order, as
+    required in the data files, e.g., AA, AB, ..., ZZ, AAA, ..."""
+    base = len(SYNTH_ALPHABET)
+    width = 2
+    while base**width < n_chars:
+        width += 1
+    digits = np.zeros((n_chars, width), dtype=np.int64)
+    rest = np.arange(n_chars)
+    for col in range(width-1, -1, -1):
+        digits[:, col] = rest % base
+        rest //= base
+    letters = np.array(list(SYNTH_ALPHABET))
+    return [''.join(row) for row in letters[digits]]
+
+def generate_book(file_name, n_chars, n_chapters=None, n_groups=None,
+                  group_mean=3.0, zipf_exponent=1.2, seed=0, fmt=None):
+    """Write a valid data file of a synthetic book with n_chars characters
+    and n_groups encounter groups spread over n_chapters chapters.
+    The group sizes follow a geometric distribution with mean group_mean
+    (at least 2 characters) and the characters are drawn with
+    probability proportional to rank**(-zipf_exponent)."""
+    rng = np.random.default_rng(seed)
+    if n_chapters is None:
+        n_chapters = max(1, n_chars // 10)
+    if n_groups is None:
+        n_groups = 2*n_chars
+    labels = synth_labels(n_chars)
+    # heavy-tailed frequency of characters, randomly assigned to labels
+    prob = np.power(np.arange(1, n_chars + 1, dtype=float), -zipf_exponent)
+    cdf = np.cumsum(prob[rng.permutation(n_chars)])
+    cdf /= cdf[-1]
+    sizes = 1 + rng.geometric(1.0/max(group_mean - 1.0, 1.0), n_groups)
+    draws = np.searchsorted(cdf, rng.random(int(sizes.sum())), side='right')
+    draws = np.minimum(draws, n_chars - 1)
+    bounds = np.cumsum(sizes)[:-1]
+    chapters = np.sort(rng.integers(0, n_chapters, n_groups))
+    with open_stream(file_name, 'w', fmt) as _file:
+        _file.write('* Synthetic book with {} characters and {} encounters\n'
+                    .format(n_chars, n_groups))
+        _file.write('* genre: fiction\n')
+        for (i, label) in enumerate(labels):
+            _file.write(label + ' Character ' + str(i) + '\n')
+        _file.write('\n')
+        groups = np.split(draws, bounds)
+        start = 0
+        for chapter in range(n_chapters):
+            end = np.searchsorted(chapters, chapter, side='right')
+            encounters = []
+            for group in groups[start:end]:
+                encounters.append(','.join(labels[idx] for idx in np.unique(group)))
+            _file.write(str(chapter + 1) + ':' + ';'.join(encounters) + '\n')
+            start = end
+    LOGGER.info('* Wrote synthetic book %s', file_name)
+
+#############
+# BENCHMARK #
+#############
+# The benchmark times each stage of the processing of synthetic books
+# of increasing sizes. The results are appended to a file, one JSON
+# object per line, tagged with the commit of the code, so the results
+# of different commits can be compared.
+
+# Stages that are too expensive above a number of characters.
+BENCH_MAX_SIZE = {
+    'betweenness': 10**4,
+    'closeness': 10**4,
+}
+
+# Largest number of characters whose stages are run again to measure
+# the memory peak, tracemalloc slows the run down several times.
+BENCH_MEMORY_MAX_SIZE = 10**4
+
+def parse_bench_sizes(text):
+    """Return the list of numbers of characters of the comma-separated
+    text, e.g. "100,1000", or None if it is not valid."""
+    sizes = text.split(',')
+    if not all(size.isdigit() and int(size) > 0 for size in sizes):
+        return None
+    return [int(size) for size in sizes]
 
-    @staticmethod
-    def get_genre_name(idx):
-        """Given a genre ID, return its name."""
-        return Books.genre_names[idx]
+def get_commit():
+    """Return the commit of the code being run, if any."""
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'],
+                             stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                             check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
 
-    @staticmethod
-    def get_genre_enums():
-        """Get the genres IDs"""
-        return np.arange(0, len(Books.genre_names))
+class Benchmark():
+    """Time and memory profile of the stages of the processing."""
+    sizes = [10**2, 10**3, 10**4, 10**5, 10**6]
 
-    @staticmethod
-    def get_books():
-        """Return the books data."""
-        if Books.was_already_read is False:
-            Books.was_already_read = True
-            LOGGER.info("\n\t#### PRE-PROCESSING ####")
-            for book in Books.get_books():
-                book.read()
-        return Books.books
+    def __init__(self, file_name, sizes=None):
+        self.file_name = file_name
+        if sizes is not None:
+            self.sizes = sizes
+        self.commit = get_commit()
+        self.results = []
+
+    def measure(self, stage, size, func):
+        """Run func() recording the wall and CPU times, then run it again
+        recording the peak of memory allocated by Python, so the tracing
+        does not slow down the timed run, and the maximum resident set
+        size. The second run is skipped above BENCH_MEMORY_MAX_SIZE
+        characters and while the profiler traces the memory, starting and
+        stopping the tracing would break its peaks. Return the value of
+        the last run."""
+        if size > BENCH_MAX_SIZE.get(stage, size):
+            return None
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        ret = func()
+        row = {'commit': self.commit, 'stage': stage, 'size': size,
+               'wall': time.perf_counter() - wall,
+               'cpu': time.process_time() - cpu,
+               'py_peak': None}
+        if size <= BENCH_MEMORY_MAX_SIZE and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            try:
+                ret = func()
+                row['py_peak'] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        row['maxrss'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        self.results.append(row)
+        LOGGER.info('* %-12s n=%-8d %8.3fs', stage, size, row['wall'])
+        return ret
+
+    def run_size(self, size, directory):
+        """Run all stages on a synthetic book with size characters."""
+        file_name = os.path.join(directory, 'synth' + str(size) + '.dat')
+        params = Project().get_synthetic_params()
+        self.measure('generate', size, lambda: generate_book(file_name, size, **params))
+        books = [] # a book is read once, each run reads a new one
+        def read():
+            books.append(BookFile(file_name, BookGenre.FICTION))
+            return books[-1].read()
+        graph = self.measure('read', size, read)
+        book = books[-1]
+        self.measure('degree_centrality', size,
+                     lambda: Graphs.get_centrality_values(graph, Measure.DEGREE_CENTRALITY))
+        self.measure('lobby', size, lambda: lobby(graph))
+        self.measure('knn', size, lambda: Graphs.get_degree_avg_neighbors(graph))
+        self.measure('betweenness', size,
+                     lambda: Graphs.get_centrality_values(graph, Measure.BETWEENNESS))
+        self.measure('closeness', size,
+                     lambda: Graphs.get_centrality_values(graph, Measure.CLOSENESS))
+        Books.set_books([book])
+        Books.was_already_read = True
+        self.measure('write_degree', size, Formatting.write_vertices_degree)
+        self.measure('write_frequency', size, Formatting.write_vertices_frequency)
+        self.measure('write_weight', size, Formatting.write_edges_weight)
+
+    def get_previous(self):
+        """Return the last results of other commits for each stage and size."""
+        prev = {}
+        if not os.path.exists(self.file_name):
+            return prev
+        with open(self.file_name) as _file:
+            for line in _file:
+                row = json.loads(line)
+                if row['commit'] != self.commit:
+                    prev[(row['stage'], row['size'])] = row
+        return prev
+
+    def run(self):
+        """Run the benchmark, store and report the results."""
+        prev = self.get_previous()
+        # the stages replace the books, those of a registry are kept too
+        books = (Books.books, Books.registry,
+                 Books.was_already_listed, Books.was_already_read)
+        out_dir = Project().get_out_dir()
+        with tempfile.TemporaryDirectory() as directory:
+            Project().set_outdir(directory)
+            try:
+                for size in self.sizes:
+                    self.run_size(size, directory)
+            finally:
+                Project().set_outdir(out_dir)
+                (Books.books, Books.registry,
+                 Books.was_already_listed, Books.was_already_read) = books
+        with open(self.file_name, 'a') as _file:
+            for row in self.results:
+                _file.write(json.dumps(row) + '\n')
+        print('\n{:<18}{:>9}{:>10}{:>10}{:>12}{:>10}'.format('stage', 'size', 'wall(s)',
+                                                          'cpu(s)', 'peak(MB)', 'change'))
+        for row in self.results:
+            change = ''
+            old = prev.get((row['stage'], row['size']))
+            if old is not None and old['wall'] > 0:
+                change = '{:+.0%}'.format(row['wall']/old['wall'] - 1)
+            peak = float('nan') if row['py_peak'] is None else row['py_peak']/2**20
+            print('{:<18}{:>9}{:>10.3f}{:>10.3f}{:>12.1f}{:>10}'.format(
+                row['stage'], row['size'], row['wall'], row['cpu'], peak, change))
+        print('* Wrote ' + self.file_name)
 
 ########
 # PLOT #
@@ -739,8 +3274,8 @@ class AXIS(Enum):
 
 def dump_book_data(xmeasure_num, ymeasure_num, book_name,
                    extension, x_coords, y_coords, xxs=None, yys=None,
-                   book_genre=None):
-    '''Dump data to output file.'''
+                   book_genre=None, yerrs=None):
+    '''Dump data to output file, with the errors of y in an additional column.'''
     assert len(x_coords) == len(y_coords)
     labels = [Measure.get_label(xmeasure_num), \
               Measure.get_label(ymeasure_num)]
@@ -750,7 +3285,7 @@ def dump_book_data(xmeasure_num, ymeasure_num, book_name,
     file_name = os.path.join(Project().get_out_dir(), \
                              labels[AXIS.X.value] + SEP + labels[AXIS.Y.value] \
                              + SEP + book_name + extension)
-    _file = open(file_name, 'w')
+    _file, file_name = open_output(file_name)
     for i, _ in enumerate(x_coords):
         if math.isnan(x_coords[i]) or math.isnan(y_coords[i]):
             continue
@@ -761,6 +3296,8 @@ def dump_book_data(xmeasure_num, ymeasure_num, book_name,
         # sorry, but \lblfmt is defined in templates/settings.gp
         if xmeasure_num == Measure.DENSITY and ymeasure_num == Measure.CLUSTERING_COEFFICIENT:
             label = '"\\\\tiny ' + book_name + ' (' + book_genre + ')"\t'
+        if yerrs is not None:
+            line = '\t' + str(yerrs[i]) + line
         line = label + str(x_coords[i]) + '\t' + str(y_coords[i]) + line
         _file.write(line)
         _xcoords.append(x_coords[i])
@@ -806,7 +3343,8 @@ class DataInfo():
                  coords_xmin=None, yoffset=.1, xoffset=0.0,
                  alpha=0.0):
         self.title = title
-        self.filename = filename
+        # gnuplot reads compressed data files through a pipe
+        self.filename = gnuplot_source(filename)
         self.rvalue = rvalue
         self.pvalue = pvalue
         self.slope = slope
@@ -829,12 +3367,20 @@ def linear_func(x_coord, slope, offset):
     """Function that represents a linear one."""
     return x_coord*slope + offset
 
+def power_law_fit(x_coords, y_coords):
+    """Return the exponent and the coefficient of the power law y = c x^a
+    fitted by least squares on the logarithms of the coordinates."""
+    slope, offset = np.polyfit(np.log10(x_coords), np.log10(y_coords), 1)
+    return slope, 10**offset
+
 def test_ceil(x_coords, y_coords, xmax, ymax):
     """Check superior bounds."""
     if np.max(x_coords) > xmax or np.max(y_coords) > ymax:
         print(np.max(x_coords), np.max(y_coords))
         exit(-1)
 
+@profiled(lambda cmd, filename: 'command:' + cmd.split()[-1] + ' '
+          + os.path.basename(filename))
 def run_command(cmd, filename):
     """Execute a command in the OS."""
     cmd = cmd + filename
@@ -864,26 +3410,17 @@ class Fits():
         'huck': [8, 3.5, .01]
     }
     @staticmethod
-    def check_label(label):
-        """Verify if the label exists."""
-        if label not in Fits.parms:
-            print('Wrong book name {}'.format(label))
-            exit()
-    @staticmethod
-    def kmin(name):
-        """Return the point where the fitting begins."""
-        Fits.check_label(name)
-        return Fits.parms[name][0]
-    @staticmethod
-    def alpha(name):
-        """Return alpha from fitting."""
-        Fits.check_label(name)
-        return Fits.parms[name][1]
-    @staticmethod
-    def pvalue(name):
-        """Returns p-value from fitting."""
-        Fits.check_label(name)
-        return Fits.parms[name][2]
+    def get_parms(label, degrees):
+        """Return [kmin, alpha, p-value] of the book label. A book without
+        fitting (e.g., found by the registry) starts at its lowest degree
+        with the maximum likelihood alpha of the discrete power law
+        (approximation of Clauset et al.), its p-value is not estimated."""
+        if label in Fits.parms:
+            return Fits.parms[label]
+        degs = np.asarray(degrees, dtype=float)
+        kmin = int(degs.min())
+        alpha = 1.0 + len(degs) / np.sum(np.log(degs / (kmin - 0.5)))
+        return [kmin, round(alpha, 2), float('nan')]
 class Plot():
     """Class with static functions to plot graphics used in the paper."""
     # significance level for statistical tests
@@ -909,18 +3446,20 @@ class Plot():
 
     @staticmethod
     def init():
-        """Initialize environment for plotting. Remove old files. """
+        """Initialize environment for plotting. Remove old files, plain or
+        compressed, but the data files of the books."""
         tmpdir = Project().get_out_dir()
         # Initialize graphs.
         Plot.BOOKS = Books.get_books()
-        for book in Plot.BOOKS:
-            graph = book.get_graph()
-            Plot.GS.append(graph)
-        cmd = 'rm -f ' + tmpdir + '/*.' + Plot.EXT\
-               + ' ' + tmpdir + '/*.' + Plot.PLT_EXT\
-               + ' ' + tmpdir + '/*.' + Plot.DATA_EXT
-        print('* Cleaning {}\n$ {}'.format(tmpdir, cmd))
-        os.system(cmd)
+        Plot.GS = [book.get_graph() for book in Plot.BOOKS]
+        exts = tuple(ext + suffix for ext in [Plot.EXT, Plot.PLT_EXT, Plot.DATA_EXT]
+                     for suffix in [''] + get_compression_suffixes())
+        data_files = set(os.path.realpath(book.get_file_name()) for book in Plot.BOOKS)
+        print('* Cleaning {}: *{}'.format(tmpdir, ' *'.join(exts)))
+        for name in os.listdir(tmpdir):
+            file_name = os.path.join(tmpdir, name)
+            if name.endswith(exts) and os.path.realpath(file_name) not in data_files:
+                os.remove(file_name)
     @staticmethod
     def init_multiplot_template():
         '''Initialize multiplot template.'''
@@ -929,6 +3468,7 @@ class Plot():
         template = env.get_template('multiplot.gp.j2')
         return template
     @staticmethod
+    @profiled('plot:density_x_clustering_coeff')
     def do_density_x_clustering_coeff():
         '''Generate plotting of Density and clustering coefficient comparison.'''
         templates_dir = os.path.join('templates')
@@ -965,21 +3505,31 @@ class Plot():
         plot_info = PlotInfo(Measure.get_label(measure_ids[AXIS.X.value]) \
                              + SEP + 'cluster-coeff', \
                              labels[AXIS.X.value], labels[AXIS.Y.value])
+        budget = Project().get_clustering_sampling()
         for i in range(len(Plot.BOOKS)):
             book = Plot.BOOKS[i]
             book_name = book.get_name()
             graph = Plot.GS[i]
             x_coord = Graphs.density(graph)
-            y_coord = gt_cluster.global_clustering(graph)[0]
+            y_errs = None
+            if budget is None:
+                y_coord = Graphs.get_clustering(graph)['global']
+            else: # estimate with error bars
+                estimate = Graphs.get_clustering_estimate(graph, budget)
+                y_coord = estimate['global']
+                y_errs = [estimate['half_width']]
+                LOGGER.info('* %s: clustering coefficient %.4f +/- %.4f (%d wedges)',
+                            book_name, y_coord, y_errs[0], estimate['samples'])
             xcoords.append(x_coord)
             ycoords.append(y_coord)
             _x_coords, _y_coords, file_name = \
                     dump_book_data(measure_ids[AXIS.X.value], measure_ids[AXIS.Y.value],
                                    book_name, Plot.DATA_EXT, [x_coord], [y_coord],
-                                   book_genre=Books.get_genre_label(book))
+                                   book_genre=Books.get_genre_label(book), yerrs=y_errs)
+            # e.g., a book found by the registry has the default offset
+            (xoff, yoff) = offs.get(book_name, [0, doff])
             plot_info.datainfos.append(DataInfo(book.get_name(), file_name,
-                                                xoffset=offs[book_name][0],
-                                                yoffset=offs[book_name][1]))
+                                                xoffset=xoff, yoffset=yoff))
         (r_val, p_val) = pearsonr(xcoords, ycoords)
         popt, _ = curve_fit(linear_func, xcoords, ycoords)
         test_ceil(xcoords, ycoords, \
@@ -989,6 +3539,7 @@ class Plot():
             file_handle.write(template.render(
                 plot_measure='DxCC',
                 filename=file_name,
+                errorbars=budget is not None,
                 extension=Plot.EXT,
                 PlotInfo=plot_info,
                 xmax=maxs[AXIS.X.value],
@@ -1002,6 +3553,7 @@ class Plot():
         for cmd in Plot.CMDs:
             run_command(cmd, filename)
     @staticmethod
+    @profiled('plot:centralities')
     def do_centralities(supp):
         '''Generate plotting of centralities comparisons.'''
         template = Plot.init_multiplot_template()
@@ -1019,9 +3571,8 @@ class Plot():
             for i in range(len(Plot.BOOKS)):
                 book = Plot.BOOKS[i]
                 book_name = book.get_name()
-                graph = Plot.GS[i]
-                x_coords = np.array(Graphs.get_centrality_values(graph, num))
-                y_coords = np.array(Graphs.get_centrality_values(graph, Measure.LOBBY))
+                x_coords = np.array(get_vertex_measure(book, num), dtype=float)
+                y_coords = np.array(get_vertex_measure(book, Measure.LOBBY), dtype=float)
                 x_coords, y_coords, file_name = dump_book_data(num, Measure.LOBBY,
                                                                book.get_name(), Plot.DATA_EXT,
                                                                x_coords, y_coords)
@@ -1057,6 +3608,7 @@ class Plot():
                 run_command(cmd, filename)
         supp.send(('end_table', ''))
     @staticmethod
+    @profiled('plot:assortativity')
     def do_assortativity():
         '''Generate assortativity multiplot on books.'''
         template = Plot.init_multiplot_template()
@@ -1090,6 +3642,64 @@ class Plot():
         for cmd in Plot.CMDs:
             run_command(cmd, filename)
     @staticmethod
+    @profiled('plot:zipf')
+    def do_zipf():
+        '''Generate multiplot of the frequency of characters by their rank
+        with the fitted Zipf law on books.'''
+        def coords(book):
+            spectrum = book.get_vocabulary()['spectrum']
+            freqs = np.repeat(np.arange(len(spectrum)), spectrum)[::-1]
+            freqs = freqs[freqs > 0]
+            return np.arange(1, len(freqs) + 1), freqs
+        Plot.do_power_law('zipf', Measure.RANK, Measure.FREQUENCY, 'r', 'f_r', coords)
+    @staticmethod
+    @profiled('plot:heaps')
+    def do_heaps():
+        '''Generate multiplot of the number of distinct characters by the
+        number of appearances with the fitted Heaps law on books.'''
+        def coords(book):
+            vocab = book.get_vocabulary()
+            return vocab['appearances'], vocab['characters']
+        Plot.do_power_law('heaps', Measure.APPEARANCES, Measure.CHARACTERS, 'n', 'V(n)',
+                          coords)
+    @staticmethod
+    def do_power_law(plot_measure, xmeasure_num, ymeasure_num, xlabel, ylabel, coords):
+        '''Generate multiplot of the coordinates returned by coords(book) on
+        books, in logarithmic scale with the power law fitted to them.'''
+        template = Plot.init_multiplot_template()
+        xmax = 1.0
+        ymax = 1.0
+        plot_info = PlotInfo(plot_measure, xlabel, ylabel)
+        for book in Plot.BOOKS:
+            x_coords, y_coords = coords(book)
+            if x_coords is None or len(x_coords) < 2:
+                LOGGER.warning('* Data of book \"%s\" are not available for the %s plot!',
+                               book.get_name(), plot_measure)
+                continue
+            exponent, coef = power_law_fit(x_coords, y_coords)
+            LOGGER.info('* %s: %s exponent %.4f', book.get_name(), plot_measure, exponent)
+            x_coords, y_coords, file_name = \
+                dump_book_data(xmeasure_num, ymeasure_num, book.get_name(), Plot.DATA_EXT,
+                               x_coords, y_coords, x_coords, coef * x_coords ** exponent)
+            plot_info.datainfos.append(DataInfo(book.get_name(), file_name, slope=exponent))
+            xmax = max(xmax, 10**math.ceil(math.log10(max(x_coords))))
+            ymax = max(ymax, 10**math.ceil(math.log10(max(y_coords))))
+        filename = os.path.join(Project().get_out_dir(), plot_info.title + Plot.PLT_EXT)
+        with open(filename, 'w') as file_handle:
+            file_handle.write(template.render(
+                plot_measure=plot_measure,
+                extension=Plot.EXT,
+                PlotInfo=plot_info,
+                xmax=xmax,
+                ymax=ymax,
+                outdir=Project().get_out_dir(),
+                nrows=4,
+                ncols=3,
+            ))
+        for cmd in Plot.CMDs:
+            run_command(cmd, filename)
+    @staticmethod
+    @profiled('plot:cdf_w_fit')
     def do_cdf_w_fit(supp):
         '''Do cumulative distribution probability with fitting multiplot on books.'''
         import scipy.special as sz
@@ -1108,19 +3718,14 @@ class Plot():
             datax = []
             book = Plot.BOOKS[i]
             book_name = book.get_name()
-            # alpha
-            alpha = Fits.alpha(book_name)
-            # kmin
-            xmin = Fits.kmin(book_name)
-            # p-value
-            pval = Fits.pvalue(book_name)
             graph = Plot.GS[i]
             # store degrees to run fitting algorithm
             file_name = os.path.join(Project().get_out_dir(),
                                      book_name + '-degrees' + Plot.DATA_EXT)
-            _file = open(file_name, 'w')
+            _file, file_name = open_output(file_name)
+            vprop_degrees = Graphs.get_vprop_degrees(graph)
             for vert in graph.vertices():
-                k = vert.out_degree()
+                k = vprop_degrees[vert]
                 if k <= 0:
                     continue
                 _file.write(str(k) + '\n')
@@ -1129,6 +3734,7 @@ class Plot():
                     xmax = k
             print('* Wrote ' + file_name + ';\t')
             _file.close()
+            (xmin, alpha, pval) = Fits.get_parms(book_name, datax)
             # Empirical data
             len_data = len(datax)
             x_coords = np.unique(datax)
@@ -1183,10 +3789,13 @@ class Plot():
         supp = Formatting.coro_write_suppl('suppl')
         next(supp)
         Plot.init()
+        MeasureExecutor.run(Plot.BOOKS, Graphs.get_centrality_nums() + [Measure.LOBBY])
         Plot.do_centralities(supp)
         Plot.do_assortativity()
         Plot.do_density_x_clustering_coeff()
         Plot.do_cdf_w_fit(supp)
+        Plot.do_zipf()
+        Plot.do_heaps()
         # send key to close supplementary file
         supp.send(('CLOSE_FILE', ''))
 
@@ -1199,10 +3808,29 @@ class Plot():
 class Formatting():
     """Main class to format output."""
     suppl_f = None # file to write supplementary material
+    # measures written in the table of global measures
+    global_names = ['n', 'm', 'deg_avg', 'deg_stdev', 'density', 'clustering']
+    # measures written in the table of legomena
+    legomena_names = ['n', 'hapax']
 
     def __init__(self):
         pass
 
+    @staticmethod
+    def get_global_measures(book):
+        """Return the global measures of the book."""
+        return get_book_measures(book, Formatting.global_names,
+                                 lambda book: Graphs.global_measures(book.read()))
+
+    @staticmethod
+    def get_legomena_measures(book):
+        """Return the number of characters and hapax legomena of the book."""
+        def compute(book):
+            book.read()
+            return {'n': book.get_number_characters(),
+                    'hapax': book.get_number_hapax_legomenas()}
+        return get_book_measures(book, Formatting.legomena_names, compute)
+
     @staticmethod
     def write_hapax_legomena_table():
         """"Hapax Legomena: write_hapax_legomena_table() function write the
@@ -1213,10 +3841,10 @@ class Formatting():
         n2b = {} # map book name to book object
         tbl = "" # store table content string
         # Sort books by hapax
-        for book in Books.get_books():
+        for book in Books.list_books():
             name = book.get_name()
-            graph = book.get_graph()
-            n2h[name] = float(book.get_number_hapax_legomenas()) / Graphs.size(graph)
+            meas = Formatting.get_legomena_measures(book)
+            n2h[name] = float(meas['hapax']) / meas['n']
             n2b[name] = book
 
         file_name = os.path.join(Project().get_out_dir(), 'legomenas.tex')
@@ -1228,14 +3856,12 @@ class Formatting():
             tbl += '\t\t\\begin{tabular}{@{}p{1.65cm}p{1cm}@{}}\\toprule\n'
             tbl += '\t\t\\bf book  & $\\mathbf{HL}$\\\\ \\colrule\n'
             n2h_lst = sorted(n2h.items(), key=operator.itemgetter(1), reverse=True)
-            for bname, _ in n2h_lst:
+            for bname, hapax in n2h_lst:
                 book = n2b[bname]
                 enum = book.get_genre()
-                if enum.value == name:
-                    nr_hap = book.get_number_hapax_legomenas()
-                    nr_chars = Graphs.size(book.get_graph())
+                if enum is not None and enum.value == name:
                     tbl += '\t\t\t' + book.get_label() + ' & '
-                    tbl += '{0:.2f}'.format(float(nr_hap)/nr_chars)
+                    tbl += '{0:.2f}'.format(hapax)
                     tbl += ' \\\\ \n'
             tbl += '\t\t\\botrule \\end{tabular}\n'
             tbl += '\t\\end{minipage}\n'
@@ -1266,22 +3892,19 @@ class Formatting():
 
         for _id in Books.get_genre_enums():
             line = '\t\t\\colrule\\multirow{4}{*}{'+ Books.get_genre_name(_id)  + '}' + '\n'
-            books = Books.get_books()
+            books = Books.list_books()
             for book in books:
                 enum = book.get_genre()
-                if enum.value == _id:
-                    graph = book.get_graph()
-                    clustering_coeff, _ = gt_cluster.global_clustering(graph)
-                    density = Graphs.density(graph)
-                    (deg_avg, deg_stdev) = Graphs.degree_stat(graph)
+                if enum is not None and enum.value == _id:
+                    meas = Formatting.get_global_measures(book)
                     # OUTPUT
                     line += '\t\t\t&\\emph{' + book.get_label() + '} & '
-                    line += str(len(list(graph.vertices()))) + ' & '
-                    line += str(len(list(graph.edges()))) + ' & '
-                    line += '{0:.2f}'.format(deg_avg) + '$\\pm$'
-                    line += '{0:.2f}'.format(deg_stdev) + ' & '
-                    line += '{0:.3f}'.format(density) + ' & '
-                    line += '{0:.3f}'.format(clustering_coeff) + ' & '
+                    line += str(int(meas['n'])) + ' & '
+                    line += str(int(meas['m'])) + ' & '
+                    line += '{0:.2f}'.format(meas['deg_avg']) + '$\\pm$'
+                    line += '{0:.2f}'.format(meas['deg_stdev']) + ' & '
+                    line += '{0:.3f}'.format(meas['density']) + ' & '
+                    line += '{0:.3f}'.format(meas['clustering']) + ' & '
                     line += "\\\\ \n"
             _file.write(line)
         _file.write("\t\t\\botrule\\end{tabular}}\n")
@@ -1289,6 +3912,31 @@ class Formatting():
         _file.close()
         print('* Wrote ' + file_name)
 
+    @staticmethod
+    def write_top_characters(num, limit=10):
+        """Write the characters with highest values of the measure ID num
+        in each genre, querying the store of results."""
+        store = Project().get_store()
+        if store is None:
+            LOGGER.error('* A store of results must be set to query top characters.')
+            exit()
+        books = Books.list_books()
+        MeasureExecutor.run(books, [num])
+        for book in books: # stored values are not recomputed
+            store.get_vertex_measure(book, num)
+        file_name = os.path.join(Project().get_out_dir(),
+                                 'top-' + num.name.lower() + '.csv')
+        _file, file_name = open_output(file_name)
+        for genre in BookGenre:
+            for row in store.top_characters(num, limit, genre):
+                (book_name, genre_name, lab, char_name, value) = row
+                _file.write(genre_name + CSV_FIELDS_SEPARATOR + book_name
+                            + CSV_FIELDS_SEPARATOR + lab + CSV_FIELDS_SEPARATOR
+                            + '\"' + char_name + '\"' + CSV_FIELDS_SEPARATOR
+                            + str(value) + '\n')
+        _file.close()
+        print('* Wrote ' + file_name)
+
     @staticmethod
     def write_vertices_degree():
         """Write the degree of the vertices of a graph to output."""
@@ -1298,13 +3946,14 @@ class Formatting():
             degs = {}
             char_names = {}
             graph = book.get_graph()
+            vprop_degrees = Graphs.get_vprop_degrees(graph)
             for vert in graph.vertices():
-                lab = graph.vertex_properties["label"][vert]
-                degs[lab] = vert.out_degree()
-                char_names[lab] = graph.vertex_properties["char_name"][vert]
+                lab = book.get_char_label(vert)
+                degs[lab] = vprop_degrees[vert]
+                char_names[lab] = book.get_char_name(vert)
             file_name = book.get_name() + suf
             file_name = os.path.join(Project().get_out_dir(), file_name)
-            _file = open(file_name, 'w')
+            _file, file_name = open_output(file_name)
             # Sort by degree in reverse order
             labs = sorted(degs.items(), key=lambda x: x[1], reverse=True)
             for lab, deg in labs:
@@ -1326,11 +3975,11 @@ class Formatting():
             graph = book.get_graph()
             file_name = book.get_name() + suf
             file_name = os.path.join(Project().get_out_dir(), file_name)
-            _file = open(file_name, 'w')
+            _file, file_name = open_output(file_name)
             for vert in graph.vertices():
-                lab = graph.vertex_properties["label"][vert]
+                lab = book.get_char_label(vert)
                 freqs[lab] = graph.vertex_properties["frequency"][vert]
-                char_names[lab] = graph.vertex_properties["char_name"][vert]
+                char_names[lab] = book.get_char_name(vert)
             labs = sorted(freqs.items(), key=lambda x: x[1], reverse=True)
             for lab, freq in labs:
                 _file.write(lab + sep + '\"' + char_names[lab] + '\"'+ sep + str(freq) + '\n')
@@ -1347,16 +3996,16 @@ class Formatting():
             graph = book.get_graph()
             file_name = os.path.join(Project().get_out_dir(),
                                      book.get_name() + suf)
-            _file = open(file_name, 'w')
+            _file, file_name = open_output(file_name)
             for edge in graph.edges():
                 src = edge.source()
                 dest = edge.target()
-                lab = graph.vertex_properties["label"][src]
-                lab += GRAPH_EDGE_SYMBOL + graph.vertex_properties["label"][dest]
+                lab = book.get_char_label(src)
+                lab += GRAPH_EDGE_SYMBOL + book.get_char_label(dest)
                 weights[lab] = graph.edge_properties["weight"][edge]
-                char_names[lab] = '\"' + graph.vertex_properties["char_name"][src] + '\"' \
+                char_names[lab] = '\"' + book.get_char_name(src) + '\"' \
                                   +  GRAPH_EDGE_SYMBOL \
-                                  + '\"' + graph.vertex_properties["char_name"][dest] + '\"'
+                                  + '\"' + book.get_char_name(dest) + '\"'
             labs = sorted(weights.items(), key=lambda x: x[1], reverse=True)
             for lab, weight in labs:
                 _file.write(lab + CSV_FIELDS_SEPARATOR + char_names[lab] \
@@ -1364,6 +4013,157 @@ class Formatting():
             _file.close()
             print('* Wrote ' + file_name)
 
+    @staticmethod
+    def write_group_statistics():
+        """Write the distribution of the size of encounter groups of each book
+        and a summary of sizes and participation of characters in groups."""
+        sep = CSV_FIELDS_SEPARATOR
+        file_name = os.path.join(Project().get_out_dir(), 'groups.csv')
+        summary, file_name = open_output(file_name)
+        summary.write(sep.join(['book', 'groups', 'size_avg', 'size_max',
+                                'participation_avg', 'participation_max']) + '\n')
+        for book in Books.list_books():
+            book.parse()
+            if book.incidence is None:
+                LOGGER.warning('* Encounter groups of book \"%s\" are not available!',
+                               book.get_name())
+                continue
+            sizes = book.get_group_sizes()
+            part = book.get_participation()
+            dist_name = os.path.join(Project().get_out_dir(),
+                                     book.get_name() + '-group-size.csv')
+            _file, dist_name = open_output(dist_name)
+            for size, count in enumerate(np.bincount(sizes)):
+                if count > 0:
+                    _file.write(str(size) + sep + str(count) + '\n')
+            _file.close()
+            print('* Wrote ' + dist_name)
+            if len(sizes) == 0:
+                sizes = part = np.zeros(1, dtype=int)
+            summary.write(sep.join([book.get_name(), str(book.incidence.shape[1]),
+                                    '%.4f' % sizes.mean(), str(sizes.max()),
+                                    '%.4f' % part.mean(), str(part.max())]) + '\n')
+        summary.close()
+        print('* Wrote ' + file_name)
+
+    @staticmethod
+    def write_clustering():
+        """Write the local and weighted clustering coefficients of the
+        characters and the average clustering C(k) by degree k, or only the
+        estimate of C(k) by bins of degree when a budget of wedges is set."""
+        sep = CSV_FIELDS_SEPARATOR
+        budget = Project().get_clustering_sampling()
+        for book in Books.get_books():
+            if budget is not None:
+                Formatting.write_clustering_estimate(book, budget)
+                continue
+            clust = Graphs.get_clustering(book.get_graph())
+            file_name = os.path.join(Project().get_out_dir(),
+                                     book.get_name() + '-vertex-clustering.csv')
+            _file, file_name = open_output(file_name)
+            for idx in np.argsort(-clust['local'], kind='stable'):
+                _file.write(book.get_char_label(idx) + sep + '\"' + book.get_char_name(idx)
+                            + '\"' + sep + str(clust['degrees'][idx])
+                            + sep + str(clust['triangles'][idx])
+                            + sep + '%.6f' % clust['local'][idx]
+                            + sep + '%.6f' % clust['weighted'][idx] + '\n')
+            _file.close()
+            print('* Wrote ' + file_name)
+            file_name = os.path.join(Project().get_out_dir(),
+                                     book.get_name() + '-clustering-spectrum.csv')
+            _file, file_name = open_output(file_name)
+            for (k, c_k, count) in zip(*Graphs.get_clustering_spectrum(clust['degrees'],
+                                                                       clust['local'])):
+                _file.write(str(k) + sep + '%.6f' % c_k + sep + str(count) + '\n')
+            _file.close()
+            print('* Wrote ' + file_name)
+
+    @staticmethod
+    def write_clustering_estimate(book, budget):
+        """Write the clustering of the wedges sampled within the budget by
+        bins [k_min, k_max] of the degree of their centers, with the half
+        width of its confidence interval and the number of wedges."""
+        sep = CSV_FIELDS_SEPARATOR
+        estimate = Graphs.get_clustering_estimate(book.get_graph(), budget)
+        LOGGER.info('* %s: clustering coefficient %.4f +/- %.4f (%d wedges)',
+                    book.get_name(), estimate['global'], estimate['half_width'],
+                    estimate['samples'])
+        file_name = os.path.join(Project().get_out_dir(),
+                                 book.get_name() + '-clustering-spectrum.csv')
+        _file, file_name = open_output(file_name)
+        for (k_min, k_max, c_k, half_width, count) in estimate['bins']:
+            _file.write(str(k_min) + sep + str(k_max) + sep + '%.6f' % c_k
+                        + sep + '%.6f' % half_width + sep + str(count) + '\n')
+        _file.close()
+        print('* Wrote ' + file_name)
+
+    @staticmethod
+    def write_coreness():
+        """Write the degree, lobby index, coreness and s-coreness of the
+        characters and the size of the k-cores of each book."""
+        sep = CSV_FIELDS_SEPARATOR
+        for book in Books.get_books():
+            graph = book.get_graph()
+            n_verts = graph.num_vertices()
+            lobbies = np.array(get_vertex_measure(book, Measure.LOBBY), dtype=float) * n_verts
+            coreness = Graphs.get_coreness(graph)
+            s_coreness = Graphs.get_coreness(graph, weighted=True)
+            vprop_degrees = Graphs.get_vprop_degrees(graph)
+            file_name = os.path.join(Project().get_out_dir(),
+                                     book.get_name() + '-vertex-coreness.csv')
+            _file, file_name = open_output(file_name)
+            for idx in np.argsort(-coreness, kind='stable'):
+                _file.write(book.get_char_label(idx) + sep + '\"' + book.get_char_name(idx)
+                            + '\"' + sep + str(vprop_degrees[graph.vertex(idx)])
+                            + sep + str(int(round(lobbies[idx])))
+                            + sep + str(coreness[idx]) + sep + str(s_coreness[idx]) + '\n')
+            _file.close()
+            print('* Wrote ' + file_name)
+            file_name = os.path.join(Project().get_out_dir(),
+                                     book.get_name() + '-core-profile.csv')
+            _file, file_name = open_output(file_name)
+            for (k, size) in zip(*Graphs.get_core_profile(coreness)):
+                _file.write(str(k) + sep + str(size) + '\n')
+            _file.close()
+            print('* Wrote ' + file_name)
+
+    @staticmethod
+    def write_assortativity():
+        """Write the degree, weighted and frequency assortativity coefficients
+        of each book with their jackknife standard errors."""
+        sep = CSV_FIELDS_SEPARATOR
+        file_name = os.path.join(Project().get_out_dir(), 'assortativity.csv')
+        _file, file_name = open_output(file_name)
+        header = ['book']
+        for variant in ASSORTATIVITY_VARIANTS:
+            header += ['r_' + variant, 'r_' + variant + '_err']
+        _file.write(sep.join(header) + '\n')
+        for book in Books.get_books():
+            assort = Graphs.get_assortativity(book.get_graph())
+            row = [book.get_name()]
+            for variant in ASSORTATIVITY_VARIANTS:
+                row += ['%.6f' % value for value in assort[variant]]
+            _file.write(sep.join(row) + '\n')
+        _file.close()
+        print('* Wrote ' + file_name)
+
+    @staticmethod
+    def write_rich_club():
+        """Write the rich-club coefficients of each book, unweighted and
+        weighted, normalized by the coefficients of rewired graphs."""
+        sep = CSV_FIELDS_SEPARATOR
+        columns = ['phi', 'phi_rand', 'phi_rho', 'weighted', 'weighted_rand', 'weighted_rho']
+        for book in Books.get_books():
+            club = Graphs.get_rich_club(book.get_graph())
+            file_name = os.path.join(Project().get_out_dir(),
+                                     book.get_name() + '-rich-club.csv')
+            _file, file_name = open_output(file_name)
+            for i, k in enumerate(club['k']):
+                _file.write(sep.join([str(k), str(club['vertices'][i]), str(club['edges'][i])]
+                                     + ['%.6f' % club[name][i] for name in columns]) + '\n')
+            _file.close()
+            print('* Wrote ' + file_name)
+
     @staticmethod
     def coro_write_suppl(filename):
         """Write supplementary material like p-values to output.
@@ -1425,6 +4225,7 @@ class Draw():
         return self.__class__.__name__
 
     @staticmethod
+    @profiled('draw:graphs')
     def do_graphs():
         '''Graphs for the characters' encounters are drawn for visualization.'''
         LOGGER.info('* Drawing graphs...')
@@ -1439,7 +4240,7 @@ class Draw():
                                vertex_text_color="black",
                                vertex_font_size=12,
                                vertex_fill_color=color,
-                               vertex_text=graph.vertex_properties["label"],
+                               vertex_text=book.get_label_property(),
                                vertex_size=vprop_degrees,
                                edge_pen_width=graph.edge_properties["weight"])
             LOGGER.info('* Wrote %s', file_name)
@@ -1450,13 +4251,7 @@ class Draw():
 #########
 # This module has the function to calculate Lobby centrality.
 
-HANDLER = None
-if LOGGER.getEffectiveLevel() == logging.DEBUG:
-    HANDLER = logging.FileHandler(os.path.join(Project().get_out_dir(), 'lobby.log'))
-    FORMATTER = logging.Formatter('%(message)s')
-    HANDLER.setFormatter(FORMATTER)
-    LOGGER.addHandler(HANDLER)
-
+@profiled('measure:lobby', len)
 def lobby(graph):
     """ Lobby or h index
         ================
@@ -1480,67 +4275,688 @@ def lobby(graph):
     """
     n_verts = len(list(graph.vertices()))
     lobbies = [0] * n_verts
-
-    LOGGER.debug('* %s', graph.graph_properties["name"])
+    tracing = Tracer.enabled
+    vprop_degrees = Graphs.get_vprop_degrees(graph)
 
     for vert in graph.vertices():
 
-        LOGGER.debug('%s\tdegree=%s',
-                     graph.vertex_properties['label'][vert],
-                     str(vert.out_degree()))
-
         degs = [] # neighbors' degree
 
         for neighbor in vert.out_neighbors():
-            degs.append(neighbor.out_degree())
+            degs.append(vprop_degrees[neighbor])
 
         degs.sort()
         degs.reverse()
-        old_idx = idx = 0
+        lob = old_idx = idx = 0 # isolated vertices have lobby 0
         for deg in degs:
             lob = idx = idx + 1
-
-            LOGGER.debug("\t%s\t%s", str(idx), str(deg))
-
             if deg < idx:
                 lob = old_idx
                 break
             old_idx = idx
 
-            LOGGER.debug("** Lobby=%s", str(lob))
-
         lobbies[int(vert)] = float(lob) / n_verts # normalize by N vertices
 
-        if HANDLER:
-            LOGGER.debug('* Wrote %s', HANDLER.stream.name)
+        if tracing:
+            Tracer.add('lobby_steps', idx)
+            Tracer.event('lobby_vertices', '* %s: %s\tdegree=%s\tlobby=%s',
+                         graph.graph_properties["name"], int(vert), len(degs), lob)
 
     return lobbies
 
+def lobby_csr(csr):
+    """Return the normalized lobby index of the vertices from the arrays
+    of Graphs.get_csr(), see lobby()."""
+    indptr = csr['indptr']
+    degrees = csr['degrees']
+    n_verts = len(degrees)
+    lobbies = [0.0] * n_verts
+    for vert in range(n_verts):
+        neighbors = csr['indices'][indptr[vert]:indptr[vert+1]]
+        others = neighbors[neighbors != vert]
+        # a self-loop is in the neighbors of lobby() once for each unit it
+        # adds to the degree, the arrays keep it once
+        loops = np.full(degrees[vert] - len(others), degrees[vert])
+        degs = np.sort(np.concatenate((degrees[others], loops)))[::-1]
+        # the lobby is the largest position not greater than the degree
+        lob = int(np.count_nonzero(degs >= np.arange(1, len(degs) + 1)))
+        lobbies[vert] = float(lob) / n_verts # normalize by N vertices
+    return lobbies
+
+def triangles_csr(csr, max_wedges=TRIANGLE_MAX_WEDGES):
+    """Count the triangles of the graph from the arrays of Graphs.get_csr()
+    and return a dictionary with the number of triangles of each vertex
+    (triangles), the local clustering (local), the weighted clustering of
+    Barrat et al. (weighted), the degrees without self-loops (degrees) and
+    the global clustering coefficient (global).
+
+    Edges are oriented from the vertex of lower degree to the one of higher
+    degree, so each triangle is found once from its lowest vertex u as a
+    wedge v-u-x of two out-edges closed by the edge v-x, looked up in the
+    sorted array of edges. The wedges are checked in chunks of at most
+    max_wedges (but the wedges of a single edge)."""
+    indptr = csr['indptr']
+    n_verts = len(indptr) - 1
+    rows = np.repeat(np.arange(n_verts, dtype=np.int64), np.diff(indptr))
+    cols = csr['indices'].astype(np.int64)
+    wts = csr['weights'].astype(float)
+    no_loops = rows != cols
+    rows, cols, wts = rows[no_loops], cols[no_loops], wts[no_loops]
+    degrees = np.bincount(rows, minlength=n_verts)
+    strengths = np.bincount(rows, weights=wts, minlength=n_verts)
+    # rank by degree, ties by index
+    rank = np.empty(n_verts, dtype=np.int64)
+    rank[np.lexsort((np.arange(n_verts), degrees))] = np.arange(n_verts)
+    # undirected edges sorted by key lo*n+hi, to close the wedges
+    upper = rows < cols
+    keys = rows[upper] * n_verts + cols[upper]
+    order = np.argsort(keys)
+    keys, key_wts = keys[order], wts[upper][order]
+    # oriented edges sorted by source, the out-edges of u are contiguous
+    fwd = rank[rows] < rank[cols]
+    src, dst, fwd_wts = rows[fwd], cols[fwd], wts[fwd]
+    order = np.lexsort((dst, src))
+    src, dst, fwd_wts = src[order], dst[order], fwd_wts[order]
+    # out-edges after each edge with the same source: one wedge per pair
+    out_end = np.cumsum(np.bincount(src, minlength=n_verts))
+    n_after = out_end[src] - np.arange(len(src)) - 1
+    ends = np.cumsum(n_after)
+    triangles = np.zeros(n_verts)
+    wsums = np.zeros(n_verts) # sum of the weights of the edges of the triangles at the vertex
+    first = 0
+    while first < len(src):
+        last = max(first + 1, int(np.searchsorted(ends, ends[first] - n_after[first]
+                                                  + max_wedges, side='right')))
+        first_edges = np.arange(first, last)
+        counts = n_after[first:last]
+        starts = np.cumsum(counts) - counts
+        offs = np.arange(counts.sum()) - np.repeat(starts, counts)
+        edge_a = np.repeat(first_edges, counts)
+        edge_b = edge_a + 1 + offs
+        v_verts, x_verts = dst[edge_a], dst[edge_b]
+        wedge_keys = np.minimum(v_verts, x_verts) * n_verts + np.maximum(v_verts, x_verts)
+        pos = np.minimum(np.searchsorted(keys, wedge_keys), max(len(keys) - 1, 0))
+        closed = keys[pos] == wedge_keys if len(keys) else np.zeros(0, dtype=bool)
+        u_verts = src[edge_a][closed]
+        v_verts, x_verts = v_verts[closed], x_verts[closed]
+        w_uv, w_ux, w_vx = fwd_wts[edge_a][closed], fwd_wts[edge_b][closed], key_wts[pos][closed]
+        for (verts, wsum) in ((u_verts, w_uv + w_ux), (v_verts, w_uv + w_vx),
+                              (x_verts, w_ux + w_vx)):
+            triangles += np.bincount(verts, minlength=n_verts)
+            wsums += np.bincount(verts, weights=wsum, minlength=n_verts)
+        first = last
+    pairs = degrees * (degrees - 1.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        local = np.where(pairs > 0, 2.0 * triangles / pairs, 0.0)
+        weighted = np.where(pairs > 0, wsums / (strengths * (degrees - 1.0)), 0.0)
+    n_wedges = pairs.sum() / 2.0
+    return {
+        'triangles': triangles.astype(np.int64),
+        'local': local,
+        'weighted': weighted,
+        'degrees': degrees,
+        'global': triangles.sum() / n_wedges if n_wedges > 0 else 0.0,
+    }
+
+class SpectralSolver():
+    """Power iteration of PageRank and eigenvector centrality on the
+    weighted adjacency matrix of the arrays of Graphs.get_csr(). The
+    iteration starts from the last solution of the same measure and key
+    (e.g., the name of the book), so the solution of a graph that changed
+    slightly, like a book that grew by a chapter or a replicate of a null
+    model, takes a few iterations. Vertices added since the last solution
+    (at the end, as characters are added in order) start with the mean."""
+    solutions = {} # (measure ID, key) to the last solution
+    iterations = {} # (measure ID, key) to the iterations of the last solution
+
+    @staticmethod
+    def get_start(which, key, n_verts):
+        """Return the starting vector of the iteration."""
+        last = SpectralSolver.solutions.get((which, key))
+        if last is None or len(last) == 0 or n_verts == 0:
+            return np.full(n_verts, 1.0 / max(n_verts, 1))
+        start = np.full(n_verts, last.mean())
+        start[:min(n_verts, len(last))] = last[:n_verts]
+        return start
+
+    @staticmethod
+    def solve(csr, which, key=None, tol=None):
+        """Return the values of the spectral centrality which: PageRank with
+        damping PAGERANK_DAMPING, summing 1, or the eigenvector centrality,
+        the principal eigenvector with unit norm."""
+        if tol is None:
+            tol = Project().get_spectral_tolerance()
+        n_verts = len(csr['degrees'])
+        adj = sparse.csr_matrix((csr['weights'].astype(float), csr['indices'], csr['indptr']),
+                                shape=(n_verts, n_verts))
+        vals = SpectralSolver.get_start(which, key, n_verts)
+        if which == Measure.PAGERANK:
+            strengths = np.asarray(adj.sum(axis=1)).ravel()
+            dangling = strengths == 0
+            inv_strengths = np.divide(1.0, strengths, out=np.zeros(n_verts), where=~dangling)
+            vals /= max(vals.sum(), 1e-300)
+        else:
+            vals /= max(np.linalg.norm(vals), 1e-300)
+        iteration = 0
+        while iteration < SPECTRAL_MAX_ITERATIONS and n_verts > 0:
+            iteration += 1
+            if which == Measure.PAGERANK:
+                new_vals = PAGERANK_DAMPING * (adj @ (vals * inv_strengths)) \
+                           + (PAGERANK_DAMPING * vals[dangling].sum()
+                              + 1.0 - PAGERANK_DAMPING) / n_verts
+                new_vals /= new_vals.sum()
+            else: # shifted by the identity, to converge on bipartite graphs
+                new_vals = adj @ vals + vals
+                norm_vals = np.linalg.norm(new_vals)
+                if norm_vals == 0:
+                    break
+                new_vals /= norm_vals
+            change = np.abs(new_vals - vals).sum()
+            vals = new_vals
+            if change < tol:
+                break
+        SpectralSolver.solutions[(which, key)] = vals
+        SpectralSolver.iterations[(which, key)] = iteration
+        if Tracer.enabled:
+            Tracer.add(which.name.lower() + '_iterations', iteration)
+        return vals.copy()
+
+def wedge_sampling_csr(csr, budget, confidence=0.95, seed=0):
+    """Estimate the global clustering coefficient of the graph from the
+    arrays of Graphs.get_csr() as the fraction of closed wedges among
+    wedges sampled uniformly: the center of a wedge is drawn with
+    probability proportional to its number of wedges and the ends are two
+    distinct neighbors. The budget is the number of wedges sampled or, if
+    it is less than 1, the half width of the confidence interval to reach.
+    Return a dictionary with the estimate (global), the half width of its
+    confidence interval (half_width), the number of wedges (samples) and
+    the list of degree bins [k_min, k_max] of the centers with tuples
+    (k_min, k_max, estimate, half_width, samples). The interval is the
+    Wilson score interval, whose width is not 0 when no wedge or every
+    wedge sampled is closed, so sampling to a half width does not stop
+    at an estimate of 0 +/- 0 on a sparse graph."""
+    z_val = norm.ppf(0.5 + confidence / 2.0)
+    indptr = csr['indptr']
+    n_verts = len(indptr) - 1
+    rows = np.repeat(np.arange(n_verts, dtype=np.int64), np.diff(indptr))
+    cols = csr['indices'].astype(np.int64)
+    no_loops = rows != cols
+    rows, cols = rows[no_loops], cols[no_loops]
+    degrees = np.bincount(rows, minlength=n_verts)
+    starts = np.cumsum(degrees) - degrees
+    keys = np.sort(rows[rows < cols] * n_verts + cols[rows < cols])
+    cum_wedges = np.cumsum(degrees * (degrees - 1) / 2.0)
+    if n_verts == 0 or cum_wedges[-1] == 0:
+        return {'global': 0.0, 'half_width': 0.0, 'samples': 0, 'bins': []}
+    def half_width(closed, samples):
+        ratio = float(closed) / samples
+        z_sq = z_val * z_val / samples
+        return z_val / (1.0 + z_sq) \
+            * math.sqrt(ratio * (1.0 - ratio) / samples + z_sq / (4.0 * samples))
+    if budget >= 1:
+        (max_samples, target) = (int(budget), None)
+    else: # enough samples for the worst case ratio 1/2
+        (max_samples, target) = (int(math.ceil((z_val / (2.0 * budget)) ** 2)), budget)
+    rng = np.random.default_rng(seed)
+    centers = []
+    closed = []
+    (n_samples, n_closed) = (0, 0)
+    while n_samples < max_samples:
+        size = min(WEDGE_SAMPLING_BATCH, max_samples - n_samples)
+        center = np.searchsorted(cum_wedges, rng.random(size) * cum_wedges[-1], side='right')
+        degs = degrees[center]
+        end_a = rng.integers(0, degs)
+        end_b = rng.integers(0, degs - 1)
+        end_b += end_b >= end_a
+        v_verts = cols[starts[center] + end_a]
+        x_verts = cols[starts[center] + end_b]
+        wedge_keys = np.minimum(v_verts, x_verts) * n_verts + np.maximum(v_verts, x_verts)
+        pos = np.minimum(np.searchsorted(keys, wedge_keys), len(keys) - 1)
+        is_closed = keys[pos] == wedge_keys
+        centers.append(center)
+        closed.append(is_closed)
+        n_samples += size
+        n_closed += int(is_closed.sum())
+        if target is not None and half_width(n_closed, n_samples) <= target:
+            break
+    center_bins = np.log2(degrees[np.concatenate(centers)]).astype(int)
+    closed = np.concatenate(closed)
+    bins = []
+    for exp in np.unique(center_bins):
+        in_bin = closed[center_bins == exp]
+        bins.append((int(2 ** exp), int(2 ** (exp + 1) - 1), float(in_bin.mean()),
+                     float(half_width(in_bin.sum(), len(in_bin))), len(in_bin)))
+    return {
+        'global': float(n_closed) / n_samples,
+        'half_width': float(half_width(n_closed, n_samples)),
+        'samples': n_samples,
+        'bins': bins,
+    }
+
+def simple_degrees_csr(csr):
+    """Return the number of other vertices adjacent to each vertex in the
+    arrays of get_csr(), the degrees without self-loops."""
+    n_verts = len(csr['degrees'])
+    rows = np.repeat(np.arange(n_verts), np.diff(csr['indptr']))
+    loops = np.bincount(rows[rows == csr['indices']], minlength=n_verts)
+    return np.diff(csr['indptr']) - loops
+
+def assortativity_csr(csr, variant='degree'):
+    """Return the assortativity coefficient r of the graph in the arrays of
+    get_csr() and its jackknife standard error. The variant 'degree' is the
+    Pearson correlation of the degrees at the ends of the edges (Newman),
+    'weighted' weights every edge by its weight (Leung and Chau) and
+    'frequency' correlates the frequency of the characters instead of their
+    degrees. Self-loops are left out.
+    The coefficient is a function of four sums over the edges, so the r_e of
+    the graph without edge e comes from subtracting the terms of e from the
+    sums, and the error sqrt((m-1)/m sum_e (r_e - mean r_e)^2) takes O(m)
+    instead of recomputing r for every edge."""
+    n_verts = len(csr['degrees'])
+    rows = np.repeat(np.arange(n_verts), np.diff(csr['indptr']))
+    upper = rows < csr['indices']
+    sources, targets = rows[upper], csr['indices'][upper]
+    values = simple_degrees_csr(csr)
+    if variant == 'frequency':
+        values = csr['frequency']
+    x_vals = values[sources].astype(float)
+    y_vals = values[targets].astype(float)
+    if variant == 'weighted':
+        wts = csr['weights'][upper].astype(float)
+    else:
+        wts = np.ones(len(sources))
+    terms = np.stack((wts, wts * x_vals * y_vals, wts * (x_vals + y_vals) / 2,
+                      wts * (x_vals ** 2 + y_vals ** 2) / 2))
+    def coefficient(sums):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = sums[2] / sums[0]
+            return (sums[1] / sums[0] - mean ** 2) / (sums[3] / sums[0] - mean ** 2)
+    n_edges = len(sources)
+    if n_edges < 2:
+        return float('nan'), float('nan')
+    totals = terms.sum(axis=1)
+    r_coef = coefficient(totals)
+    r_jack = coefficient(totals[:, np.newaxis] - terms)
+    error = np.sqrt((n_edges - 1) / n_edges * ((r_jack - r_jack.mean()) ** 2).sum())
+    return float(r_coef), float(error)
+
+def rich_club_csr(csr):
+    """Return the rich-club coefficients of the graph in the arrays of
+    get_csr() for every degree k below the maximum degree: 'vertices' with
+    degree greater than k, the number of 'edges' among them, the fraction
+    'phi' of the possible edges among them that exist and the 'weighted'
+    coefficient (Opsahl et al.), their total weight over the total of the
+    same number of heaviest edges of the graph. Self-loops are left out.
+    An edge is among vertices with degree greater than k when its end of
+    lowest degree is, so counting the edges by that degree and summing the
+    counts from the highest degree down gives the curves in O(m), instead
+    of scanning the edges again for every k."""
+    n_verts = len(csr['degrees'])
+    rows = np.repeat(np.arange(n_verts), np.diff(csr['indptr']))
+    degrees = simple_degrees_csr(csr)
+    upper = rows < csr['indices']
+    mins = np.minimum(degrees[rows[upper]], degrees[csr['indices'][upper]])
+    wts = csr['weights'][upper].astype(float)
+    k_max = int(degrees.max()) if n_verts else 0
+    # counts of the degrees greater than k, for k = 0, ..., k_max-1
+    def above(counts):
+        return (counts.sum() - np.cumsum(counts))[:k_max]
+    n_above = above(np.bincount(degrees, minlength=k_max + 1))
+    e_above = above(np.bincount(mins, minlength=k_max + 1)).astype(np.int64)
+    w_above = above(np.bincount(mins, weights=wts, minlength=k_max + 1))
+    heaviest = np.concatenate(([0.0], np.cumsum(np.sort(wts)[::-1])))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        phi = 2.0 * e_above / (n_above * (n_above - 1.0))
+        weighted = w_above / heaviest[e_above]
+    return {
+        'k': np.arange(k_max),
+        'vertices': n_above,
+        'edges': e_above,
+        'phi': phi,
+        'weighted': weighted,
+    }
+
+def coreness_csr(csr, weighted=False):
+    """Return the coreness (shell index) of the vertices from the arrays of
+    Graphs.get_csr(): the largest k such that the vertex belongs to the
+    k-core, the maximal subgraph where all vertices have degree at least k.
+    If weighted, the degree is replaced by the strength, the sum of the
+    weights of the edges (s-core). Self-loops are not counted.
+
+    The vertices are peeled in increasing order of their current degree
+    kept in a bucket queue, each bucket a list where a vertex is added
+    again when its degree decreases (stale entries are skipped). The time
+    is linear in the number of edges and in the maximum degree."""
+    indptr = csr['indptr']
+    indices = csr['indices'].tolist()
+    weights = csr['weights'].tolist() if weighted else [1] * len(indices)
+    n_verts = len(indptr) - 1
+    rows = np.repeat(np.arange(n_verts), np.diff(indptr))
+    no_loops = rows != csr['indices']
+    if weighted:
+        degs = np.bincount(rows[no_loops], weights=csr['weights'][no_loops], minlength=n_verts)
+    else:
+        degs = np.bincount(rows[no_loops], minlength=n_verts)
+    degs = degs.astype(np.int64).tolist()
+    indptr = indptr.tolist()
+    buckets = [[] for _ in range(max(degs, default=0) + 1)]
+    for vert, deg in enumerate(degs):
+        buckets[deg].append(vert)
+    removed = [False] * n_verts
+    coreness = np.zeros(n_verts, dtype=np.int64)
+    for level, bucket in enumerate(buckets):
+        while bucket:
+            vert = bucket.pop()
+            if removed[vert] or degs[vert] != level:
+                continue
+            removed[vert] = True
+            coreness[vert] = level
+            for pos in range(indptr[vert], indptr[vert+1]):
+                neighbor = indices[pos]
+                if removed[neighbor] or degs[neighbor] <= level:
+                    continue
+                degs[neighbor] = max(level, degs[neighbor] - weights[pos])
+                buckets[degs[neighbor]].append(neighbor)
+    return coreness
+
+##########
+# SERVER #
+##########
+# The server mode keeps the books parsed and the measures of their
+# characters in memory between requests, so notebooks and job scripts
+# do not pay for the start of the program and the parsing of the books
+# at each request. It listens on a port of localhost or on a Unix socket
+# and answers GET requests with plain text:
+#
+#   /books                   name, characters and edges of each book
+#   /measure/<measure>/<book> label, name and value of each character,
+#                            e.g., /measure/degree/hawking
+#   /task/<task>             run a task named as its long option, e.g.,
+#                            /task/clustering, and list the files written
+#   /plot/<plot>             render a plot, e.g., /plot/cdf
+#
+# Before each request the data files are checked, and a book whose file
+# changed (modification time or size) is read again and its measures are
+# dropped. If the file cannot be read, e.g., it was saved in the middle of
+# an edit, the book keeps its previous graph and the file is read again
+# when it changes once more. The requests are answered one at a time, as
+# the tasks share the books. Archived books are not checked.
+
+class AnalysisServer():
+    """Answer requests on the books kept in memory."""
+    stamps = {} # book name to the stamp of its data file when it was read
+    failed = {} # book name to the stamp of its data file that could not be read
+    # plot name to the function rendering it, the ones writing p-values to
+    # the supplementary material receive a coroutine
+    plots = {
+        'centralities': (Plot.do_centralities, True),
+        'assortativity': (Plot.do_assortativity, False),
+        'density': (Plot.do_density_x_clustering_coeff, False),
+        'cdf': (Plot.do_cdf_w_fit, True),
+        'zipf': (Plot.do_zipf, False),
+        'heaps': (Plot.do_heaps, False),
+    }
+
+    def __init__(self, address):
+        self.address = address
+
+    @staticmethod
+    def refresh():
+        """Read again the books whose data files changed and return their
+        names."""
+        changed = []
+        for book in Books.list_books():
+            if isinstance(book, ArchivedBook):
+                continue
+            name = book.get_name()
+            stamp = book.get_file_stamp()
+            if name in AnalysisServer.stamps and AnalysisServer.stamps[name] != stamp:
+                if AnalysisServer.failed.get(name) == stamp:
+                    continue
+                LOGGER.info('* Data file of book "%s" changed, reading it again', name)
+                state = dict(vars(book))
+                try:
+                    book.reload()
+                except (Exception, SystemExit) as err: # the parser exit()s on errors
+                    LOGGER.error('* Book "%s" was not read again: %s', name, err)
+                    vars(book).clear()
+                    vars(book).update(state)
+                    AnalysisServer.failed[name] = stamp
+                    continue
+                for key in [key for key in MeasureExecutor.results if key[0] == name]:
+                    del MeasureExecutor.results[key]
+                AnalysisServer.failed.pop(name, None)
+                changed.append(name)
+            AnalysisServer.stamps[name] = stamp
+        return changed
+
+    @staticmethod
+    def get_measure(book, num):
+        """Return the values of the measure ID num of the characters of the
+        book, keeping them for the next requests."""
+        if num == Measure.DEGREE:
+            return Graphs.get_vprop_degrees(book.get_graph()).a.tolist()
+        return get_vertex_measure(book, num)
+
+    @staticmethod
+    def get_books():
+        """Return the table of books."""
+        sep = CSV_FIELDS_SEPARATOR
+        lines = []
+        for book in Books.get_books():
+            graph = book.get_graph()
+            lines.append(sep.join([book.get_name(), str(graph.num_vertices()),
+                                   str(graph.num_edges())]))
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def get_measure_table(measure_name, book_name):
+        """Return the table of the measure of the characters of the book,
+        sorted by value, or None if the measure or the book is unknown."""
+        nums = Graphs.get_centrality_nums() + [Measure.LOBBY, Measure.DEGREE]
+        book = Books.find(book_name)
+        if measure_name.upper() not in Measure.__members__ or book is None:
+            return None
+        num = Measure[measure_name.upper()]
+        if num not in nums:
+            return None
+        Books.get_books()
+        values = AnalysisServer.get_measure(book, num)
+        sep = CSV_FIELDS_SEPARATOR
+        lines = []
+        for idx in sorted(range(len(values)), key=lambda idx: -values[idx]):
+            lines.append(book.get_char_label(idx) + sep + '\"' + book.get_char_name(idx)
+                         + '\"' + sep + str(values[idx]))
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def run_task(task_name):
+        """Run the task named as its long option and return what it printed,
+        or None if the task is unknown."""
+        if task_name not in TASK_NAMES[1:-1]:
+            return None
+        Books.get_books()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            run_task(TASK_NAMES.index(task_name))
+        return output.getvalue()
+
+    @staticmethod
+    def render_plot(plot_name):
+        """Render the plot and return what it printed, or None if the plot
+        is unknown."""
+        if plot_name not in AnalysisServer.plots:
+            return None
+        (plot, has_suppl) = AnalysisServer.plots[plot_name]
+        Plot.BOOKS = Books.get_books()
+        Plot.GS = [book.get_graph() for book in Plot.BOOKS]
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            if has_suppl:
+                MeasureExecutor.run(Plot.BOOKS, Graphs.get_centrality_nums() + [Measure.LOBBY])
+                supp = Formatting.coro_write_suppl('suppl-' + plot_name)
+                next(supp)
+                plot(supp)
+                supp.send(('CLOSE_FILE', ''))
+            else:
+                plot()
+        return output.getvalue()
+
+    @staticmethod
+    def answer(path):
+        """Return the reply to the request of path, None if it is unknown."""
+        parts = [part for part in path.split('?')[0].split('/') if part]
+        AnalysisServer.refresh()
+        if parts == ['books']:
+            return AnalysisServer.get_books()
+        if len(parts) == 3 and parts[0] == 'measure':
+            return AnalysisServer.get_measure_table(parts[1], parts[2])
+        if len(parts) == 2 and parts[0] == 'task':
+            return AnalysisServer.run_task(parts[1])
+        if len(parts) == 2 and parts[0] == 'plot':
+            return AnalysisServer.render_plot(parts[1])
+        return None
+
+    def serve(self):
+        """Read the books and answer requests until interrupted."""
+        AnalysisServer.refresh()
+        Books.get_books()
+        if isinstance(self.address, str):
+            if os.path.lexists(self.address):
+                # only a socket left by a previous server is replaced
+                if not stat.S_ISSOCK(os.lstat(self.address).st_mode):
+                    LOGGER.error('* \"%s\" exists and is not a socket.', self.address)
+                    exit()
+                os.remove(self.address)
+            server = UnixHTTPServer(self.address, AnalysisRequestHandler)
+        else:
+            server = http.server.HTTPServer(self.address, AnalysisRequestHandler)
+        print('* Serving on ' + str(self.address))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            if isinstance(self.address, str) and os.path.exists(self.address):
+                os.remove(self.address)
+
+class UnixHTTPServer(socketserver.UnixStreamServer):
+    """HTTP server on a Unix socket."""
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ('local', 0)
+
+class AnalysisRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Handle the HTTP requests to the server."""
+    def do_GET(self):
+        """Answer the request with the reply of the server."""
+        start = time.perf_counter()
+        try:
+            reply = AnalysisServer.answer(self.path)
+            status = 200 if reply is not None else 404
+            if reply is None:
+                reply = 'Unknown request: ' + self.path + '\n'
+        except (Exception, SystemExit) as err: # tasks exit() on errors
+            LOGGER.error('* Request %s failed: %s', self.path, err)
+            status, reply = 500, 'Request failed: ' + str(err) + '\n'
+        body = reply.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        LOGGER.info('* %s answered in %.3f s', self.path, time.perf_counter() - start)
+    def log_message(self, format, *args): # pylint: disable=redefined-builtin
+        LOGGER.debug(format, *args)
+
+#########
+# WATCH #
+#########
+# The watch mode runs the tasks selected again when data files of the
+# books are edited. The data files are checked every WATCH_INTERVAL
+# seconds and only the books whose files changed are read again (see
+# AnalysisServer.refresh()). The tasks writing a file for each book run
+# on these books only; the tasks writing tables or plots of the corpus
+# run on all books, the other books taking their measures from memory.
+
+class Watcher():
+    """Run tasks again on the books whose data files change."""
+    # tasks writing files for each book, named as their long options
+    book_tasks = ['draw-graph', 'degree', 'frequency', 'weight', 'clustering', 'coreness',
+                  'rich-club']
+
+    def __init__(self, task_nums, interval=WATCH_INTERVAL):
+        self.task_nums = task_nums
+        self.interval = interval
+
+    def update(self):
+        """Read the books that changed and run the tasks again, return the
+        names of these books."""
+        start = time.perf_counter()
+        changed = AnalysisServer.refresh()
+        if not changed:
+            return changed
+        for task_no in self.task_nums:
+            if TASK_NAMES[task_no] in Watcher.book_tasks:
+                with Books.restricted(changed):
+                    run_task(task_no)
+            else:
+                run_task(task_no)
+        print('* Updated {} in {:.2f} s'.format(', '.join(changed), time.perf_counter() - start))
+        return changed
+
+    def run(self):
+        """Check the data files until interrupted."""
+        AnalysisServer.refresh()
+        Books.get_books()
+        print('* Watching the data files of {} books'.format(len(Books.list_books())))
+        try:
+            while True:
+                time.sleep(self.interval)
+                try:
+                    self.update()
+                except (Exception, SystemExit) as err: # tasks exit() on errors
+                    LOGGER.error('* Update failed: %s', err)
+        except KeyboardInterrupt:
+            pass
+
 ########
 # MAIN #
 ########
 
+def run_task(task_no):
+    """Run the task number task_no recording it as a profiling stage."""
+    with Profiler.stage('task:' + TASKS[task_no].__name__):
+        TASKS[task_no]()
+
 def run_all_tasks():
     """Run all tasks available."""
-    i = 1
-    while True:
+    for i in range(1, len(TASKS)-1): # the last task is this one
         print(HEADERS[i])
-        TASKS[i]()
-        i += 1
-        if i == len(TASKS)-1: # BUG: without this, in this way, dont stop
-            exit()
+        run_task(i)
 
 # header to tasks dictionary
 TASKS = [None, # sys.argv[0] name of the program, no flag associated
-         Plot.do_plot, # -c
+         Plot.do_plot, # -p
          Draw.do_graphs, # -g
          Formatting.write_global_measures, # -m
          Formatting.write_hapax_legomena_table, # -l
          Formatting.write_vertices_degree, # -d
          Formatting.write_vertices_frequency, # -f
          Formatting.write_edges_weight, # -e
+         Formatting.write_group_statistics, # -G
+         Formatting.write_clustering, # -c
+         Formatting.write_coreness, # -C
+         Formatting.write_assortativity, # -A
+         Formatting.write_rich_club, # -K
          run_all_tasks] # -a
 
+# long options of the tasks, they name the tasks in requests to the server
+TASK_NAMES = [None, 'plot', 'draw-graph', 'global-measures', 'legomena', 'degree',
+              'frequency', 'weight', 'groups', 'clustering', 'coreness', 'assortativity',
+              'rich-club', 'all-tasks']
+
 # headers
 HEADERS = ["__main__",
            "\n\t#### TASK 1 - Plot graphics ####",
@@ -1550,6 +4966,11 @@ HEADERS = ["__main__",
            "\n\t#### TASK 5 - Write the vertices' degree ####",
            "\n\t#### TASK 6 - Write the characters' frequency ####",
            "\n\t#### TASK 7 - Write the edges' weight ####",
+           "\n\t#### TASK 8 - Write the encounter groups' statistics ####",
+           "\n\t#### TASK 9 - Write the characters' clustering coefficients ####",
+           "\n\t#### TASK 10 - Write the characters' coreness ####",
+           "\n\t#### TASK 11 - Write the assortativity coefficients ####",
+           "\n\t#### TASK 12 - Write the rich-club coefficients ####",
            "\n\t#### RUNNING ALL TASKS ####"]
 
 def usage():
@@ -1557,7 +4978,7 @@ def usage():
     print('* Usage: python3 ' + sys.argv[0] + ''' [options]
     OPTIONS
     -p, --plot
-    \tPlot the lobby and other centralities comparisons, assortativity mixing and degree distribution with fitting.
+    \tPlot the lobby and other centralities comparisons, assortativity mixing, degree distribution with fitting and the Zipf and Heaps laws of characters' appearances.
     -g, --draw-graph
     \tDraw the graph of characters encounters for visualization generating PNG files.
     -m, --global-measures
@@ -1570,15 +4991,76 @@ def usage():
     \tWrite the frequency of characters' appearance in a file named \"{dir}/<book_name>-vertex-frequency.csv\".
     -e, --weight
     \tWrite the weight of edges in a file named \"{dir}/<book_name>-edge-weight.csv\".
+    -G, --groups
+    \tWrite the distribution of sizes of encounter groups in files named \"{dir}/<book_name>-group-size.csv\" and a summary in \"{dir}/groups.csv\".
+    -c, --clustering
+    \tWrite the degree, triangles, local and weighted clustering of characters in files named \"{dir}/<book_name>-vertex-clustering.csv\" and the average clustering by degree in \"{dir}/<book_name>-clustering-spectrum.csv\"; with -W, only the estimate by bins of degree with its error is written.
+    -C, --coreness
+    \tWrite the degree, lobby index, coreness and s-coreness (weighted) of characters in files named \"{dir}/<book_name>-vertex-coreness.csv\" and the size of the k-cores in \"{dir}/<book_name>-core-profile.csv\".
+    -A, --assortativity
+    \tWrite the degree, weighted and frequency assortativity coefficients of each book with their jackknife standard errors in a file named \"{dir}/assortativity.csv\".
+    -K, --rich-club
+    \tWrite the rich-club coefficients by degree k, unweighted and weighted, with their averages over rewired graphs and the ratios to them in files named \"{dir}/<book_name>-rich-club.csv\".
     -a, --all
     \tExecute all options.
     -o <directory>, --output-dir <directory>
     \tSet the <directory> to write the generated files. Default directory: \"{dir}\"
+    -b <path>, --books <path>
+    \tDiscover the books in the directory or manifest file <path>, instead of the built-in list. It may be repeated.
+    -k <directory> <archive>, --pack <directory> <archive>
+    \tPack the data files of <directory> in the corpus file <archive>.
+    -r <archive>, --archive <archive>
+    \tRead the books from the corpus file <archive> instead of the data directories.
+    -s <file>, --batch <file>
+    \tStream the books computing global measures and centrality summaries, appending a row per book to <file>. An interrupted run is resumed.
+    -N <replicates>, --null-models <replicates>
+    \tCompare the clustering coefficient and the correlations of lobby with the centralities of each book with the mean of <replicates> rewired and configuration-model graphs, writing \"{dir}/null-models.csv\".
+    -R <orderings>, --robustness <orderings>
+    \tRemove the characters of each book by decreasing degree, lobby and betweenness and in <orderings> random orders, writing the robustness indexes to \"{dir}/robustness.csv\" and the fraction of characters in the largest component to \"{dir}/<book_name>-robustness.csv\".
+    -E <tolerance>, --tolerance <tolerance>
+    \tStop the iterations of PageRank and eigenvector centrality when the values change less than <tolerance>. Default: {tol}.
+    -j <number>, --jobs <number>
+    \tNumber of worker processes used by the parallel tasks. Default: 1.
+    -x <database>, --store <database>
+    \tKeep books and measures in the SQLite <database>, the stored measures are not computed again.
+    -t <measure>, --top <measure>
+    \tWrite the characters with highest <measure> in each genre, querying the store: lobby or a centrality ({tops}).
+    -y <file> <characters>, --synthetic <file> <characters>
+    \tWrite the data <file> of a synthetic book with the number of <characters>.
+    -Y <parameters>, --synthetic-params <parameters>
+    \tComma-separated parameters of the synthetic books of -y and -u, e.g. chapters=10,groups=500,group_mean=3,zipf=1.2,seed=0: the number of chapters and encounter groups, the mean of the geometric distribution of group sizes (at least 2), the exponent of the Zipf law of the frequency of characters and the random seed.
+    -u <file>, --bench <file>
+    \tTime the stages of the processing of synthetic books, appending the results to <file>.
+    -U <sizes>, --bench-sizes <sizes>
+    \tComma-separated numbers of characters of the synthetic books in the benchmark. The memory peak is measured up to {bench_mem} characters.
+    -V, --check
+    \tCheck the data files of the books in parallel without building graphs, printing every problem found with its file and line, and stop if there are errors that the parser would not accept.
+    -w, --watch
+    \tAfter the tasks selected, run them again when data files change, reading only the books changed; the files of the other books are kept and the tables and plots of the corpus are written again.
+    -S <address>, --serve <address>
+    \tAfter the tasks selected, keep the books and measures in memory and answer requests (e.g., /measure/degree/hawking, /task/clustering, /plot/cdf) on the port <address> of localhost or on the Unix socket <address>, reading a book again when its data file changes.
+    -W <budget>, --wedge-sampling <budget>
+    \tEstimate the clustering coefficient of the density x clustering plot, of the global measures (-m) and by bins of degree (-c) by sampling <budget> wedges or, if <budget> is less than 1, until the 95% confidence interval has half width <budget>.
+    -B <level>, --backbone <level>
+    \tKeep only the edges significant at <level> (e.g., 0.05) by the disparity filter, the measures, plots and drawings use this backbone of the graphs. The characters left without edges stay as isolated vertices.
+    -H, --hypergraph
+    \tKeep the encounter groups and derive the graph of a book only when a task needs it.
+    -P, --profile
+    \tRecord time, CPU time, memory peak and items of each stage, writing \"{dir}/profile.json\" and a summary.
+    -D <directory>, --profile-dump <directory>
+    \tWith profiling, write cProfile statistics of the outermost stages to <directory>.
+    -T <rate>, --trace <rate>
+    \tCount the events of the parser and lobby loops, writing one of every <rate> events to \"{dir}/trace.log\" (0: only counters).
+    -z <format>, --compress <format>
+    \tCompress the data files written (.csv and .dat) using <format>: {fmts}.
     -h, --help
     \t Print this help message.
-    One of the flags listed above must be selected, with exception of the \"-o\" or
-    \"--output-dir\" that changes the program behavior and it is optional.
-    '''.format(dir=Project().get_out_dir()))
+    One of the flags listed above must be selected, with exception of the options
+    \"-o\", \"-b\", \"-r\", \"-j\", \"-x\", \"-U\", \"-Y\", \"-W\", \"-E\", \"-B\", \"-H\", \"-P\",
+    \"-D\", \"-T\" and \"-z\" that change the program behavior and are optional.
+    '''.format(dir=Project().get_out_dir(), fmts=', '.join(get_compression_formats()),
+               tol=Project().get_spectral_tolerance(), bench_mem=BENCH_MEMORY_MAX_SIZE,
+               tops=', '.join(num.name.lower() for num in Graphs.get_centrality_nums())))
     exit()
 def print_out_banner(directory):
     """Print a header and write the directory where output will be send."""
@@ -1595,8 +5077,32 @@ def print_out_banner(directory):
 # standardize the pictorial elements properties like color and point
 # marker in the plot.
 def main():
+    if gt is None:
+        LOGGER.error('* Python module "graph_tool" is needed to run charnet')
+        exit()
     # Boolean array to store state of the flags
     opts = [False] * len(TASKS)
+    # file to write the results of the batch mode
+    batch_file = None
+    # number of replicates of each null model
+    null_replicates = None
+    # number of random orderings of the robustness analysis
+    robust_orderings = None
+    # measure to query the top characters
+    top_measure = None
+    # file to append the results of the benchmark and sizes of books
+    bench_file = None
+    bench_sizes = None
+    # data files and numbers of characters of the synthetic books
+    synthetic = []
+    # rate of the events traced (None: no tracing)
+    trace_rate = None
+    # port or Unix socket of the server mode
+    serve_address = None
+    # run the tasks again when data files change
+    watch = False
+    # check the data files before the tasks
+    check = False
     # numer og arguments
     len_args = len(sys.argv)
     # retrieve the flags set by the user
@@ -1616,6 +5122,139 @@ def main():
                 else:
                     LOGGER.error(' Directory \"%s\" does not exists!', _dir)
                     exit()
+            elif opt == "-b" or opt == "--books":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                if Books.registry is None:
+                    Books.set_registry(BookRegistry())
+                Books.registry.add(sys.argv[arg_no])
+            elif opt == "-k" or opt == "--pack":
+                arg_no += 2
+                if arg_no >= len_args:
+                    usage()
+                CorpusArchive.pack(sys.argv[arg_no-1], sys.argv[arg_no])
+            elif opt == "-r" or opt == "--archive":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                Books.set_books(CorpusArchive(sys.argv[arg_no]).get_books())
+            elif opt == "-s" or opt == "--batch":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                batch_file = sys.argv[arg_no]
+            elif opt == "-N" or opt == "--null-models":
+                arg_no += 1
+                if arg_no == len_args or not sys.argv[arg_no].isdigit():
+                    usage()
+                null_replicates = int(sys.argv[arg_no])
+            elif opt == "-R" or opt == "--robustness":
+                arg_no += 1
+                if arg_no == len_args or not sys.argv[arg_no].isdigit():
+                    usage()
+                robust_orderings = int(sys.argv[arg_no])
+            elif opt == "-E" or opt == "--tolerance":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                try:
+                    tolerance = float(sys.argv[arg_no])
+                except ValueError:
+                    tolerance = 0.0
+                if tolerance <= 0.0:
+                    LOGGER.error(' Tolerance \"%s\" is not valid!', sys.argv[arg_no])
+                    exit()
+                Project().set_spectral_tolerance(tolerance)
+            elif opt == "-j" or opt == "--jobs":
+                arg_no += 1
+                if arg_no == len_args or not sys.argv[arg_no].isdigit():
+                    usage()
+                Project().set_workers(max(1, int(sys.argv[arg_no])))
+            elif opt == "-W" or opt == "--wedge-sampling":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                try:
+                    budget = float(sys.argv[arg_no])
+                except ValueError:
+                    budget = 0.0
+                if budget <= 0.0:
+                    LOGGER.error(' Wedge sampling budget \"%s\" is not valid!', sys.argv[arg_no])
+                    exit()
+                Project().set_clustering_sampling(budget)
+            elif opt == "-x" or opt == "--store":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                Project().set_store(ResultsStore(sys.argv[arg_no]))
+            elif opt == "-t" or opt == "--top":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                top_measure = Measure.__members__.get(sys.argv[arg_no].upper())
+                if top_measure not in Graphs.get_centrality_nums() + [Measure.LOBBY]:
+                    usage()
+            elif opt == "-y" or opt == "--synthetic":
+                arg_no += 2
+                if arg_no >= len_args or not sys.argv[arg_no].isdigit():
+                    usage()
+                synthetic.append((sys.argv[arg_no-1], int(sys.argv[arg_no])))
+            elif opt == "-Y" or opt == "--synthetic-params":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                params = parse_synth_params(sys.argv[arg_no])
+                if params is None:
+                    LOGGER.error(' Synthetic parameters \"%s\" are not valid!', sys.argv[arg_no])
+                    exit()
+                Project().set_synthetic_params(params)
+            elif opt == "-V" or opt == "--check":
+                check = True
+            elif opt == "-w" or opt == "--watch":
+                watch = True
+            elif opt == "-S" or opt == "--serve":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                serve_address = sys.argv[arg_no]
+                if serve_address.isdigit():
+                    serve_address = ('127.0.0.1', int(serve_address))
+            elif opt == "-u" or opt == "--bench":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                bench_file = sys.argv[arg_no]
+            elif opt == "-U" or opt == "--bench-sizes":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                bench_sizes = parse_bench_sizes(sys.argv[arg_no])
+                if bench_sizes is None:
+                    LOGGER.error(' Benchmark sizes \"%s\" are not valid!', sys.argv[arg_no])
+                    exit()
+            elif opt == "-P" or opt == "--profile":
+                Profiler.enable(dump_dir=Profiler.dump_dir)
+            elif opt == "-D" or opt == "--profile-dump":
+                arg_no += 1
+                if arg_no == len_args or not os.path.isdir(sys.argv[arg_no]):
+                    usage()
+                Profiler.dump_dir = sys.argv[arg_no]
+            elif opt == "-T" or opt == "--trace":
+                arg_no += 1
+                if arg_no == len_args or not sys.argv[arg_no].isdigit():
+                    usage()
+                trace_rate = int(sys.argv[arg_no])
+            elif opt == "-z" or opt == "--compress":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                fmt = sys.argv[arg_no]
+                if fmt in get_compression_formats():
+                    Project().set_output_compression(fmt)
+                else:
+                    LOGGER.error(' Compression format \"%s\" is not available!', fmt)
+                    exit()
             elif opt == "-p" or opt == "--plot":
                 opts[1] = True
             elif opt == "-g" or opt == "--draw-graph":
@@ -1630,10 +5269,34 @@ def main():
                 opts[6] = True
             elif opt == "-e" or opt == "--weight":
                 opts[7] = True
-            elif opt == "-a" or opt == "--all-tasks":
+            elif opt == "-G" or opt == "--groups":
                 opts[8] = True
-                for arg_no in range(1, len_args-1): # to not repeat tasks
-                    opts[arg_no] = False
+            elif opt == "-c" or opt == "--clustering":
+                opts[9] = True
+            elif opt == "-C" or opt == "--coreness":
+                opts[10] = True
+            elif opt == "-A" or opt == "--assortativity":
+                opts[11] = True
+            elif opt == "-K" or opt == "--rich-club":
+                opts[12] = True
+            elif opt == "-B" or opt == "--backbone":
+                arg_no += 1
+                if arg_no == len_args:
+                    usage()
+                try:
+                    level = float(sys.argv[arg_no])
+                except ValueError:
+                    level = 0.0
+                if not 0.0 < level <= 1.0:
+                    LOGGER.error(' Significance level \"%s\" is not valid!', sys.argv[arg_no])
+                    exit()
+                Project().set_backbone_level(level)
+            elif opt == "-H" or opt == "--hypergraph":
+                Project().set_lazy_projection(True)
+            elif opt == "-a" or opt == "--all-tasks":
+                opts[13] = True
+                for task_no in range(1, len(opts)-1): # to not repeat tasks
+                    opts[task_no] = False
             elif opt == "-h" or opt == "--help": # help make exit
                 usage()
             else:
@@ -1643,10 +5306,39 @@ def main():
     else:
         usage()
 
+    # the trace is written to the output directory of -o, given anywhere
+    if trace_rate is not None:
+        Tracer.enable(trace_rate)
+    for (file_name, n_chars) in synthetic:
+        generate_book(file_name, n_chars, fmt=Project().get_output_compression(),
+                      **Project().get_synthetic_params())
+    if check and Checker(Project().get_workers()).run(Books.iter_entries()) > 0:
+        exit(1)
+    if batch_file is not None:
+        BatchRun(batch_file, Project().get_workers()).run(Books.iter_entries())
+    if null_replicates is not None:
+        NullModelEnsemble(null_replicates, workers=Project().get_workers()).run(
+            Books.iter_books(), os.path.join(Project().get_out_dir(), 'null-models.csv'))
+    if robust_orderings is not None:
+        Robustness(robust_orderings, workers=Project().get_workers()).run(
+            Books.get_books(), os.path.join(Project().get_out_dir(), 'robustness.csv'))
+    if top_measure is not None:
+        Formatting.write_top_characters(top_measure)
+    if bench_file is not None:
+        Benchmark(bench_file, bench_sizes).run()
+
     for arg_no in range(1, len(opts)):
         if opts[arg_no] is True:
             LOGGER.info(HEADERS[arg_no])
-            TASKS[arg_no]()
+            run_task(arg_no)
+    if watch:
+        task_nums = [arg_no for arg_no in range(1, len(opts) - 1) if opts[arg_no] is True]
+        if opts[-1] is True: # all tasks
+            task_nums = list(range(1, len(opts) - 1))
+        Watcher(task_nums).run()
+    if serve_address is not None:
+        AnalysisServer(serve_address).serve()
 
 
-main()
+if __name__ == '__main__':
+    main()
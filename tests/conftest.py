@@ -0,0 +1,37 @@
+"""Common fixtures of the tests, all but the kernel tests need graph-tool."""
+import os
+
+import pytest
+
+try:
+    import graph_tool # pylint: disable=unused-import
+except ImportError: # the kernels of test_kernels.py work on arrays
+    collect_ignore = ['test_batch.py', 'test_bench.py', 'test_books.py', 'test_parallel.py',
+                      'test_server.py', 'test_store.py']
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'data')
+
+def data_file(name):
+    """Return the path of the data file of the book name."""
+    return os.path.join(DATA_DIR, name + '.dat')
+
+@pytest.fixture(autouse=True)
+def project(tmp_path):
+    """Write the output to a temporary directory and restore the settings
+    and the results kept in memory after the test."""
+    from charnet import __main__ as charnet
+    settings = {key: value for (key, value) in vars(charnet.Project).items()
+                if not key.startswith('__') and not callable(value)}
+    books = (charnet.Books.books, charnet.Books.registry,
+             charnet.Books.was_already_read, charnet.Books.was_already_listed)
+    charnet.Project().set_outdir(str(tmp_path))
+    yield charnet.Project()
+    (charnet.Books.books, charnet.Books.registry,
+     charnet.Books.was_already_read, charnet.Books.was_already_listed) = books
+    charnet.AnalysisServer.stamps.clear()
+    charnet.AnalysisServer.failed.clear()
+    for (key, value) in settings.items():
+        setattr(charnet.Project, key, value)
+    charnet.MeasureExecutor.results.clear()
+    charnet.SpectralSolver.solutions.clear()
+    charnet.SpectralSolver.iterations.clear()
@@ -0,0 +1,41 @@
+"""Tests of the batch mode resuming from its checkpoint."""
+import csv
+import shutil
+
+from charnet import __main__ as charnet
+
+from conftest import data_file
+
+def test_resume(tmp_path):
+    entries = []
+    for (name, source) in [('hawking, revised', 'hawking'), ('acts', 'acts')]:
+        file_name = str(tmp_path / (name + '.dat'))
+        shutil.copy(data_file(source), file_name)
+        entries.append(charnet.BookEntry(name, file_name))
+    table = str(tmp_path / 'batch.csv')
+    batch = charnet.BatchRun(table)
+    batch.run(entries[:1])
+    # interrupted after writing the row of a book not yet in the checkpoint
+    with open(table, 'a') as _file:
+        _file.write('"acts",fiction,1\n"half a row')
+    batch.run(entries)
+    with open(table, newline='') as _file:
+        rows = list(csv.reader(_file))
+    assert rows[0] == charnet.BATCH_FIELDS
+    assert [row[0] for row in rows[1:]] == ['hawking, revised', 'acts']
+    assert all(len(row) == len(charnet.BATCH_FIELDS) for row in rows)
+    assert batch.get_done() == {'hawking, revised', 'acts'}
+
+def test_skip_broken(tmp_path):
+    shutil.copy(data_file('hawking'), tmp_path)
+    broken = tmp_path / 'broken.dat'
+    broken.write_text('AA Alice\nBB Bob\n\n1:AA,ZZ\n') # the parser exit()s on ZZ
+    entries = [charnet.BookEntry('broken', str(broken)),
+               charnet.BookEntry('hawking', str(tmp_path / 'hawking.dat'))]
+    for workers in [1, 2]:
+        table = str(tmp_path / 'batch{}.csv'.format(workers))
+        batch = charnet.BatchRun(table, workers)
+        batch.run(entries)
+        with open(table, newline='') as _file:
+            assert [row[0] for row in csv.reader(_file)][1:] == ['hawking']
+        assert batch.get_done() == {'hawking'} # the broken book is tried again
@@ -0,0 +1,93 @@
+"""Tests of the synthetic books, the benchmark, the profiler and the tracer."""
+import atexit
+import sys
+import tracemalloc
+
+from charnet import __main__ as charnet
+
+def test_synthetic_params(tmp_path):
+    params = charnet.parse_synth_params('chapters=7,group_mean=4,zipf=0.8')
+    assert params == {'n_chapters': 7, 'group_mean': 4.0, 'zipf_exponent': 0.8}
+    for text in ['chapter=7', 'chapters=x', 'group_mean=1', 'zipf=-1']:
+        assert charnet.parse_synth_params(text) is None
+    file_name = str(tmp_path / 'synth.dat')
+    charnet.generate_book(file_name, 50, **params)
+    book = charnet.BookFile(file_name)
+    book.read()
+    with open(file_name) as _file:
+        chapters = [line for line in _file if line[0].isdigit()]
+    assert len(chapters) == 7
+
+def test_measure(tmp_path):
+    bench = charnet.Benchmark(str(tmp_path / 'bench.json'))
+    calls = []
+    def func():
+        calls.append(tracemalloc.is_tracing())
+        return [0] * 1000
+    assert bench.measure('stage', 10, func) == [0] * 1000
+    assert calls == [False, True] # timed without tracing
+    assert bench.results[-1]['py_peak'] > 0
+    assert not tracemalloc.is_tracing()
+    # the tracing of the profiler is left running
+    tracemalloc.start()
+    try:
+        calls.clear()
+        bench.measure('stage', 10, func)
+        assert calls == [True]
+        assert bench.results[-1]['py_peak'] is None
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+def test_memory_cap(tmp_path):
+    bench = charnet.Benchmark(str(tmp_path / 'bench.json'))
+    calls = []
+    size = charnet.BENCH_MEMORY_MAX_SIZE + 1
+    bench.measure('stage', size, lambda: calls.append(size))
+    assert calls == [size] # not run again to measure the memory
+    assert bench.results[-1]['py_peak'] is None
+
+def test_bench_sizes():
+    assert charnet.parse_bench_sizes('100,1000') == [100, 1000]
+    for text in ['1e3', '100,', '0', '-5', '']:
+        assert charnet.parse_bench_sizes(text) is None
+
+def test_run_keeps_registry(tmp_path):
+    registry = charnet.BookRegistry([str(tmp_path)])
+    charnet.Books.set_registry(registry)
+    charnet.Books.was_already_listed = True
+    charnet.Benchmark(str(tmp_path / 'bench.json'), sizes=[20]).run()
+    assert charnet.Books.registry is registry
+    assert charnet.Books.was_already_listed is True
+    assert charnet.Books.was_already_read is False
+
+def test_profile_peak():
+    charnet.Profiler.memory = True
+    tracemalloc.start()
+    try:
+        with charnet.ProfileStage('outer') as outer:
+            data = [0] * 10**6
+            del data # the peak of the outer stage is before the inner one
+            with charnet.ProfileStage('inner') as inner:
+                pass
+    finally:
+        tracemalloc.stop()
+        charnet.Profiler.memory = False
+        charnet.Profiler.records.clear()
+    assert outer.record['py_peak'] >= 8 * 10**6
+    assert inner.record['py_peak'] < 10**6
+
+def test_trace_dir(tmp_path, monkeypatch):
+    out_dir = tmp_path / 'out'
+    out_dir.mkdir()
+    monkeypatch.setattr(sys, 'argv', ['charnet', '-T', '1', '-o', str(out_dir),
+                                      '-y', str(tmp_path / 'synth.dat'), '20'])
+    try:
+        charnet.main()
+    finally:
+        atexit.unregister(charnet.Tracer.report)
+        charnet.Tracer.enabled = False
+        for handler in list(charnet.TRACE_LOGGER.handlers):
+            handler.close()
+            charnet.TRACE_LOGGER.removeHandler(handler)
+    assert (out_dir / 'trace.log').exists()
@@ -0,0 +1,163 @@
+"""Tests of reading, projecting, packing and checking the books."""
+import shutil
+
+import numpy as np
+
+from charnet import __main__ as charnet
+
+from conftest import data_file
+
+def get_edges(graph):
+    """Return the set of edges (source, target, weight) of the graph."""
+    edges = graph.get_edges([graph.edge_properties["weight"]])
+    return {(min(u, v), max(u, v), w) for (u, v, w) in edges.tolist()}
+
+def test_projection(project):
+    eager = charnet.BookFile(data_file('tolkien'))
+    graph = eager.read()
+    project.set_lazy_projection(True)
+    lazy = charnet.BookFile(data_file('tolkien'))
+    lazy.parse()
+    assert lazy.is_projected is False
+    assert get_edges(lazy.get_graph()) == get_edges(graph)
+    assert np.asarray(lazy.incidence.sum(axis=1)).ravel().tolist() \
+        == graph.vertex_properties["frequency"].a.tolist()
+
+def test_string_table():
+    table = charnet.StringTable(interned=True)
+    for text in ['AA', 'Éowyn', 'BB', 'AA']:
+        table.add(text)
+    assert len(table) == 3
+    assert table.get_code('BB') == 2
+    copy = charnet.StringTable.from_buffer(*table.get_buffer(), interned=True)
+    assert copy.codes is None # no label is decoded when loading
+    assert [copy.get(code) for code in range(len(copy))] == ['AA', 'Éowyn', 'BB']
+    assert copy.get_code('Éowyn') == 1
+    assert 'CC' not in copy
+
+def test_archive(tmp_path):
+    for name in ['hawking', 'tolkien']:
+        shutil.copy(data_file(name), tmp_path)
+    file_name = str(tmp_path / 'corpus.cna')
+    charnet.CorpusArchive.pack(str(tmp_path), file_name)
+    archive = charnet.CorpusArchive(file_name)
+    for book in archive.get_books():
+        original = charnet.BookFile(data_file(book.get_name()))
+        graph = original.read()
+        archived = book.read()
+        assert get_edges(archived) == get_edges(graph)
+        assert archived.vertex_properties["frequency"].a.tolist() \
+            == graph.vertex_properties["frequency"].a.tolist()
+        assert [book.get_char_label(idx) for idx in range(graph.num_vertices())] \
+            == [original.get_char_label(idx) for idx in range(graph.num_vertices())]
+        assert book.get_char_name(0) == original.get_char_name(0)
+    archive.close()
+
+def test_archive_backbone(project, tmp_path):
+    shutil.copy(data_file('tolkien'), tmp_path)
+    file_name = str(tmp_path / 'corpus.cna')
+    project.set_backbone_level(0.05)
+    charnet.CorpusArchive.pack(str(tmp_path), file_name)
+    project.set_backbone_level(None)
+    archive = charnet.CorpusArchive(file_name)
+    (book,) = archive.get_books()
+    # the archive keeps the whole graph, the groups are not kept
+    assert get_edges(book.read()) == get_edges(charnet.BookFile(data_file('tolkien')).read())
+    assert book.get_group_sizes() is None and book.get_participation() is None
+    archive.close()
+
+def test_vocabulary():
+    book = charnet.BookFile(data_file('hawking'))
+    graph = book.read()
+    frequency = [graph.vertex_properties["frequency"][vert] for vert in graph.vertices()]
+    assert book.get_number_hapax_legomenas() == frequency.count(1)
+    assert book.get_number_dis_legomenas() == frequency.count(2)
+    vocab = book.get_vocabulary()
+    assert vocab['appearances'][-1] == sum(frequency)
+    assert vocab['characters'][-1] == sum(1 for freq in frequency if freq > 0)
+    assert np.all(np.diff(vocab['characters']) >= 0)
+
+def test_check(tmp_path):
+    file_name = tmp_path / 'broken.dat'
+    file_name.write_text('* comment\n'
+                         'AA Alice\n'
+                         'CC Carol\n'
+                         'BB Bob\n'
+                         'BB Bob again\n'
+                         '\n'
+                         '1:AA,BB;;AA,ZZ\n'
+                         '1.x:CC,CC\n'
+                         '2 AA,BB\n'
+                         '3:\n')
+    entry = charnet.BookEntry('broken', str(file_name))
+    (_, problems) = charnet.check_data_file(entry)
+    assert [(line_no, kind) for (line_no, kind, _) in problems] == [
+        (4, 'order'), (5, 'duplicate'), (7, 'empty-group'), (7, 'unknown'),
+        (8, 'chapter'), (8, 'self-encounter'), (9, 'malformed')]
+    assert charnet.Checker().run([entry]) == 5
+    (_, problems) = charnet.check_data_file(charnet.BookEntry('tolkien', data_file('tolkien')))
+    assert [kind for (_, kind, _) in problems] == ['self-encounter']
+
+def test_clustering_estimate(project, tmp_path):
+    charnet.Books.books = [charnet.BookFile(data_file('hawking'))]
+    project.set_clustering_sampling(5000)
+    charnet.Formatting.write_clustering()
+    assert not (tmp_path / 'hawking-vertex-clustering.csv').exists()
+    rows = (tmp_path / 'hawking-clustering-spectrum.csv').read_text().split('\n')[:-1]
+    assert sum(int(row.split(charnet.CSV_FIELDS_SEPARATOR)[-1]) for row in rows) == 5000
+    meas = charnet.Formatting.get_global_measures(charnet.Books.books[0])
+    assert 0.0 < meas['clustering'] < 1.0
+
+def test_degree_tables(tmp_path):
+    book = charnet.BookFile(data_file('tolkien'))
+    charnet.Books.set_books([book])
+    charnet.Formatting.write_vertices_degree()
+    charnet.Formatting.write_coreness()
+    # tolkien has a self-encounter, a character is not its own neighbor
+    graph = book.get_graph()
+    centrality = charnet.get_vertex_measure(book, charnet.Measure.DEGREE_CENTRALITY)
+    expected = {book.get_char_label(idx): int(round(value * graph.num_vertices()))
+                for (idx, value) in enumerate(centrality)}
+    for (suffix, column) in [('-vertex-degree.csv', -1), ('-vertex-coreness.csv', -4)]:
+        rows = (tmp_path / ('tolkien' + suffix)).read_text().split('\n')[:-1]
+        degrees = {row.split(',')[0]: int(row.rsplit('"', 1)[1].split(',')[column])
+                   for row in rows}
+        assert degrees == expected, suffix
+
+def test_lobby_isolated(tmp_path):
+    file_name = tmp_path / 'isolated.dat'
+    file_name.write_text('AA Alice\nBB Bob\nCC Carol\nDD Dave\n\n1:AA;BB,CC;DD\n')
+    graph = charnet.BookFile(str(file_name)).read()
+    # isolated characters have lobby 0, the first one and one after a lobby 1
+    assert charnet.lobby(graph) == [0.0, 0.25, 0.25, 0.0]
+
+def test_registry_defaults(tmp_path):
+    shutil.copy(data_file('hawking'), tmp_path / 'unlisted.dat')
+    (book,) = list(charnet.BookRegistry([str(tmp_path)]))
+    assert book.get_genre() is None
+    assert charnet.Books.get_genre_label(book) == '?'
+    graph = book.read()
+    degrees = [deg for deg in charnet.Graphs.get_vprop_degrees(graph).a.tolist() if deg > 0]
+    (kmin, alpha, pval) = charnet.Fits.get_parms(book.get_name(), degrees)
+    assert kmin == min(degrees) and alpha > 1.0 and np.isnan(pval)
+    assert charnet.Fits.get_parms('hawking', degrees) == charnet.Fits.parms['hawking']
+
+def test_registry_plot(tmp_path, monkeypatch):
+    shutil.copy(data_file('hawking'), tmp_path / 'unlisted.dat')
+    shutil.copy(data_file('tolkien'), tmp_path / 'another.dat')
+    charnet.Books.set_registry(charnet.BookRegistry([str(tmp_path)]))
+    monkeypatch.setattr(charnet.Plot, 'CMDs', []) # gnuplot is not run
+    charnet.Plot.init()
+    charnet.Plot.do_density_x_clustering_coeff()
+    script = (tmp_path / 'density_cluster-coeff.gp').read_text()
+    assert 'unlisted' in script and 'another' in script
+
+def test_plot_cleaning(tmp_path):
+    shutil.copy(data_file('hawking'), tmp_path)
+    charnet.Books.set_books([charnet.BookFile(str(tmp_path / 'hawking.dat'))])
+    old = ['cdf.tex', 'cdf.gp', 'k_Pk_hawking.dat', 'k_Pk_hawking.dat.gz', 'lobby.gp.xz']
+    for name in old + ['hawking-vertex-degree.csv']:
+        (tmp_path / name).write_text('old\n')
+    charnet.Plot.init()
+    assert sorted(path.name for path in tmp_path.iterdir()) \
+        == ['hawking-vertex-degree.csv', 'hawking.dat']
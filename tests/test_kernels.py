@@ -0,0 +1,155 @@
+"""Tests of the measures computed from the arrays of Graphs.get_csr()
+against networkx or direct computations."""
+import itertools
+
+import numpy as np
+import pytest
+
+from charnet import __main__ as charnet
+
+nx = pytest.importorskip('networkx')
+
+def random_graph(n_verts=60, n_edges=300, seed=1):
+    """Return a random graph with integer weights."""
+    graph = nx.gnm_random_graph(n_verts, n_edges, seed=seed)
+    rng = np.random.default_rng(seed)
+    for (u_vert, v_vert) in graph.edges:
+        graph.edges[u_vert, v_vert]['weight'] = int(rng.integers(1, 10))
+    return graph
+
+def to_csr(graph, loops=()):
+    """Return the arrays of get_csr() of the networkx graph, with the
+    self-loops added to the vertices in loops."""
+    edges = [(u_vert, v_vert, w) for (u_vert, v_vert, w) in graph.edges(data='weight')]
+    edges += [(vert, vert, 1) for vert in loops]
+    n_verts = graph.number_of_nodes()
+    return charnet.Graphs.edges_to_csr(n_verts, np.array(edges, dtype=np.int64).reshape(-1, 3),
+                                       np.arange(1, n_verts + 1))
+
+def barrat(graph):
+    """Return the weighted clustering of Barrat et al. of the vertices."""
+    values = []
+    for vert in graph.nodes:
+        degree = graph.degree(vert)
+        strength = graph.degree(vert, weight='weight')
+        total = 0.0
+        for (v_vert, x_vert) in itertools.combinations(graph[vert], 2):
+            if graph.has_edge(v_vert, x_vert):
+                total += graph[vert][v_vert]['weight'] + graph[vert][x_vert]['weight']
+        values.append(total / (strength * (degree - 1)) if degree > 1 else 0.0)
+    return np.array(values)
+
+@pytest.mark.parametrize('max_wedges', [charnet.TRIANGLE_MAX_WEDGES, 7, 1])
+def test_triangles(max_wedges):
+    graph = random_graph()
+    clust = charnet.triangles_csr(to_csr(graph, loops=[0, 5]), max_wedges)
+    triangles = nx.triangles(graph)
+    local = nx.clustering(graph)
+    assert clust['triangles'].tolist() == [triangles[vert] for vert in graph.nodes]
+    assert np.allclose(clust['local'], [local[vert] for vert in graph.nodes])
+    assert np.allclose(clust['weighted'], barrat(graph))
+    assert clust['global'] == pytest.approx(nx.transitivity(graph))
+
+def test_wedge_sampling():
+    graph = random_graph(200, 1500)
+    csr = to_csr(graph)
+    exact = nx.transitivity(graph)
+    estimate = charnet.wedge_sampling_csr(csr, 20000, seed=3)
+    assert estimate['samples'] == 20000
+    assert abs(estimate['global'] - exact) <= 3 * estimate['half_width']
+    # the bins of the degree of the centers, against their closed wedges
+    triangles = nx.triangles(graph)
+    for (k_min, k_max, c_k, half_width, samples) in estimate['bins']:
+        if samples < 1000: # the normal approximation needs enough wedges
+            continue
+        centers = [vert for (vert, deg) in graph.degree if k_min <= deg <= k_max]
+        exact = sum(triangles[vert] for vert in centers) \
+            / sum(graph.degree(vert) * (graph.degree(vert) - 1) / 2.0 for vert in centers)
+        assert abs(c_k - exact) <= 3 * half_width + 1e-9
+    assert sum(samples for (_, _, _, _, samples) in estimate['bins']) == 20000
+    estimate = charnet.wedge_sampling_csr(csr, 0.01, seed=3)
+    assert estimate['half_width'] <= 0.01
+
+def test_wedge_sampling_sparse():
+    # a star with one triangle, few closed wedges are drawn in a batch
+    graph = nx.star_graph(400)
+    graph.add_edge(1, 2)
+    nx.set_edge_attributes(graph, 1, 'weight')
+    for seed in range(5):
+        estimate = charnet.wedge_sampling_csr(to_csr(graph), 0.0001, seed=seed)
+        assert estimate['half_width'] > 0.0
+        assert abs(estimate['global'] - nx.transitivity(graph)) <= 2 * estimate['half_width']
+
+def test_coreness():
+    graph = random_graph()
+    cores = nx.core_number(graph)
+    assert charnet.coreness_csr(to_csr(graph, loops=[3])).tolist() \
+        == [cores[vert] for vert in graph.nodes]
+
+def test_assortativity():
+    graph = random_graph(40, 120)
+    (r_coef, error) = charnet.assortativity_csr(to_csr(graph, loops=[2]), 'degree')
+    assert r_coef == pytest.approx(nx.degree_assortativity_coefficient(graph))
+    # jackknife recomputing r without each edge, the degrees are kept
+    degrees = dict(graph.degree())
+    edges = list(graph.edges)
+    def coefficient(edges):
+        x_vals = np.array([degrees[u] for (u, v) in edges] + [degrees[v] for (u, v) in edges])
+        y_vals = np.array([degrees[v] for (u, v) in edges] + [degrees[u] for (u, v) in edges])
+        return np.corrcoef(x_vals, y_vals)[0, 1]
+    r_jack = np.array([coefficient(edges[:i] + edges[i+1:]) for i in range(len(edges))])
+    n_edges = len(edges)
+    assert error == pytest.approx(np.sqrt((n_edges - 1) / n_edges
+                                          * ((r_jack - r_jack.mean()) ** 2).sum()))
+
+def test_rich_club():
+    graph = random_graph()
+    club = charnet.rich_club_csr(to_csr(graph, loops=[1]))
+    phi = nx.rich_club_coefficient(graph, normalized=False)
+    for k in club['k']:
+        if not np.isnan(club['phi'][k]):
+            assert club['phi'][k] == pytest.approx(phi[k])
+    weights = sorted((w for (_, _, w) in graph.edges(data='weight')), reverse=True)
+    degrees = dict(graph.degree())
+    for k in club['k']:
+        rich = [w for (u, v, w) in graph.edges(data='weight')
+                if degrees[u] > k and degrees[v] > k]
+        if rich:
+            assert club['weighted'][k] == pytest.approx(sum(rich) / sum(weights[:len(rich)]))
+
+def test_percolation():
+    graph = random_graph(30, 45)
+    order = np.random.default_rng(2).permutation(30)
+    curve = charnet.percolation_csr(to_csr(graph), order)
+    for k in range(31):
+        rest = graph.subgraph(order[k:].tolist())
+        giant = max((len(comp) for comp in nx.connected_components(rest)), default=0)
+        assert curve[k] == pytest.approx(giant / 30.0)
+
+def test_spectral():
+    graph = random_graph()
+    csr = to_csr(graph)
+    pagerank = nx.pagerank(graph, alpha=charnet.PAGERANK_DAMPING, tol=1e-12, max_iter=1000)
+    values = charnet.SpectralSolver.solve(csr, charnet.Measure.PAGERANK, tol=1e-12)
+    assert np.allclose(values, [pagerank[vert] for vert in graph.nodes], atol=1e-8)
+    eigen = nx.eigenvector_centrality_numpy(graph, weight='weight')
+    values = charnet.SpectralSolver.solve(csr, charnet.Measure.EIGENVECTOR, tol=1e-12)
+    assert np.allclose(values, [eigen[vert] for vert in graph.nodes], atol=1e-6)
+
+def test_disparity():
+    graph = random_graph()
+    edges = np.array(list(graph.edges(data='weight')), dtype=np.int64)
+    alpha = charnet.Graphs.get_disparity(edges)
+    for (i, (u_vert, v_vert, weight)) in enumerate(edges):
+        expected = min((1.0 - weight / graph.degree(vert, weight='weight'))
+                       ** (graph.degree(vert) - 1) for vert in (u_vert, v_vert))
+        assert alpha[i] == pytest.approx(expected)
+
+def test_lobby_loops():
+    # path 0-1-2 with a self-loop at 1, counted twice in its degree
+    csr = charnet.Graphs.edges_to_csr(3, np.array([[0, 1, 1], [1, 2, 1], [1, 1, 1]]),
+                                      np.ones(3))
+    assert csr['degrees'].tolist() == [1, 4, 1]
+    assert charnet.simple_degrees_csr(csr).tolist() == [1, 2, 1]
+    # the neighbors of 1 have degrees 4, 4, 1 and 1
+    assert charnet.lobby_csr(csr) == [1 / 3, 2 / 3, 1 / 3]
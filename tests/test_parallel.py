@@ -0,0 +1,23 @@
+"""Tests of the measures computed by the workers of the executor."""
+import numpy as np
+
+from charnet import __main__ as charnet
+
+from conftest import data_file
+
+def test_parity(project):
+    nums = charnet.Graphs.get_centrality_nums() + [charnet.Measure.LOBBY]
+    book = charnet.BookFile(data_file('tolkien'))
+    graph = book.read()
+    sequential = {num: list(charnet.Graphs.get_centrality_values(graph, num)) for num in nums}
+    # the degree of graph-tool, tolkien has a self-encounter
+    edges = graph.get_edges()
+    assert np.any(edges[:, 0] == edges[:, 1])
+    degrees = graph.get_out_degrees(graph.get_vertices())
+    assert np.allclose(sequential[charnet.Measure.DEGREE_CENTRALITY],
+                       degrees / float(graph.num_vertices()))
+    project.set_workers(2)
+    book = charnet.BookFile(data_file('tolkien'))
+    assert len(charnet.MeasureExecutor.run([book], nums)) == len(nums)
+    for num in nums:
+        assert np.allclose(charnet.get_vertex_measure(book, num), sequential[num]), num.name
@@ -0,0 +1,105 @@
+"""Tests of the server and watch modes, which read again the books whose
+data files change."""
+import os
+import shutil
+
+import pytest
+
+from charnet import __main__ as charnet
+
+from conftest import data_file
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Return the directory of a corpus with a copy of two books."""
+    directory = tmp_path / 'data'
+    directory.mkdir()
+    for name in ['hawking', 'acts']:
+        shutil.copy(data_file(name), directory)
+    charnet.Books.set_registry(charnet.BookRegistry([str(directory)]))
+    return directory
+
+def truncate(file_name, n_lines):
+    """Remove the last n_lines of the data file, changing its size."""
+    with open(file_name) as _file:
+        lines = _file.read().rstrip('\n').split('\n')
+    with open(file_name, 'w') as _file:
+        _file.write('\n'.join(lines[:-n_lines]) + '\n')
+
+def lobby_table(file_name):
+    """Return the table of the lobby index of the book read afresh."""
+    book = charnet.BookFile(file_name)
+    values = charnet.Graphs.get_centrality_values(book.read(), charnet.Measure.LOBBY)
+    order = sorted(range(len(values)), key=lambda idx: -values[idx])
+    return ''.join('{}{}"{}"{}{}\n'.format(book.get_char_label(idx), charnet.CSV_FIELDS_SEPARATOR,
+                                           book.get_char_name(idx),
+                                           charnet.CSV_FIELDS_SEPARATOR, values[idx])
+                   for idx in order)
+
+@pytest.mark.parametrize('with_store', [False, True])
+def test_reload(project, corpus, tmp_path, with_store):
+    if with_store:
+        project.set_store(charnet.ResultsStore(str(tmp_path / 'store.db')))
+    file_name = str(corpus / 'hawking.dat')
+    assert charnet.AnalysisServer.answer('/measure/lobby/hawking') == lobby_table(file_name)
+    truncate(file_name, 40)
+    assert charnet.AnalysisServer.answer('/measure/lobby/hawking') == lobby_table(file_name)
+    if with_store:
+        project.get_store().close()
+
+def test_watch(corpus, tmp_path):
+    task_nums = [charnet.TASK_NAMES.index('degree'), charnet.TASK_NAMES.index('assortativity')]
+    for task_no in task_nums:
+        charnet.run_task(task_no)
+    watcher = charnet.Watcher(task_nums)
+    charnet.AnalysisServer.refresh()
+    assert watcher.update() == []
+    stamps = {name: os.stat(tmp_path / name).st_mtime_ns
+              for name in ['acts-vertex-degree.csv', 'hawking-vertex-degree.csv']}
+    truncate(str(corpus / 'hawking.dat'), 40)
+    assert watcher.update() == ['hawking']
+    assert os.stat(tmp_path / 'acts-vertex-degree.csv').st_mtime_ns == stamps['acts-vertex-degree.csv']
+    assert os.stat(tmp_path / 'hawking-vertex-degree.csv').st_mtime_ns \
+        != stamps['hawking-vertex-degree.csv']
+
+def test_watch_broken_edit(project, corpus, tmp_path):
+    project.set_store(charnet.ResultsStore(str(tmp_path / 'store.db')))
+    task_nums = [charnet.TASK_NAMES.index('coreness')]
+    for task_no in task_nums:
+        charnet.run_task(task_no)
+    watcher = charnet.Watcher(task_nums)
+    charnet.AnalysisServer.refresh()
+    file_name = str(corpus / 'hawking.dat')
+    with open(file_name) as _file:
+        content = _file.read()
+    n_verts = charnet.Books.find('hawking').get_graph().num_vertices()
+    with open(file_name, 'a') as _file: # label not declared
+        _file.write('99:JA,ZZ\n')
+    assert watcher.update() == []
+    assert watcher.update() == [] # not read again until it changes
+    assert charnet.Books.find('hawking').get_graph().num_vertices() == n_verts
+    with open(file_name, 'w') as _file:
+        _file.write(content)
+    truncate(file_name, 40)
+    assert watcher.update() == ['hawking']
+    assert charnet.AnalysisServer.answer('/measure/lobby/hawking') == lobby_table(file_name)
+    project.get_store().close()
+
+def test_serve_address(corpus, tmp_path):
+    file_name = tmp_path / 'not-a-socket'
+    file_name.write_text('kept\n')
+    with pytest.raises(SystemExit):
+        charnet.AnalysisServer(str(file_name)).serve()
+    assert file_name.read_text() == 'kept\n'
+
+def test_measure_params(project):
+    book = charnet.BookFile(data_file('hawking'))
+    book.read()
+    project.set_spectral_tolerance(1e-2)
+    rough = charnet.get_vertex_measure(book, charnet.Measure.PAGERANK)
+    project.set_spectral_tolerance(1e-12)
+    charnet.SpectralSolver.solutions.clear()
+    # the values kept in memory are those of the current parameters
+    assert charnet.get_vertex_measure(book, charnet.Measure.PAGERANK) != rough
+    project.set_spectral_tolerance(1e-2)
+    assert charnet.get_vertex_measure(book, charnet.Measure.PAGERANK) is rough
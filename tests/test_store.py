@@ -0,0 +1,65 @@
+"""Tests of the store of books and measures."""
+from charnet import __main__ as charnet
+
+from conftest import data_file
+
+def test_backbone(project, tmp_path):
+    store = charnet.ResultsStore(str(tmp_path / 'store.db'))
+    project.set_store(store)
+    whole = charnet.BookFile(data_file('tolkien')).read()
+    project.set_backbone_level(0.05)
+    book = charnet.BookFile(data_file('tolkien'))
+    backbone = book.read()
+    assert backbone.num_edges() < whole.num_edges()
+    lobby = charnet.get_vertex_measure(book, charnet.Measure.LOBBY)
+    assert book.get_graph().num_edges() == backbone.num_edges()
+    book_id = store.find_book(book)
+    degrees = [degree for (degree,) in store.conn.execute(
+        'SELECT degree FROM characters WHERE book_id = ? ORDER BY idx', (book_id,))]
+    assert degrees == charnet.Graphs.get_vprop_degrees(whole).a.tolist()
+    # the degrees of the backbone are not those of the whole graph stored
+    assert charnet.Graphs.get_vprop_degrees(book.get_graph()).a.tolist() != degrees
+    (n_edges,) = store.conn.execute('SELECT COUNT(*) FROM edges WHERE book_id = ?',
+                                    (book_id,)).fetchone()
+    assert n_edges == whole.num_edges()
+    # the measures of the whole graph are not taken from the backbone
+    project.set_backbone_level(None)
+    book = charnet.BookFile(data_file('tolkien'))
+    charnet.MeasureExecutor.results.clear()
+    values = charnet.get_vertex_measure(book, charnet.Measure.LOBBY)
+    assert values == charnet.Graphs.get_centrality_values(whole, charnet.Measure.LOBBY)
+    assert values != lobby
+    store.close()
+
+def test_spectral_tolerance(project, tmp_path):
+    store = charnet.ResultsStore(str(tmp_path / 'store.db'))
+    project.set_store(store)
+    book = charnet.BookFile(data_file('hawking'))
+    book.read()
+    project.set_spectral_tolerance(1e-2)
+    rough = store.get_vertex_measure(book, charnet.Measure.PAGERANK)
+    project.set_spectral_tolerance(1e-12)
+    assert not store.has_vertex_measure(book, charnet.Measure.PAGERANK)
+    charnet.SpectralSolver.solutions.clear()
+    fine = store.get_vertex_measure(book, charnet.Measure.PAGERANK)
+    assert fine != rough
+    store.close()
+
+def test_versions(tmp_path):
+    store = charnet.ResultsStore(str(tmp_path / 'store.db'))
+    file_name = tmp_path / 'book.dat'
+    text = open(data_file('hawking')).read()
+    ids = []
+    for content in [text, text + '* edited\n', text]: # edited back
+        file_name.write_text(content)
+        ids.append(store.add_book(charnet.BookFile(str(file_name))))
+    assert ids[0] == ids[2] != ids[1]
+    assert store.conn.execute('SELECT id FROM books WHERE current = 1').fetchall() \
+        == [(ids[0],)]
+    # the same content with another name is another book
+    (tmp_path / 'other.dat').write_text(text)
+    other_id = store.add_book(charnet.BookFile(str(tmp_path / 'other.dat')))
+    assert other_id not in ids
+    assert store.conn.execute('SELECT name FROM books WHERE id = ?',
+                              (other_id,)).fetchone() == ('other',)
+    store.close()